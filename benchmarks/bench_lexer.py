@@ -0,0 +1,80 @@
+# Benchmark: MarketOrder lexer against the regex it replaced
+# Purpose: Run the old lazy-group regex and MarketOrderLexer over the same synthetic log, check
+# they find the same orders and compare throughput, for every order and for a few items only.
+# Usage: python benchmarks/bench_lexer.py --size-mb 256 --output lexer.json
+
+import os
+import re
+import sys
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from harness import measure, run_metadata, write_results, print_report
+from synthetic import write_synthetic_log
+from dugpt.lexer import MarketOrderLexer
+
+# The pattern ingest used before the lexer, every field converted by hand afterwards
+LEGACY_PATTERN = re.compile(rb'MarketOrder:\[marketId = (\d+), orderId = (\d+), itemType = (\d+), buyQuantity = (.*?), expirationDate = @\(\d+\) (.*?), updateDate = @\(\d+\) (.*?), unitPrice = Currency:\[amount = (\d+)\]')
+
+def legacy_lex(buffer, item_types=None):
+    orders = []
+    for match in LEGACY_PATTERN.finditer(buffer):
+        order = (int(match[1]), int(match[2]), int(match[3]), int(match[4]),
+                 match[5].decode('utf-8', 'replace'), match[6].decode('utf-8', 'replace'), int(match[7]))
+        if item_types is None or order[2] in item_types:
+            orders.append(order)
+    return orders
+
+def chunks(log_path, chunk_size):
+    # Whole chunks only, so both sides see the same bytes and the read is not timed twice
+    with open(log_path, 'rb') as log_file:
+        return list(iter(lambda: log_file.read(chunk_size), b''))
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the MarketOrder lexer against the old regex.')
+    parser.add_argument('--size-mb', type=float, default=256, help='Size of the synthetic log in MB')
+    parser.add_argument('--items', type=int, default=4000, help='How many item types the log has')
+    parser.add_argument('--selected', type=int, default=19, help='Item types kept in the filtered runs')
+    parser.add_argument('--chunk-kb', type=int, default=1024, help='Chunk size in KB')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per variant')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        log_path = os.path.join(temp_dir, 'synthetic.log')
+        size = write_synthetic_log(log_path, args.size_mb, item_mix=args.items)
+        buffers = chunks(log_path, args.chunk_kb * 1024)
+    size_mb = size / 1024 / 1024
+    selected = set(range(1, args.selected + 1))
+
+    def regex(item_types=None):
+        return sum(len(legacy_lex(buffer, item_types)) for buffer in buffers)
+
+    def lexer(item_types=None):
+        # A fresh lexer per run, so its date cache starts cold like a new scan
+        market_order_lexer = MarketOrderLexer()
+        return sum(len(market_order_lexer.lex(buffer, item_types=item_types)[0]) for buffer in buffers)
+
+    # Same orders out of both, records cut by a chunk boundary are missed by both alike
+    for buffer in buffers[:8]:
+        if legacy_lex(buffer) != MarketOrderLexer().lex(buffer)[0]:
+            sys.exit("The lexer and the regex disagree")
+
+    results = {'meta': run_metadata(**vars(args)), 'stages': {}}
+    options = dict(repeat=args.repeat, warmup=0, units=size_mb, unit='MB', trace_memory=False)
+    results['stages']['regex_all'] = measure(regex, **options)
+    results['stages']['lexer_all'] = measure(lexer, **options)
+    results['stages']['regex_selected'] = measure(lambda: regex(selected), **options)
+    results['stages']['lexer_selected'] = measure(lambda: lexer(selected), **options)
+
+    print_report(results)
+    for variant in ('all', 'selected'):
+        speedup = results['stages'][f'regex_{variant}']['seconds']['p50'] / results['stages'][f'lexer_{variant}']['seconds']['p50']
+        print(f"lexer speedup, {variant} items: {speedup:.2f}x")
+    if args.output:
+        write_results(args.output, results)
+
+if __name__ == '__main__':
+    main()
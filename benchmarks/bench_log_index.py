@@ -0,0 +1,91 @@
+# Benchmark: targeted extraction through the log indexes
+# Purpose: Compare a full scan for one item or one market against the same lookup through
+# the sidecar index, and time building and extending the index, on bursty synthetic logs.
+# Usage: python benchmarks/bench_log_index.py --size-mb 256 --logs 4 --output log_index.json
+
+import os
+import sys
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from harness import measure, run_metadata, write_results, print_report
+from synthetic import LogGenerator
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark single-item and single-market lookups through the log indexes.')
+    parser.add_argument('--size-mb', type=float, default=256, help='Size of every synthetic log in MB')
+    parser.add_argument('--logs', type=int, default=4, help='How many logs, like days of retained logs')
+    parser.add_argument('--items', type=int, default=4000, help='How many item types the logs have')
+    parser.add_argument('--burst', type=int, default=200, help='Average run of records for the same item')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per stage')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    args = parser.parse_args()
+
+    results = {'meta': run_metadata(**vars(args)), 'stages': {}}
+    output = os.path.abspath(args.output) if args.output else None
+    working_directory = os.getcwd()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # The sidecars go to data/log_index relative to the working directory
+        os.chdir(temp_dir)
+        import numpy as np
+        from dugpt.ingest import iter_market_orders, find_market_orders
+        from dugpt.log_index import LogIndex, build_log_indexes, index_path
+
+        log_files = []
+        size = 0
+        for n in range(args.logs):
+            log_path = os.path.join(temp_dir, f'log-{n}.log')
+            size += LogGenerator(args.items, burst=args.burst, seed=n).write(log_path, args.size_mb)
+            log_files.append(log_path)
+        size_mb = size / 1024 / 1024
+        print(f"Synthetic logs: {args.logs} x {args.size_mb:,.0f} MB, burst {args.burst}")
+
+        # An item and a market the logs certainly have
+        first_batch = next(iter_market_orders(log_files[0]))
+        item_types = {int(first_batch.item_type[0])}
+        market_ids = {int(first_batch.market_id[0])}
+        def full_scan(item_types=None, market_ids=None):
+            found = 0
+            for log_path in log_files:
+                for batch in iter_market_orders(log_path, item_types=item_types):
+                    found += len(batch) if market_ids is None else int(np.isin(batch.market_id, list(market_ids)).sum())
+            return found
+
+        options = dict(repeat=args.repeat, warmup=0, trace_memory=False)
+        results['stages']['scan_item'] = measure(lambda: full_scan(item_types), units=size_mb, unit='MB', **options)
+        results['stages']['scan_market'] = measure(lambda: full_scan(None, market_ids), units=size_mb, unit='MB', **options)
+
+        def rebuild():
+            for log_path in log_files:
+                if os.path.exists(index_path(log_path)):
+                    os.remove(index_path(log_path))
+            return build_log_indexes(log_files)
+        results['stages']['index_build'] = measure(rebuild, units=size_mb, unit='MB', **options)
+
+        if full_scan(item_types) != len(find_market_orders(log_files, item_types)):
+            sys.exit("Indexed lookup and full scan disagree")
+        results['stages']['indexed_item'] = measure(lambda: find_market_orders(log_files, item_types), units=len, unit='orders', **options)
+        results['stages']['indexed_market'] = measure(lambda: find_market_orders(log_files, None, market_ids), units=len, unit='orders', **options)
+
+        # A day of play appended to the first log, only the new part is indexed
+        def grow():
+            LogGenerator(args.items, burst=args.burst, seed=1000).write(os.path.join(temp_dir, 'append.log'), args.size_mb / 16)
+            with open(log_files[0], 'ab') as log_file, open(os.path.join(temp_dir, 'append.log'), 'rb') as appended:
+                log_file.write(appended.read())
+        results['stages']['index_extend'] = measure(lambda _: LogIndex.open(log_files[0]).offset, setup=grow, units=args.size_mb / 16, unit='MB', **options)
+
+        log_index = LogIndex.open(log_files[0])
+        read = sum(end - start for start, end in log_index.ranges(item_types))
+        print(f"Sidecar {os.path.getsize(index_path(log_files[0])) / 1024:,.0f} KB for a {log_index.size / 1024 / 1024:,.0f} MB log, "
+              f"one item reads {read / log_index.size:.1%} of it")
+        os.chdir(working_directory)
+
+    print_report(results)
+    if output:
+        write_results(output, results)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+# Benchmark: streaming log scanner
+# Purpose: Write a synthetic DualUniverse log of a given size and measure how fast
+# iter_market_orders gets through it, plus the peak memory used while doing so.
+# Usage: python benchmarks/bench_log_scanner.py --size-mb 2048 --output scanner.json
+
+import os
+import sys
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from harness import measure, run_metadata, write_results, print_report
+from synthetic import write_synthetic_log
+from dugpt.ingest import iter_market_orders
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the streaming log scanner.')
+    parser.add_argument('--size-mb', type=int, default=2048, help='Size of the synthetic log in MB')
+    parser.add_argument('--chunk-kb', type=int, default=1024, help='Scanner chunk size in KB')
+    parser.add_argument('--duplicate-ratio', type=float, default=0.5, help='Share of records repeating an earlier order')
+    parser.add_argument('--repeat', type=int, default=1, help='Timed scans')
+    parser.add_argument('--log-file', default=None, help='Scan this file instead of a synthetic one')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        log_path = args.log_file
+        if log_path is None:
+            log_path = os.path.join(temp_dir, 'synthetic.log')
+            print(f"Writing {args.size_mb} MB synthetic log to {log_path}")
+            write_synthetic_log(log_path, args.size_mb, duplicate_ratio=args.duplicate_ratio)
+        size_mb = os.path.getsize(log_path) / 1024 / 1024
+
+        def scan():
+            return sum(map(len, iter_market_orders(log_path, chunk_size=args.chunk_kb * 1024)))
+
+        # No tracemalloc here, on a 2 GB log it would take longer than the scan
+        results = {'meta': run_metadata(**vars(args)), 'stages': {}}
+        results['stages']['scan'] = measure(scan, repeat=args.repeat, warmup=0, units=size_mb, unit='MB', trace_memory=False)
+
+    print_report(results)
+    if args.output:
+        write_results(args.output, results)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+# Benchmark: process-pool log parsing
+# Purpose: Time extract_market_orders_parallel over the same synthetic logs with 1/2/4/8 workers
+# so we can pick the right --workers setting for the ingestion box.
+# Usage: python benchmarks/bench_parallel_parse.py --files 8 --size-mb 128
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from synthetic import write_synthetic_log, write_items_json, item_name
+from dugpt.item_helper import ItemCatalog
+from dugpt.ingest import extract_market_orders_parallel, RANGE_SIZE
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark parallel log parsing across worker counts.')
+    parser.add_argument('--files', type=int, default=8, help='Number of synthetic log files')
+    parser.add_argument('--size-mb', type=int, default=128, help='Size of each log file in MB')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8], help='Worker counts to try')
+    parser.add_argument('--range-mb', type=int, default=RANGE_SIZE // 1024 // 1024, help='Byte range handed to each task in MB')
+    parser.add_argument('--items', type=int, default=19, help='How many item types to extract')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        log_files = []
+        for n in range(args.files):
+            log_path = os.path.join(temp_dir, f'log_{n}.xml')
+            write_synthetic_log(log_path, args.size_mb, seed=n)
+            log_files.append(log_path)
+        total_mb = args.files * args.size_mb
+
+        # Synthetic logs use item types 1..4000
+        items_path = write_items_json(os.path.join(temp_dir, 'items.json'), range(1, 4001))
+        catalog = ItemCatalog(cache_file=items_path)
+        item_names = [item_name(i) for i in range(1, args.items + 1)]
+
+        print(f"{args.files} files, {total_mb:,} MB total")
+        print(f"{'workers':>8} {'seconds':>10} {'MB/s':>10} {'speedup':>8} {'orders':>10}")
+        baseline = None
+        for workers in args.workers:
+            start = time.perf_counter()
+            buckets = extract_market_orders_parallel(item_names, catalog, log_files, workers, args.range_mb * 1024 * 1024)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            orders = sum(len(b['buy']) + len(b['sell']) for b in buckets.values())
+            print(f"{workers:>8} {elapsed:>10.2f} {total_mb / elapsed:>10.1f} {baseline / elapsed:>7.2f}x {orders:>10,}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+# Benchmark: every pipeline stage
+# Purpose: Generate synthetic logs and recipes, then time each hot path on them: log parsing,
+# de-duplication (dicts and OrderBatch), CSV write/read, the order store, process_data, the batch report, the recipe
+# cost recursion, the bill of materials and the profitability ranking. Results go to JSON so runs can be compared.
+# Usage: python benchmarks/bench_pipeline.py --size-mb 64 --output results.json --compare baseline.json
+
+import os
+import sys
+import json
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from harness import measure, run_metadata, write_results, compare, print_report
+from synthetic import LogGenerator, write_items_json, item_name, synthetic_recipes
+
+STAGES = ['parse', 'dedup', 'dedup_batch', 'csv_write', 'csv_read', 'store_append', 'store_read', 'process_data', 'process_batch', 'report', 'recipe_cost', 'bom_explode', 'profit_rank']
+
+def item_mix(items, skew):
+    # Item types 1..items, the first ones most common when skew > 0 (Zipf-like)
+    return {item_type: 1 / item_type ** skew for item_type in range(1, items + 1)}
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark every stage of the market and recipe pipeline.')
+    parser.add_argument('--size-mb', type=float, default=64, help='Size of the synthetic log in MB')
+    parser.add_argument('--items', type=int, default=19, help='How many item types the log has')
+    parser.add_argument('--skew', type=float, default=1.0, help='Item mix skew, 0 for an even mix')
+    parser.add_argument('--duplicate-ratio', type=float, default=0.5, help='Share of records repeating an earlier order')
+    parser.add_argument('--recipes', type=int, default=3000, help='Synthetic recipes for the recipe stages')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per stage')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES, help='Stages to run')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    parser.add_argument('--compare', help='Compare against the results JSON of an earlier run')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Slowdown that counts as a regression')
+    parser.add_argument('--fail-on-regression', action='store_true', help='Exit with an error when a stage regressed')
+    args = parser.parse_args()
+
+    results = {'meta': run_metadata(**vars(args)), 'stages': {}}
+    output = os.path.abspath(args.output) if args.output else None
+    working_directory = os.getcwd()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # The pipeline reads items.json and writes data/ relative to the working directory
+        os.chdir(temp_dir)
+        write_items_json('items.json', range(1, args.items + 1))
+
+        # Imported after the chdir, the item catalog is loaded on first use
+        import pandas as pd
+        from dugpt.ingest import iter_market_orders, iter_market_order_chunks, update_order_index, write_market_orders_to_csv, market_orders_csv_path, MARKET_ORDER_FIELDS
+        from dugpt.order_batch import OrderBatch
+        from dugpt.order_store import OrderStore
+        from dugpt.analyze import DataProcessor, process_all_items, summarize_orders
+        from dugpt.recipes import RecipeCostEngine, BillOfMaterials
+        from dugpt.profitability import ProfitabilityEngine
+
+        log_path = os.path.join(temp_dir, 'synthetic.log')
+        generator = LogGenerator(item_mix(args.items, args.skew), duplicate_ratio=args.duplicate_ratio)
+        size = generator.write(log_path, args.size_mb)
+        size_mb = size / 1024 / 1024
+        print(f"Synthetic log: {size_mb:,.1f} MB, {args.items} item types, duplicate ratio {args.duplicate_ratio}")
+
+        def stage(name, *a, **kw):
+            if name in args.stages:
+                results['stages'][name] = measure(*a, repeat=args.repeat, **kw)
+
+        # Parse and de-duplicate, the other stages work on their output
+        stage('parse', lambda: sum(map(len, iter_market_orders(log_path))), units=size_mb, unit='MB')
+
+        # The dict-per-order reference update_order_index keeps, to compare the batch path against
+        orders = [dict(zip(MARKET_ORDER_FIELDS, order)) for chunk in iter_market_order_chunks(log_path) for order in chunk]
+        def dedup():
+            order_index = {}
+            for market_order in orders:
+                update_order_index(order_index, market_order)
+            return order_index
+        stage('dedup', dedup, units=len(orders))
+
+        # The same orders as typed columns, deduplicated with one sort
+        item_ids = {item_type: item_name(item_type) for item_type in range(1, args.items + 1)}
+        batch = OrderBatch.concat(OrderBatch.from_orders(chunk, item_ids) for chunk in iter_market_order_chunks(log_path))
+        stage('dedup_batch', batch.latest, units=len(batch))
+
+        latest = batch.latest()
+
+        stage('csv_write', lambda: write_market_orders_to_csv(latest, 'bench'), units=len(latest))
+        csv_path = market_orders_csv_path('bench')
+        if not os.path.exists(csv_path):
+            write_market_orders_to_csv(latest, 'bench')
+        stage('csv_read', lambda: pd.read_csv(csv_path), units=len(latest))
+
+        store_runs = iter(range(10 ** 6))
+        stage('store_append', lambda store: store.append(latest), units=len(latest),
+              setup=lambda: OrderStore(os.path.join(temp_dir, f'store-{next(store_runs)}')))
+        store = OrderStore(os.path.join(temp_dir, 'store'))
+        store.append(latest)
+        stage('store_read', lambda: store.read(), units=len(latest))
+
+        # The most common item, as process_item would process it
+        top_item = item_name(1)
+        def split_orders():
+            item_orders = store.read([top_item])
+            return item_orders[item_orders['order_type'] == 'Buy'].copy(), item_orders[item_orders['order_type'] == 'Sell'].copy()
+        item_count = len(store.read([top_item]))
+        stage('process_data', lambda frames: DataProcessor(top_item).process_data(*frames, num_days=10, bid_min=1, bid_max=100000),
+              units=item_count, setup=split_orders)
+
+        top_batch = latest.by_item()[top_item]
+        stage('process_batch', lambda: DataProcessor(top_item).process_batch(top_batch, num_days=10, bid_min=1, bid_max=100000),
+              units=len(top_batch))
+
+        all_orders = store.read()
+        stage('report', lambda: summarize_orders(process_all_items(all_orders)), units=len(all_orders))
+
+        recipes = synthetic_recipes(args.recipes)
+        stage('recipe_cost', lambda: RecipeCostEngine(recipes).cost_all_recipes(), units=len(recipes), unit='recipes')
+        rng = random.Random(0)
+        targets = {recipe['products'][0]['id']: rng.randint(1, 100) for recipe in rng.sample(recipes, min(200, len(recipes)))}
+        bill_of_materials = BillOfMaterials(recipes)
+        stage('bom_explode', lambda: bill_of_materials.explode(targets), units=len(targets), unit='targets')
+
+        # Re-ranking after a price refresh, the requirement matrix is built once
+        profitability = ProfitabilityEngine(recipes)
+        prices = {item_id: rng.randint(100, 100000) for item_id in profitability.raw_ids + profitability.product_ids.tolist()}
+        stage('profit_rank', lambda: profitability.rank(prices), units=len(recipes), unit='recipes')
+
+        os.chdir(working_directory)
+
+    print_report(results)
+    if output:
+        write_results(output, results)
+        print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        regressed = False
+        print(f"\n{'stage':<16} {'before s':>9} {'now s':>9} {'ratio':>7}")
+        for name, before, now, ratio, slower in compare(baseline, results, args.threshold):
+            regressed |= slower
+            print(f"{name:<16} {before:>9.4f} {now:>9.4f} {ratio:>6.2f}x{'  REGRESSION' if slower else ''}")
+        if regressed and args.fail_on_regression:
+            sys.exit("Some stages regressed")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+# Benchmark: query service latency
+# Purpose: Serve synthetic orders and recipes from dugpt.service on localhost and time every
+# endpoint over one keep-alive connection, computed from the warm in-memory state and from cache.
+# Usage: python benchmarks/bench_service.py --size-mb 16 --output service.json
+
+import os
+import sys
+import json
+import asyncio
+import argparse
+import tempfile
+import threading
+import http.client
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from harness import measure, run_metadata, write_results, print_report
+from synthetic import LogGenerator, write_items_json, item_name, synthetic_recipes
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the query service, computed and cached answers.')
+    parser.add_argument('--size-mb', type=float, default=16, help='Size of the synthetic log in MB')
+    parser.add_argument('--items', type=int, default=19, help='How many item types the log has')
+    parser.add_argument('--recipes', type=int, default=3000, help='Synthetic recipes')
+    parser.add_argument('--repeat', type=int, default=50, help='Timed requests per endpoint')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    args = parser.parse_args()
+
+    results = {'meta': run_metadata(**vars(args)), 'stages': {}}
+    output = os.path.abspath(args.output) if args.output else None
+    working_directory = os.getcwd()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        os.chdir(temp_dir)
+        write_items_json('items.json', range(1, args.items + 1))
+        recipes = synthetic_recipes(args.recipes)
+        with open('recipes.json', 'w') as file:
+            json.dump(recipes, file)
+        os.makedirs('logs')
+        LogGenerator({item_type: 1 / item_type for item_type in range(1, args.items + 1)}).write(os.path.join('logs', 'synthetic.log'), args.size_mb)
+
+        from dugpt.service import MarketService, QueryServer
+        item_names = [item_name(item_type) for item_type in range(1, args.items + 1)]
+        service = MarketService(item_names, 'items.json', 'recipes.json', log_directory='logs')
+        service.load()
+        server = QueryServer(service)
+
+        # The server gets its own thread and event loop, requests come from this one
+        listening = threading.Event()
+        address = []
+        def serve():
+            asyncio.run(server.serve('127.0.0.1', 0, ready=lambda bound: (address.extend(bound), listening.set())))
+        threading.Thread(target=serve, daemon=True).start()
+        listening.wait()
+        connection = http.client.HTTPConnection(*address)
+
+        def request(path, method='GET'):
+            connection.request(method, path)
+            response = connection.getresponse()
+            body = response.read()
+            if response.status != 200:
+                sys.exit(f"{method} {path}: {response.status} {body[:200]}")
+            return body
+
+        request('/ingest', 'POST')
+        product_id = recipes[-1]['products'][0]['id']
+        paths = {
+            'best': f'/market/best?item=1',
+            'summary': '/market/summary',
+            'recipe_cost': f'/recipes/cost?item={product_id}',
+            'recipe_cost_market': f'/recipes/cost?item={product_id}&prices=market',
+            'bom': f'/recipes/bom?target={product_id}:100&target={recipes[0]["products"][0]["id"]}:10',
+        }
+        options = dict(repeat=args.repeat, warmup=1, units=1, unit='queries', trace_memory=False)
+        for name, path in paths.items():
+            # Computed: the cache is emptied before every request, the service state stays warm
+            results['stages'][f'{name}_computed'] = measure(lambda _: request(path), setup=server.cache.clear, **options)
+            results['stages'][f'{name}_cached'] = measure(lambda: request(path), **options)
+        results['stages']['ingest'] = measure(lambda: request('/ingest', 'POST'), **options)
+
+        connection.close()
+        os.chdir(working_directory)
+
+    print_report(results)
+    if output:
+        write_results(output, results)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+# Benchmark: cold import time
+# Purpose: Import each dugpt module in a fresh interpreter and fail when it gets slower than
+# its budget or drags in a heavy dependency it should only load lazily.
+# Usage: python benchmarks/bench_startup.py --runs 5
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+HEAVY_MODULES = ['pandas', 'numpy', 'matplotlib', 'seaborn', 'mplfinance', 'watchdog', 'requests']
+
+# Module -> (budget in ms, heavy modules it is allowed to import)
+BUDGETS = {
+    'dugpt': (50, []),
+    'dugpt.item_helper': (100, []),
+    'dugpt.metrics': (50, []),
+    'dugpt.ingest': (100, []),
+    'dugpt.recipes': (100, []),
+    'dugpt.recipe_db': (100, []),
+    'dugpt.order_book': (100, []),
+    'dugpt.production_planner': (100, []),
+    'dugpt.order_store': (1500, ['pandas', 'numpy']),
+    'dugpt.price_history': (1500, ['pandas', 'numpy']),
+    'dugpt.analyze': (1500, ['pandas', 'numpy']),
+    'dugpt.render': (1500, ['pandas', 'numpy']),
+    'dugpt.profitability': (1500, ['numpy']),
+    'dugpt.service': (100, []),
+}
+
+PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'ms': elapsed * 1000, 'loaded': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+def measure(module, runs):
+    # A fresh interpreter per run, so nothing is already imported
+    timings = []
+    loaded = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', PROBE.format(module=module, heavy=HEAVY_MODULES)],
+                                cwd=ROOT, capture_output=True, text=True, check=True).stdout
+        result = json.loads(output)
+        timings.append(result['ms'])
+        loaded = result['loaded']
+    return statistics.median(timings), loaded
+
+def main():
+    parser = argparse.ArgumentParser(description='Guard the cold import time of every dugpt module.')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters per module, the median counts')
+    parser.add_argument('--slack', type=float, default=1.0, help='Multiply every budget by this on slow machines')
+    args = parser.parse_args()
+
+    failures = []
+    for module, (budget, allowed) in BUDGETS.items():
+        median, loaded = measure(module, args.runs)
+        unexpected = [name for name in loaded if name not in allowed]
+        over = median > budget * args.slack
+        status = 'FAIL' if over or unexpected else 'ok'
+        print(f"{module:<28} {median:8.1f} ms  budget {budget * args.slack:7.0f} ms  {status}"
+              + (f"  imports {', '.join(unexpected)}" if unexpected else ''))
+        if status == 'FAIL':
+            failures.append(module)
+
+    if failures:
+        sys.exit(f"Import budget exceeded: {', '.join(failures)}")
+
+if __name__ == '__main__':
+    main()
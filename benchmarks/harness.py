@@ -0,0 +1,124 @@
+# Benchmark harness
+# Purpose: Time a pipeline stage over several runs and report throughput, latency percentiles
+# and peak memory in a JSON document that can be compared against an earlier run.
+
+import sys
+import json
+import time
+import platform
+import datetime
+import resource
+import tracemalloc
+
+def percentile(values, fraction):
+    # Linear interpolation between the closest ranks, like numpy's default
+    values = sorted(values)
+    position = (len(values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+def peak_rss_mb():
+    # ru_maxrss is in KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def measure(stage, repeat=5, warmup=1, units=None, unit='records', setup=None, trace_memory=True):
+    """
+    Runs stage repeatedly and summarizes how long it took.
+
+    Args:
+        stage (callable): The work, called with setup()'s result when setup is given.
+        repeat (int): Timed runs.
+        warmup (int): Untimed runs first, so caches and imports are warm.
+        units (int or callable): Work done per run, or a function of stage's result, for throughput.
+        unit (str): What units counts, e.g. 'records' or 'MB'.
+        setup (callable): Fresh input for every run, not timed.
+        trace_memory (bool): One extra run under tracemalloc for the peak Python memory.
+
+    Returns:
+        dict: seconds per run (min, mean, p50, p90, p99, max), throughput, peak memory.
+    """
+    def run():
+        arguments = (setup(),) if setup else ()
+        start = time.perf_counter()
+        result = stage(*arguments)
+        return time.perf_counter() - start, result
+
+    for _ in range(warmup):
+        run()
+
+    timings = []
+    result = None
+    for _ in range(repeat):
+        elapsed, result = run()
+        timings.append(elapsed)
+
+    report = {
+        'runs': repeat,
+        'seconds': {
+            'min': min(timings),
+            'mean': sum(timings) / len(timings),
+            'p50': percentile(timings, 0.50),
+            'p90': percentile(timings, 0.90),
+            'p99': percentile(timings, 0.99),
+            'max': max(timings),
+        },
+    }
+
+    if units is not None:
+        count = units(result) if callable(units) else units
+        report['units'] = count
+        report['unit'] = unit
+        report['throughput'] = count / report['seconds']['p50'] if report['seconds']['p50'] else None
+
+    if trace_memory:
+        # Separate run, tracemalloc slows everything down
+        arguments = (setup(),) if setup else ()
+        tracemalloc.start()
+        stage(*arguments)
+        report['peak_traced_mb'] = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+        tracemalloc.stop()
+    report['peak_rss_mb'] = peak_rss_mb()
+    return report
+
+def run_metadata(**options):
+    return {
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'options': options,
+    }
+
+def write_results(path, results):
+    with open(path, 'w') as file:
+        json.dump(results, file, indent=2)
+
+def compare(baseline, results, threshold=0.10):
+    """
+    Median time of every stage against a baseline run.
+
+    Args:
+        baseline (dict): An earlier results document.
+        results (dict): This run's results document.
+        threshold (float): Slower by more than this share counts as a regression.
+
+    Returns:
+        list: (stage, baseline p50, p50, ratio, regressed) for every stage in both.
+    """
+    rows = []
+    for stage, report in results['stages'].items():
+        before = baseline.get('stages', {}).get(stage)
+        if before is None:
+            continue
+        ratio = report['seconds']['p50'] / before['seconds']['p50']
+        rows.append((stage, before['seconds']['p50'], report['seconds']['p50'], ratio, ratio > 1 + threshold))
+    return rows
+
+def print_report(results):
+    print(f"{'stage':<16} {'p50 s':>9} {'p90 s':>9} {'p99 s':>9} {'throughput':>22} {'traced MB':>10} {'RSS MB':>8}")
+    for stage, report in results['stages'].items():
+        seconds = report['seconds']
+        throughput = f"{report['throughput']:,.0f} {report['unit']}/s" if report.get('throughput') else ''
+        print(f"{stage:<16} {seconds['p50']:>9.4f} {seconds['p90']:>9.4f} {seconds['p99']:>9.4f} {throughput:>22} "
+              f"{report.get('peak_traced_mb', 0):>10.1f} {report['peak_rss_mb']:>8.1f}")
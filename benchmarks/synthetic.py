@@ -0,0 +1,197 @@
+# Synthetic game data
+# Purpose: Realistic stand-ins for the DualUniverse logs, items.json and recipes.json, so every
+# benchmark can run on a plain Linux box where %localappdata%\NQ\DualUniverse\log does not exist.
+
+import json
+import bisect
+import random
+import datetime
+import itertools
+
+NOISE_LINE = b'<record><date>2023-06-01T12:00:00</date><level>INFO</level><message>Some unrelated game event</message></record>\n'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+DATE_POOL_SIZE = 10000
+
+def item_name(item_type):
+    return f'Item {item_type}'
+
+def synthetic_items(item_types):
+    # items.json entries for the item types used in the logs
+    return [{'id': item_type, 'displayNameWithSize': item_name(item_type), 'unitMass': 1.0 + item_type % 7} for item_type in item_types]
+
+def write_items_json(path, item_types):
+    with open(path, 'w') as file:
+        json.dump(synthetic_items(item_types), file)
+    return path
+
+def market_order_line(market_id, order_id, item_type, buy_quantity, expiration_date, update_date, unit_price):
+    return (
+        f'MarketOrder:[marketId = {market_id}, orderId = {order_id}, '
+        f'itemType = {item_type}, buyQuantity = {buy_quantity}, '
+        f'expirationDate = @(1) {expiration_date}, '
+        f'updateDate = @(1) {update_date}, '
+        f'unitPrice = Currency:[amount = {unit_price}]]\n'
+    ).encode('utf-8')
+
+class LogGenerator:
+    """
+    Writes DualUniverse-style logs with MarketOrder records between noise lines.
+
+    Args:
+        item_mix (dict or int): item_type -> weight, or how many item types (1..n) to spread evenly.
+        duplicate_ratio (float): Share of records that log an order already written before.
+            About half of those repeat it unchanged, the rest with a newer updateDate and price.
+        order_ratio (float): Share of lines that are MarketOrder records, the rest is noise.
+        markets (int): Market ids are drawn from 1..markets.
+        now (datetime): Dates are spread around this, so the analysis filters keep the orders.
+        seed (int): Same seed, same log.
+        burst (int): Average run of records for the same item. The game logs a market
+            as it is browsed, so real logs come in bursts of one item, 1 scatters them.
+    """
+    def __init__(self, item_mix=4000, duplicate_ratio=0.5, order_ratio=0.25, markets=500, now=None, seed=0, burst=1):
+        if isinstance(item_mix, int):
+            item_mix = {item_type: 1 for item_type in range(1, item_mix + 1)}
+        self.item_types = list(item_mix)
+        self.cumulative_weights = list(itertools.accumulate(item_mix.values()))
+        self.duplicate_ratio = duplicate_ratio
+        self.order_ratio = order_ratio
+        self.markets = markets
+        self.rng = random.Random(seed)
+
+        # Formatting dates is the slow part of generating, so draw them from sorted pools
+        now = now or datetime.datetime.now().replace(microsecond=0)
+        def pool(days_from, days_to):
+            seconds = sorted(self.rng.randint(days_from * 86400, days_to * 86400) for _ in range(DATE_POOL_SIZE))
+            return [(now + datetime.timedelta(seconds=second)).strftime(DATE_FORMAT) for second in seconds]
+        self.expiration_dates = pool(1, 30)
+        self.update_dates = pool(-10, 0)
+
+        self.orders = []  # orders written so far, as lists: market_order_line arguments plus the update date index
+        self.orders_by_item = {}
+        self.next_order_id = 1
+        self.burst = burst
+        self.burst_item = None
+        self.burst_left = 0
+
+    def pick_item(self):
+        rng = self.rng
+        item_type = self.item_types[bisect.bisect(self.cumulative_weights, rng.random() * self.cumulative_weights[-1])]
+        if self.burst > 1:
+            if self.burst_left <= 0:
+                self.burst_item = item_type
+                self.burst_left = rng.randint(1, 2 * self.burst - 1)
+            self.burst_left -= 1
+            return self.burst_item
+        return item_type
+
+    def new_order(self, item_type=None):
+        rng = self.rng
+        if item_type is None:
+            item_type = self.pick_item()
+        update_index = rng.randrange(DATE_POOL_SIZE)
+        order = [
+            rng.randint(1, self.markets),
+            self.next_order_id,
+            item_type,
+            rng.randint(1, 100000) * rng.choice((-1, 1)),
+            rng.choice(self.expiration_dates),
+            self.update_dates[update_index],
+            rng.randint(100, 1000000),
+            update_index,
+        ]
+        self.next_order_id += 1
+        self.orders.append(order)
+        self.orders_by_item.setdefault(order[2], []).append(order)
+        return order
+
+    def repeat_order(self):
+        rng = self.rng
+        if self.burst > 1:
+            # Browsing a market again lists that item's orders again
+            item_type = self.pick_item()
+            orders = self.orders_by_item.get(item_type)
+            if not orders:
+                return self.new_order(item_type)
+            order = orders[rng.randrange(len(orders))]
+        else:
+            order = self.orders[rng.randrange(len(self.orders))]
+        if rng.random() < 0.5 and order[7] < DATE_POOL_SIZE - 1:
+            # Same order, updated since: newer updateDate and a new price
+            order[7] = rng.randint(order[7] + 1, DATE_POOL_SIZE - 1)
+            order[5] = self.update_dates[order[7]]
+            order[6] = max(1, order[6] + rng.randint(-1000, 1000))
+        return order
+
+    def lines(self, count):
+        rng = self.rng
+        for _ in range(count):
+            if rng.random() >= self.order_ratio:
+                yield NOISE_LINE
+            elif self.orders and rng.random() < self.duplicate_ratio:
+                yield market_order_line(*self.repeat_order()[:7])
+            else:
+                yield market_order_line(*self.new_order()[:7])
+
+    def write(self, file_path, size_mb):
+        """
+        Writes a log of about size_mb megabytes.
+
+        Returns:
+            int: Bytes written.
+        """
+        target = int(size_mb * 1024 * 1024)
+        written = 0
+        with open(file_path, 'wb') as log_file:
+            while written < target:
+                block = b''.join(self.lines(4096))
+                log_file.write(block)
+                written += len(block)
+        return written
+
+def write_synthetic_log(file_path, size_mb, seed=0, **options):
+    # One log file, see LogGenerator for the options
+    return LogGenerator(seed=seed, **options).write(file_path, size_mb)
+
+def synthetic_recipes(recipes=3000, raw_materials=19, max_ingredients=5, byproduct_ratio=0.05, catalyst_ratio=0.02, seed=0):
+    """
+    A recipe graph shaped like recipes.json.
+
+    Raw materials get ids 1..raw_materials. Every recipe makes one new item
+    from raw materials and items made by earlier recipes, its tier is one
+    more than its deepest ingredient. A few recipes also use a catalyst or
+    have a raw material as byproduct, which gives the cost engine the same
+    loops the real recipes have.
+
+    Returns:
+        list: Recipe dicts with id, tier, time, nanocraftable, ingredients and products.
+    """
+    rng = random.Random(seed)
+
+    def edge(item_id, quantity):
+        return {'quantity': quantity, 'id': item_id, 'displayNameWithSize': item_name(item_id)}
+
+    tiers = {item_id: 0 for item_id in range(1, raw_materials + 1)}
+    items = list(tiers)
+    result = []
+    for n in range(recipes):
+        product_id = 10000 + n
+        chosen = rng.sample(items[-200:] + items[:raw_materials], min(rng.randint(1, max_ingredients), len(items)))
+        ingredients = [edge(item_id, rng.choice((1, 2, 5, 10, 25, 50, 100))) for item_id in dict.fromkeys(chosen)]
+        products = [edge(product_id, rng.choice((1, 1, 5, 10, 45, 100)))]
+        if rng.random() < byproduct_ratio:
+            products.append(edge(rng.randint(1, raw_materials), rng.randint(1, 10)))
+        if rng.random() < catalyst_ratio:
+            catalyst = rng.randint(1, raw_materials)
+            ingredients.append(edge(catalyst, 1))
+            products.append(edge(catalyst, 1))
+        tiers[product_id] = min(5, 1 + max(tiers[ingredient['id']] for ingredient in ingredients))
+        items.append(product_id)
+        result.append({
+            'id': 1000000 + n,
+            'tier': tiers[product_id],
+            'time': rng.choice((10, 30, 60, 120, 300, 600, 3600)),
+            'nanocraftable': rng.random() < 0.2,
+            'ingredients': ingredients,
+            'products': products,
+        })
+    return result
@@ -0,0 +1,13 @@
+"""
+Dual Universe market and industry tools.
+
+    dugpt.ingest     game logs -> market orders -> OrderStore
+    dugpt.analyze    orders -> MarketSummary, reports, interactive plots
+    dugpt.render     headless chart images
+    dugpt.recipes    recipe costs, bills of materials, item lookups
+    dugpt.service    localhost HTTP/JSON queries over all of the above, kept warm
+
+Importing the package or a stage module is cheap: pandas is only imported
+by the stages that work on DataFrames, and matplotlib, seaborn, mplfinance,
+watchdog and requests only when something is plotted, followed or downloaded.
+"""
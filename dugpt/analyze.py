@@ -0,0 +1,500 @@
+import os
+import argparse
+import concurrent.futures
+
+import numpy as np
+import pandas as pd
+
+from datetime import datetime
+from typing import NamedTuple
+from dugpt.ingest import LogParser, process_all_log_files
+from dugpt.item_helper import ItemManager, get_default_catalog
+from dugpt.metrics import get_run_metrics, start_run, add_metrics_arguments, count
+from dugpt.order_store import OrderStore
+from dugpt.price_history import PriceHistory
+from dugpt.render import render_market_charts, volume_by_price
+
+# seaborn, matplotlib and mplfinance are only imported by the plot methods
+
+class MarketSummary(NamedTuple):
+    """Market statistics of one item, as shown on the plots."""
+    item_name: str
+    num_orders: int
+    mean_buy_price: float
+    mean_sell_price: float
+    highest_buy_order: float
+    lowest_sell_order: float
+    spread: float
+    mean_market_price: float
+    buy_quantity: int
+    sell_quantity: int
+    buy_value: float
+    sell_value: float
+    buy_mass: float
+    sell_mass: float
+
+def summarize_orders(df, item_masses=None):
+    """
+    Computes every MarketSummary statistic for every item in one grouped pass.
+
+    Args:
+        df (DataFrame): Processed orders with item_name, order_type, unit_price and buy_quantity.
+        item_masses (dict): item_name -> unit mass, masses are 0 when missing.
+
+    Returns:
+        DataFrame: One row per item, columns named like the MarketSummary fields.
+    """
+    stats = df.groupby(['item_name', 'order_type'], observed=True).agg(
+        mean_price=('unit_price', 'mean'),
+        max_price=('unit_price', 'max'),
+        min_price=('unit_price', 'min'),
+        price_sum=('unit_price', 'sum'),
+        count=('unit_price', 'size'),
+        quantity=('buy_quantity', 'sum'),
+    ).unstack('order_type')
+
+    def side(column, order_type, fill=np.nan):
+        if (column, order_type) in stats.columns:
+            return stats[(column, order_type)].fillna(fill)
+        return pd.Series(fill, index=stats.index, dtype=float)
+
+    summary = pd.DataFrame(index=stats.index)
+    buy_count = side('count', 'Buy', 0)
+    sell_count = side('count', 'Sell', 0)
+    summary['num_orders'] = (buy_count + sell_count).astype(int)
+    summary['mean_buy_price'] = side('mean_price', 'Buy')
+    summary['mean_sell_price'] = side('mean_price', 'Sell')
+    summary['highest_buy_order'] = side('max_price', 'Buy')
+    summary['lowest_sell_order'] = side('min_price', 'Sell')
+    summary['spread'] = summary['lowest_sell_order'] - summary['highest_buy_order']
+    summary['mean_market_price'] = (side('price_sum', 'Buy', 0) + side('price_sum', 'Sell', 0)) / summary['num_orders']
+    summary['buy_quantity'] = side('quantity', 'Buy', 0).astype(int)
+    summary['sell_quantity'] = side('quantity', 'Sell', 0).astype(int)
+    summary['buy_value'] = summary['buy_quantity'] * summary['mean_market_price']
+    summary['sell_value'] = summary['sell_quantity'] * summary['mean_market_price']
+    masses = summary.index.map(lambda name: (item_masses or {}).get(name, 0)).to_numpy(dtype=float)
+    summary['buy_mass'] = summary['buy_quantity'] * masses
+    summary['sell_mass'] = summary['sell_quantity'] * masses
+    return summary
+
+def market_summaries(df, item_masses=None):
+    # item_name -> MarketSummary
+    summary = summarize_orders(df, item_masses)
+    return {item_name: MarketSummary(item_name, **values) for item_name, values in summary.to_dict('index').items()}
+
+# Function to format y axis values
+def currency(x, pos):
+    'The two args are the value and tick position'
+    return '${:,.2f}'.format(x)
+
+class DataProcessor:
+    def __init__(self, item_name):
+        self.item_name = item_name
+
+        # Item Details
+        self.item_manager = ItemManager()
+        self.summary = None
+
+    def process_data(self, buy_orders, sell_orders, num_days=30, bid_min=1, bid_max=2500):
+        # Convert 'expiration_date' to datetime type, for testing old data apply an offset
+        buy_orders['expiration_date'] = pd.to_datetime(buy_orders['expiration_date']) # + pd.DateOffset(days=30)
+        sell_orders['expiration_date'] = pd.to_datetime(sell_orders['expiration_date'])
+
+        # First, add a new column 'order_type' to distinguish between buy and sell orders
+        buy_orders['order_type'] = 'Buy'
+        buy_orders['buy_quantity'] = abs(buy_orders['buy_quantity'])
+        sell_orders['order_type'] = 'Sell'
+        sell_orders['buy_quantity'] = abs(sell_orders['buy_quantity'])
+
+        # Combine the two dataframes
+        combined = pd.concat([buy_orders, sell_orders])
+
+        # Now we have df
+        self.df = combined
+
+        # Scale for plotting
+        self.df['unit_price'] = self.df['unit_price'] / 100
+
+        self.df = filter_orders(self.df, num_days, bid_min, bid_max)
+
+        # Get the ore tier
+        self.df['ore_tier'] = self.df['item_name'].map(ore_tiers)
+
+        # Adjust the bid_max based on the ore tier
+        self.df['bid_max'] = self.df['ore_tier'].map({1: bid_max, 2: bid_max * 2, 3: bid_max * 3})
+
+        self.summary = None
+        return self.df
+
+    def process_batch(self, orders, num_days=30, bid_min=1, bid_max=2500):
+        """
+        process_data straight from an OrderBatch, the frames share the batch's arrays.
+
+        Args:
+            orders (OrderBatch): Deduplicated orders of this item, both sides.
+            num_days (int): Keep orders expiring within this many days.
+            bid_min (float): Lowest unit price kept.
+            bid_max (float): Highest unit price kept.
+
+        Returns:
+            DataFrame: Same as process_data.
+        """
+        return self.process_data(orders.buy().to_frame(), orders.sell().to_frame(), num_days, bid_min, bid_max)
+
+    def summarize(self):
+        """
+        Every market statistic of this item, computed once per process_data.
+
+        Returns:
+            MarketSummary: Prices are in dollars, values and masses unscaled.
+        """
+        count('summarize', 'cache_hits' if self.summary is not None else 'cache_misses')
+        if self.summary is None:
+            item_masses = {self.item_name: self.item_manager.lookup_item_mass(self.item_name)}
+            df = self.df.assign(item_name=self.item_name)
+            self.summary = market_summaries(df, item_masses).get(self.item_name)
+            if self.summary is None:
+                # No orders left after filtering
+                self.summary = MarketSummary(self.item_name, 0, *([np.nan] * 6), 0, 0, 0.0, 0.0, 0.0, 0.0)
+        return self.summary
+
+    def mean_buy_price(self):
+        return self.summarize().mean_buy_price
+
+    def mean_sell_price(self):
+        return self.summarize().mean_sell_price
+
+    def highest_buy_order(self):
+        return self.summarize().highest_buy_order
+
+    def lowest_sell_order(self):
+        return self.summarize().lowest_sell_order
+
+    def mean_market_price(self):
+        return self.summarize().mean_market_price
+
+    def calculate_market_mass(self, order_type):
+        summary = self.summarize()
+        return summary.buy_mass if order_type == 'Buy' else summary.sell_mass
+
+    def calculate_market_value(self, order_type):
+        summary = self.summarize()
+        return summary.buy_value if order_type == 'Buy' else summary.sell_value
+
+    def plot_data(self, show=True):
+        import seaborn as sns
+        from matplotlib import pyplot as plt
+        from matplotlib.ticker import FuncFormatter
+
+        plt.figure(figsize=(12, 6))
+        ax = sns.barplot(data=self.df, x='buy_quantity', y='unit_price', hue='order_type')
+        ax.yaxis.set_major_formatter(FuncFormatter(currency))
+
+        # Set x-axis to logarithmic scale
+        # sns.set_style("whitegrid")
+        # plt.xscale("log")
+
+        # Setting the x-axis format
+        plt.xlabel('Volume')
+        ax.set_ylabel('Unit Price')
+
+        # Set the Grid
+        ax.grid = True
+
+        # Limiting the number of x-axis labels
+        x = self.df['buy_quantity']
+        max_labels = 10  # Maximum number of labels to show
+        label_indices = range(0, len(x), len(x)//max_labels)
+        plt.xticks(label_indices)
+
+        # Calculate and display total value for each order type
+        summary = self.summarize()
+        buy_value = summary.buy_value
+        sell_value = summary.sell_value
+        sell_mass = summary.sell_mass
+        buy_value /= 1000 # hundred-thousand
+        buy_value /= 1000 # millions
+        #buy_value /= 1000 # billions
+        sell_value /= 1000 # thousand
+        sell_value /= 1000 # million
+        #sell_value /= 1000 # billion
+        sell_mass /= 1000 # K
+        sell_mass /= 1000 # Meta
+        #sell_mass /= 1000 # Giga
+
+        # Maths
+        ## Summary
+        plt.text(0.75, 0.45, f'Lowest Sell Order: ${summary.lowest_sell_order:,.2f}', transform=ax.transAxes, fontsize=12, fontweight='bold')
+        plt.text(0.75, 0.50, f'Highest Buy Order: ${summary.highest_buy_order:,.2f}', transform=ax.transAxes, fontsize=12, fontweight='bold')
+        
+        plt.text(0.75, 0.35, f'Mean Buy Price ${summary.mean_buy_price:,.2f}', transform=ax.transAxes, fontsize=10)
+        plt.text(0.75, 0.30, f'Mean Sell Price : ${summary.mean_sell_price:,.2f}', transform=ax.transAxes, fontsize=10)
+        plt.text(0.75, 0.25, f'Mean Price (All) ${summary.mean_market_price:,.2f}', transform=ax.transAxes, fontsize=10) 
+        plt.text(0.75, 0.20, f'Total Value (Buy): ${buy_value:,.2f}', transform=ax.transAxes, fontsize=10)
+        plt.text(0.75, 0.15, f'Total Value (Sell): ${sell_value:,.2f}', transform=ax.transAxes, fontsize=10)
+        plt.text(0.75, 0.10, f'Total Mass (Sell): {sell_mass:,.4f} tons', transform=ax.transAxes, fontsize=10)
+        plt.text(0.75, 0.05, f'Units in (Billions, Megatons)', transform=ax.transAxes, fontsize=10)
+
+        # Adding labels and title
+        today = datetime.today().strftime("%Y-%m-%d")
+        num_data_points = summary.num_orders
+        plt.title(f'All Markets : Unit price of Buy and Sell Orders : {self.item_name}\nDate of Analysis: {today} Sample Pop : {num_data_points}')
+        
+        if show:
+            plt.show()
+
+    def plot_history(self, bars, show=True):
+        """
+        Candlesticks and volume from precomputed bars.
+
+        Args:
+            bars (DataFrame): Bars of this item, as read from the PriceHistory.
+            show (bool): Show the figure once drawn.
+        """
+        from matplotlib import pyplot as plt
+        from matplotlib.dates import DateFormatter, date2num
+        from matplotlib.ticker import FuncFormatter
+        from mplfinance.original_flavor import candlestick_ohlc
+
+        fig, (ax, volume_ax) = plt.subplots(2, 1, figsize=(12, 6), sharex=True, gridspec_kw={'height_ratios': [3, 1]})
+
+        # Candles are as wide as their interval, minus a gap
+        times = date2num(pd.to_datetime(bars['time']))
+        width = 0.8 * (np.min(np.diff(times)) if len(times) > 1 else 1)
+        quotes = zip(times, bars['open'] / 100, bars['high'] / 100, bars['low'] / 100, bars['close'] / 100)
+        candlestick_ohlc(ax, quotes, width=width, colorup='g', colordown='r')
+        volume_ax.bar(times, bars['volume'], width=width)
+
+        ax.yaxis.set_major_formatter(FuncFormatter(currency))
+        ax.set_ylabel('Unit Price')
+        volume_ax.set_ylabel('Volume')
+        volume_ax.xaxis.set_major_formatter(DateFormatter('%Y-%m-%d'))
+        ax.set_title(f'All Markets : Price history : {self.item_name}')
+        fig.autofmt_xdate()
+
+        if show:
+            plt.show()
+
+def filter_orders(df, num_days=30, bid_min=1, bid_max=2500):
+    """
+    Drops silly prices and expired orders, adds expires_in_days.
+
+    Args:
+        df (DataFrame): Orders with unit_price in dollars and expiration_date.
+        num_days (int): Keep orders that expired less than this many days ago.
+        bid_min (float): Lowest sensible unit price.
+        bid_max (float or Series): Highest sensible unit price, per row when a Series.
+
+    Returns:
+        DataFrame: The orders that are left.
+    """
+    current_time = pd.Timestamp.now()
+    expiration_limit = current_time - pd.DateOffset(days=num_days)
+
+    # Filter Stupid Players and expired orders in one mask
+    keep = (df['unit_price'] < bid_max) & (df['unit_price'] > bid_min) & (df['expiration_date'] > expiration_limit)
+    df = df[keep].copy()
+    df['expires_in_days'] = df['expiration_date'] - current_time
+    return df
+
+def tier_bid_max(tier):
+    # Determine the bid_max based on the ore tier
+    return TIER_BID_MAX.get(tier, DEFAULT_BID_MAX)
+
+def process_all_items(orders, num_days=10, bid_min=1):
+    """
+    Batch analytics: what process_data does for one item, for every item at once.
+
+    Args:
+        orders (DataFrame): Orders of every item, as read from the OrderStore.
+        num_days (int): Keep orders that expired less than this many days ago.
+        bid_min (float): Lowest sensible unit price.
+
+    Returns:
+        DataFrame: The processed orders of every item, with ore_tier and bid_max per row.
+    """
+    df = orders.copy()
+    df['expiration_date'] = pd.to_datetime(df['expiration_date'])
+    df['buy_quantity'] = df['buy_quantity'].abs()
+
+    # Scale for plotting
+    df['unit_price'] = df['unit_price'] / 100
+
+    # Each row gets its tier's bid_max, unknown items count as tier 1
+    df['ore_tier'] = df['item_name'].map(ore_tiers).astype(float).fillna(1).astype(int)
+    df['bid_max'] = df['ore_tier'].map(tier_bid_max)
+
+    return filter_orders(df, num_days, bid_min, df['bid_max'])
+
+def market_report(item_names, store, num_days=10, bid_min=1):
+    """
+    Nightly report: summary, spread and market mass of every item in a few grouped operations.
+
+    Args:
+        item_names (list): Items to report on.
+        store (OrderStore): Where the parsed orders are.
+        num_days (int): Keep orders that expired less than this many days ago.
+        bid_min (float): Lowest sensible unit price.
+
+    Returns:
+        DataFrame: One row per item, columns named like the MarketSummary fields.
+    """
+    with get_run_metrics().stage('report'):
+        df = process_all_items(store.read(item_names), num_days, bid_min)
+        count('report', 'records', len(df))
+        return summarize_orders(df, lookup_item_masses(item_names))
+
+def lookup_item_masses(item_names):
+    item_manager = ItemManager()
+    return {item_name: item_manager.lookup_item_mass(item_name) for item_name in item_names}
+
+def render_report(item_names, store, output_directory, image_format='png', workers=None, num_days=10, bid_min=1):
+    """
+    Headless batch mode: one chart per item, rendered in parallel.
+
+    Args:
+        item_names (list): Items to chart.
+        store (OrderStore): Where the parsed orders are.
+        output_directory (str): Where to write the images.
+        image_format (str): 'png' or 'svg'.
+        workers (int): Worker processes, one per CPU when None.
+
+    Returns:
+        list: Paths of the written images.
+    """
+    metrics = get_run_metrics()
+    with metrics.stage('report'):
+        df = process_all_items(store.read(item_names), num_days, bid_min)
+        count('report', 'records', len(df))
+        summaries = summarize_orders(df, lookup_item_masses(item_names)).to_dict('index')
+        volumes = {item_name: volume_by_price(orders) for item_name, orders in df.groupby('item_name', observed=True)}
+    with metrics.stage('render'):
+        paths = render_market_charts(volumes, summaries, output_directory, image_format, workers)
+        count('render', 'items', len(paths))
+    return paths
+
+def process_item(item, ParseLogs=True, ShowPlots=True, Pickle=False, store=None):
+    # Parse Log Files
+    if ParseLogs:
+        LogParser(item_name=item)
+
+    # Setup Visualizer
+    data_processor = DataProcessor(item)
+
+    # Read Data
+    metrics = get_run_metrics()
+    with metrics.stage('store_read'):
+        orders = (store or OrderStore()).read([item])
+        buy_orders = orders[orders['order_type'] == 'Buy'].copy()
+        sell_orders = orders[orders['order_type'] == 'Sell'].copy()
+        count('store_read', 'records', len(orders))
+
+    # Get the ore tier
+    ore_tier = ore_tiers.get(item, 1)
+    _max = tier_bid_max(ore_tier)
+
+    with metrics.stage('process_data'):
+        df = data_processor.process_data(buy_orders, sell_orders, num_days=10, bid_min=1, bid_max=_max)
+        count('process_data', 'records', len(orders))
+        count('process_data', 'records_kept', len(df))
+
+    # Razzle Dazzle
+    if ShowPlots:
+        with metrics.stage('plot'):
+            data_processor.plot_data()
+
+    # Pickle the dataframe and its summary
+    if Pickle:
+        temp_name = item.replace(" ", "_")
+        df.to_pickle(f'data\\pickle\\{temp_name}.pickle')
+        pd.to_pickle(data_processor.summarize(), f'data\\pickle\\{temp_name}_summary.pickle')
+
+
+## Main ###
+item_names = [
+    'Columbite', 'Ilmenite', 'Rhodonite', 'Vanadinite',
+    'Cobaltite', 'Cryolite', 'Gold nuggets', 'Kolbeckite',
+    'Acanthite', 'Garnierite', 'Petalite', 'Pyrite',
+    'Chromite', 'Limestone', 'Malachite',
+    'Hematite', 'Quartz', 'Coal', 'Bauxite'
+]
+
+# Define the ore tiers
+ore_tiers = {
+    'Hematite': 1, 'Quartz': 1, 'Coal': 1, 'Bauxite': 1,
+    'Chromite': 2, 'Limestone': 2, 'Malachite': 2,
+    'Acanthite': 3, 'Garnierite': 3, 'Petalite': 3, 'Pyrite': 3,
+    'Cobaltite': 4, 'Cryolite': 4, 'Gold nuggets': 4, 'Kolbeckite': 4,
+    'Columbite': 5, 'Ilmenite': 5, 'Rhodonite': 5, 'Vanadinite': 5
+}
+
+# Highest sensible unit price per ore tier
+TIER_BID_MAX = {1: 250, 2: 500}
+DEFAULT_BID_MAX = 5000
+
+def main(argv=None):
+    # Argument parsing
+    parser = argparse.ArgumentParser(description='Process item data.')
+    parser.add_argument('--parse-logs', dest='parse_logs', action='store_true', help='Parse log files, every item in one pass')
+    parser.add_argument('--no-parse-logs', dest='parse_logs', action='store_false', help='Do not parse log files')
+    parser.add_argument('--no-show-plots', dest='show_plots', action='store_false', help='Do not show plots')
+    parser.add_argument('--csv', dest='write_csv', action='store_true', help='Also export the parsed orders as CSV files')
+    parser.add_argument('--workers', type=int, default=None, help='Processes for parsing logs (default 1) and rendering charts (default one per CPU)')
+    parser.add_argument('--report', dest='report', action='store_true', help='Summarize every ore at once instead of plotting one by one')
+    parser.add_argument('--history', dest='history', action='store_true', help='Update the price bars and plot 30 days of history per ore')
+    parser.add_argument('--render', metavar='DIRECTORY', help='Write one chart per ore to this directory without opening any window')
+    parser.add_argument('--format', dest='image_format', choices=['png', 'svg'], default='png', help='Image format for --render')
+    parser.add_argument('--refresh-items', dest='refresh_items', action='store_true', help='Revalidate the cached items.json against GitHub')
+    add_metrics_arguments(parser)
+    parser.set_defaults(parse_logs=False, show_plots=True)
+    args = parser.parse_args(argv)
+
+    metrics = start_run(profile=args.profile, trace_memory=args.trace_memory)
+    try:
+        # Parsed market orders, partitioned by item and day, and the OHLCV bars updated from them
+        run(args, OrderStore(), PriceHistory())
+    finally:
+        if args.metrics:
+            print(f"Metrics written to {metrics.write_report(args.metrics)}")
+
+def run(args, order_store, price_history):
+    metrics = get_run_metrics()
+
+    if args.refresh_items:
+        get_default_catalog().refresh()
+
+    # Parse Log Files, one pass over the logs extracts every item
+    if args.parse_logs:
+        process_all_log_files(item_names, workers=args.workers or 1, store=order_store, write_csv=args.write_csv)
+
+    # Create a ThreadPoolExecutor
+    MultiThread = False
+    if args.history:
+        with metrics.stage('history'):
+            price_history.update(item_names, order_store)
+        since = pd.Timestamp.now() - pd.DateOffset(days=30)
+        for _item in item_names:
+            bars = price_history.read(_item, '1D', since=since)
+            if len(bars):
+                with metrics.stage('plot'):
+                    DataProcessor(_item).plot_history(bars, args.show_plots)
+    elif args.render:
+        for path in render_report(item_names, order_store, args.render, args.image_format, args.workers):
+            print(path)
+    elif args.report:
+        report = market_report(item_names, order_store)
+        print(report.to_string())
+        report.to_csv(os.path.join('data', 'market_report.csv'))
+    elif MultiThread:
+        with concurrent.futures.ThreadPoolExecutor() as executor:
+            # Submit tasks for each item
+            futures = [executor.submit(process_item, item, False, args.show_plots, store=order_store) for item in item_names]
+
+            # Wait for all tasks to complete
+            concurrent.futures.wait(futures)
+    else:
+        for _item in item_names:
+            process_item(_item, False, args.show_plots, store=order_store)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,641 @@
+import os
+import csv
+import sys
+import json
+import argparse
+import threading
+import concurrent.futures
+
+from dugpt.item_helper import get_default_catalog
+from dugpt.lexer import MarketOrderLexer, MARKET_ORDER_MARKER
+from dugpt.log_index import LogIndex, build_log_indexes
+from dugpt.metrics import get_run_metrics, start_run, add_metrics_arguments, Progress
+
+# numpy/pandas (OrderStore), watchdog and matplotlib are imported where they are used,
+# so parsing a log does not pay for them up front
+
+# Read logs 1 MiB at a time, a single record is never anywhere near this long
+CHUNK_SIZE = 1024 * 1024
+MAX_RECORD_SIZE = 64 * 1024
+
+def iter_market_order_chunks(file_path, chunk_size=CHUNK_SIZE, item_types=None):
+    """
+    Streams the market orders out of a log file, a chunk's worth at a time.
+
+    The file is read in fixed-size chunks so memory stays flat no matter how
+    big the log is. A record cut in half by a chunk boundary is carried over
+    and matched once the rest of it has been read.
+
+    Args:
+        file_path (str): The log file to scan.
+        chunk_size (int): How many bytes to read at a time.
+        item_types (set): Only yield orders for these item types, all when None.
+
+    Yields:
+        list: The lexer tuples of the records completed by each chunk.
+    """
+    lexer = MarketOrderLexer()
+    with open(file_path, 'rb') as log_file:
+        carry = b''
+        while True:
+            chunk = log_file.read(chunk_size)
+            buffer = carry + chunk
+            market_orders, end = lexer.lex(buffer, item_types=item_types)
+            if market_orders:
+                yield market_orders
+
+            if not chunk:
+                break
+
+            # Keep whatever might be the start of a record we haven't seen the end of
+            start = buffer.rfind(MARKET_ORDER_MARKER, end)
+            if start == -1:
+                start = max(end, len(buffer) - len(MARKET_ORDER_MARKER) + 1)
+            carry = buffer[start:]
+            if len(carry) > MAX_RECORD_SIZE:
+                # Not a record, just noise
+                carry = carry[-(len(MARKET_ORDER_MARKER) - 1):]
+
+def iter_market_orders(file_path, chunk_size=CHUNK_SIZE, item_types=None, item_ids=None):
+    """
+    Streams the market orders out of a log file, a batch per chunk.
+
+    Args:
+        file_path (str): The log file to scan.
+        chunk_size (int): How many bytes to read at a time.
+        item_types (set): Only yield orders for these item types, all when None.
+        item_ids (dict): item_type -> item_name, item codes are left at -1 when None.
+
+    Yields:
+        OrderBatch: The orders of the records completed by each chunk.
+    """
+    from dugpt.order_batch import OrderBatch
+
+    for market_orders in iter_market_order_chunks(file_path, chunk_size, item_types):
+        yield OrderBatch.from_orders(market_orders, item_ids)
+
+# Where the game writes its logs and where we put the extracted orders
+LOG_DIRECTORY = r'%localappdata%\NQ\DualUniverse\log'
+CSV_DIRECTORY = os.path.join('data', 'csv')
+MARKET_ORDER_FIELDS = ['market_id', 'order_id', 'item_type', 'buy_quantity', 'expiration_date', 'update_date', 'unit_price', 'item_name']
+
+def get_log_files(log_directory=LOG_DIRECTORY):
+    log_directory = os.path.expandvars(log_directory)
+    log_files = os.listdir(log_directory)
+    print(f"Log files:")
+    for lf in log_files: print(f"{lf}")
+    return [os.path.join(log_directory, log_file) for log_file in log_files]
+
+def update_order_index(order_index, market_order):
+    """
+    Keeps the latest snapshot of every order, keyed by (market_id, order_id).
+
+    The same order is logged again on every market refresh, the one with the
+    newest updateDate wins. Ties go to the later sighting.
+
+    Nothing in the pipeline calls this any more, OrderBatch.latest and
+    OrderBatch.update do the same in bulk. It stays as the plain reference
+    the tests and bench_pipeline check those against.
+
+    Args:
+        order_index (dict): (market_id, order_id) -> market order, updated in place.
+        market_order (dict): The order that was just parsed.
+
+    Returns:
+        bool: True when market_order is new or changed the stored snapshot.
+    """
+    key = (market_order['market_id'], market_order['order_id'])
+    current = order_index.get(key)
+    if current is not None and (market_order['update_date'] < current['update_date'] or market_order == current):
+        return False
+    order_index[key] = market_order
+    return True
+
+def resolve_item_ids(item_names, catalog):
+    # Look Up Item Ids, item_type -> item_name
+    item_ids = {}
+    missing = []
+    for item_name in item_names:
+        item_id = catalog.lookup_id(item_name)
+        if item_id is None:
+            missing.append(item_name)
+        else:
+            item_ids[item_id] = item_name
+
+    # Names that are not spelled exactly like items.json go through the search index together
+    for item_name, item in catalog.resolve_names(missing).items():
+        if item is None:
+            print(f"Unable to find {item_name} in items.json")
+        else:
+            item_ids[item['id']] = item_name
+    return item_ids
+
+def read_log_orders(log_file_path, item_types=None, market_ids=None):
+    """
+    The market orders of some items or markets in one log file.
+
+    With an index the log only has to be read where those records are, a
+    log that grew since it was indexed is indexed up to its new end first.
+    Without one, or when the log was replaced, the whole file is scanned.
+
+    Args:
+        log_file_path (str): The log file.
+        item_types (set): Item types to extract, any when None.
+        market_ids (set): Market ids to extract, any when None.
+
+    Returns:
+        tuple: (iterable of lists of lexer tuples, bytes read)
+    """
+    log_index = LogIndex.open(log_file_path, build=False)
+    if log_index is not None:
+        return log_index.market_order_chunks(item_types, market_ids)
+
+    chunks = iter_market_order_chunks(log_file_path, item_types=item_types)
+    if market_ids is not None:
+        chunks = ([market_order for market_order in market_orders if market_order[0] in market_ids] for market_orders in chunks)
+    return chunks, os.path.getsize(log_file_path)
+
+def find_market_orders(log_files, item_types=None, market_ids=None):
+    """
+    Ad-hoc lookup: every logged snapshot of some items or markets, through the log indexes.
+
+    Args:
+        log_files (list): Paths of the log files.
+        item_types (set): Item types to extract, any when None.
+        market_ids (set): Market ids to extract, any when None.
+
+    Returns:
+        OrderBatch: The orders in log order, item codes not assigned.
+    """
+    from dugpt.order_batch import OrderBatch
+
+    batches = []
+    for log_file_path in log_files:
+        chunks, _ = read_log_orders(log_file_path, item_types, market_ids)
+        batches.extend(OrderBatch.from_orders(market_orders) for market_orders in chunks)
+    return OrderBatch.concat(batches)
+
+def extract_market_orders(item_names, catalog, log_files):
+    """
+    Scans every log file once and routes each market order to its item.
+
+    Args:
+        item_names (list): displayNameWithSize of every item we want to inspect.
+        catalog (ItemCatalog): items.json, indexed.
+        log_files (list): Paths of the log files to scan.
+
+    Returns:
+        dict: item_name -> {'buy': OrderBatch, 'sell': OrderBatch}
+    """
+    # numpy only loads once orders are parsed, importing ingest stays cheap
+    from dugpt.order_batch import OrderBatch
+
+    item_ids = resolve_item_ids(item_names, catalog)
+    item_types = set(item_ids)
+
+    # For print status, redrawn at most twice a second
+    metrics = get_run_metrics()
+    progress = Progress("Orders Processed")
+
+    # Every sighting goes into typed columns as it is parsed, no dict per order
+    batches = []
+    for log_file_path in log_files:
+        processed = 0
+        with metrics.stage('scan'):
+            # Only a file we can't read is skipped, chunks read lazily so the loop is covered too
+            try:
+                # Orders for other items are dropped by the lexer before they are converted,
+                # indexed logs are only read where those items are
+                chunks, read = read_log_orders(log_file_path, item_types)
+                metrics.count('scan', 'bytes', read)
+                for market_orders in chunks:
+                    batches.append(OrderBatch.from_orders(market_orders))
+                    processed += len(market_orders)
+                    progress.update(len(market_orders))
+
+            except OSError as error:
+                print(f"Unable to read {log_file_path}: {error}")
+        metrics.count('scan', 'records', processed)
+    progress.close()
+
+    return latest_by_item(batches, item_ids)
+
+def latest_by_item(batches, item_ids):
+    # Shared by the serial and parallel extractors: item codes for every sighting,
+    # only the latest snapshot of each order, then split per item into buy and sell
+    from dugpt.order_batch import OrderBatch
+
+    metrics = get_run_metrics()
+    with metrics.stage('dedup'):
+        batch = OrderBatch.concat(batches).with_items(item_ids)
+        latest = batch.latest()
+        metrics.count('dedup', 'records', len(batch))
+        metrics.count('dedup', 'changed', len(latest))
+        return {item_name: orders.split() for item_name, orders in latest.by_item().items()}
+
+# Large log files are split into ranges of this size so one file can use several workers
+RANGE_SIZE = 32 * 1024 * 1024
+
+def split_log_files(log_files, range_size=RANGE_SIZE):
+    # (file_path, start, end) for every byte range to parse
+    tasks = []
+    for log_file_path in log_files:
+        try:
+            size = os.path.getsize(log_file_path)
+        except OSError as error:
+            print(f"Unable to read {log_file_path}: {error}")
+            continue
+        for start in range(0, max(size, 1), range_size):
+            tasks.append((log_file_path, start, min(start + range_size, size)))
+    return tasks
+
+def parse_log_range(file_path, start, end, item_types=None, chunk_size=CHUNK_SIZE):
+    """
+    Worker: parses the lines of a log file that start inside [start, end).
+
+    A line crossing end belongs to this range, a line crossing start belongs
+    to the previous one, so neighbouring ranges never share a record.
+
+    Args:
+        file_path (str): The log file to read.
+        start (int): First byte of the range.
+        end (int): First byte after the range.
+        item_types (set): Only keep orders for these item types, all when None.
+        chunk_size (int): How many bytes to read at a time.
+
+    Returns:
+        OrderBatch: The orders, item codes not assigned yet. Arrays pickle far smaller
+        than a tuple or dict per order.
+    """
+    from dugpt.order_batch import OrderBatch
+
+    batches = []
+    lexer = MarketOrderLexer()
+
+    def collect(buffer, stop):
+        batches.append(OrderBatch.from_orders(lexer.lex(buffer, stop, item_types)[0]))
+
+    try:
+        with open(file_path, 'rb') as log_file:
+            if start > 0:
+                # Skip the rest of the line the previous range owns
+                log_file.seek(start - 1)
+                log_file.readline()
+            buffer_start = log_file.tell()
+            carry = b''
+            while buffer_start < end:
+                chunk = log_file.read(chunk_size)
+                if not chunk:
+                    collect(carry, len(carry))
+                    break
+                buffer = carry + chunk
+                cut = buffer.rfind(b'\n') + 1
+                limit = end - buffer_start
+                if 0 < limit <= cut:
+                    # The range ends in here, finish the line it ends on
+                    collect(buffer, buffer.find(b'\n', limit - 1) + 1)
+                    break
+                collect(buffer, cut)
+                carry = buffer[cut:]
+                buffer_start += cut
+    except OSError as error:
+        # Keep what was parsed before the read failed
+        print(f"Unable to read {file_path}: {error}")
+
+    return OrderBatch.concat(batches)
+
+def extract_market_orders_parallel(item_names, catalog, log_files, workers=None, range_size=RANGE_SIZE):
+    """
+    Same as extract_market_orders, with the parsing farmed out to a process pool.
+
+    Args:
+        item_names (list): displayNameWithSize of every item we want to inspect.
+        catalog (ItemCatalog): items.json, indexed.
+        log_files (list): Paths of the log files to scan.
+        workers (int): Number of worker processes, one per CPU when None.
+        range_size (int): Files larger than this are split across workers.
+
+    Returns:
+        dict: item_name -> {'buy': OrderBatch, 'sell': OrderBatch}
+    """
+    item_ids = resolve_item_ids(item_names, catalog)
+    item_types = set(item_ids)
+    tasks = split_log_files(log_files, range_size)
+    metrics = get_run_metrics()
+    progress = Progress("Ranges Parsed", total=len(tasks))
+
+    # Ranges come back in file order, so later sightings stay later in the merged batch
+    batches = []
+    with metrics.stage('scan'), concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        metrics.count('scan', 'bytes', sum(end - start for _, start, end in tasks))
+        futures = [executor.submit(parse_log_range, file_path, start, end, item_types) for file_path, start, end in tasks]
+        for future in futures:
+            batches.append(future.result())
+            progress.update()
+    progress.close()
+    metrics.count('scan', 'records', sum(map(len, batches)))
+
+    return latest_by_item(batches, item_ids)
+
+def market_orders_csv_path(item_name, sell_orders=True):
+    filename = item_name.replace(" ", "_") + '_market_orders.csv'
+    if sell_orders:
+        filename = "sell_" + filename
+    else:
+        filename = "buy_" + filename
+    # Now in data folder
+    return os.path.join(CSV_DIRECTORY, filename)
+
+def write_market_orders_to_csv(market_orders, item_name, sell_orders=True, append=False):
+    # market_orders is an OrderBatch with item codes assigned
+    # append=True adds rows to the existing file, readers keep the last row of each (market_id, order_id)
+    filename = market_orders_csv_path(item_name, sell_orders)
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    write_header = not (append and os.path.exists(filename))
+
+    with open(filename, 'a' if append else 'w', newline='') as file:
+        writer = csv.writer(file)
+        if write_header:
+            writer.writerow(MARKET_ORDER_FIELDS)
+        writer.writerows(market_orders.rows(MARKET_ORDER_FIELDS))
+
+    print(f"Market orders data written to {filename}")
+
+def process_all_log_files(item_names, catalog=None, log_directory=LOG_DIRECTORY, workers=1, store=None, write_csv=False, index=False):
+    """
+    Batch mode: one read of the logs stores the buy and sell orders of every item.
+
+    Args:
+        item_names (list): displayNameWithSize of every item we want to inspect.
+        catalog (ItemCatalog): items.json, the shared cached catalog when not given.
+        log_directory (str): Where the game logs live.
+        workers (int): Parse with a process pool of this size when more than 1.
+        store (OrderStore): Where the orders go, data/orders when not given.
+        write_csv (bool): Also export the per-item buy and sell CSVs.
+        index (bool): Build or update the sidecar index of every log first, so this and
+            later extractions only read the parts of the logs they need.
+
+    Returns:
+        dict: item_name -> {'buy': OrderBatch, 'sell': OrderBatch}
+    """
+    from dugpt.order_batch import OrderBatch
+
+    if catalog is None:
+        catalog = get_default_catalog()
+    if store is None:
+        from dugpt.order_store import OrderStore
+        store = OrderStore()
+
+    metrics = get_run_metrics()
+    with metrics.stage('ingest'):
+        log_files = get_log_files(log_directory)
+        if index:
+            with metrics.stage('index'):
+                metrics.count('index', 'bytes', sum(build_log_indexes(log_files).values()))
+        if workers > 1:
+            buckets = extract_market_orders_parallel(item_names, catalog, log_files, workers)
+        else:
+            buckets = extract_market_orders(item_names, catalog, log_files)
+
+        for item_name, orders in buckets.items():
+            with metrics.stage('store_append'):
+                metrics.count('store_append', 'records', store.append(OrderBatch.concat([orders['buy'], orders['sell']])))
+            if write_csv:
+                with metrics.stage('csv_write'):
+                    write_market_orders_to_csv(orders['sell'], item_name, sell_orders=True)
+                    write_market_orders_to_csv(orders['buy'], item_name, sell_orders=False)
+                    metrics.count('csv_write', 'records', len(orders['sell']) + len(orders['buy']))
+    return buckets
+
+def read_appended_orders(file_path, offset=0, chunk_size=CHUNK_SIZE):
+    """
+    Parses the complete lines written to a log file after offset.
+
+    A record never spans a newline, so stopping at the last newline is safe:
+    a half-written line is left for the next call.
+
+    Args:
+        file_path (str): The log file to read.
+        offset (int): Where the last call stopped.
+        chunk_size (int): How many bytes to read at a time.
+
+    Returns:
+        tuple: (OrderBatch of the orders, item codes not assigned yet, offset to resume from)
+    """
+    from dugpt.order_batch import OrderBatch
+
+    batches = []
+    lexer = MarketOrderLexer()
+    with open(file_path, 'rb') as log_file:
+        log_file.seek(offset)
+        carry = b''
+        while True:
+            chunk = log_file.read(chunk_size)
+            if not chunk:
+                break
+            buffer = carry + chunk
+            cut = buffer.rfind(b'\n') + 1
+            if cut == 0 and len(buffer) > MAX_RECORD_SIZE:
+                # No newline in sight, parse it as is rather than buffering forever
+                cut = len(buffer)
+            batches.append(OrderBatch.from_orders(lexer.lex(buffer, cut)[0]))
+            offset += cut
+            carry = buffer[cut:]
+    return OrderBatch.concat(batches), offset
+
+DEFAULT_CHECKPOINT_FILE = os.path.join('data', 'log_checkpoints.json')
+
+class LogFollower:
+    """
+    Follows the log directory, parsing only what was appended since the last poll.
+
+    Each log file has a checkpoint of (inode, byte offset). A file whose inode
+    changed or that got shorter was replaced, and is read again from the start.
+    Only orders that are new or have a newer updateDate are appended to the store,
+    and to the order books when they are given.
+    """
+    def __init__(self, item_names, catalog=None, log_directory=LOG_DIRECTORY, checkpoint_file=DEFAULT_CHECKPOINT_FILE, debounce=1.0, store=None, books=None):
+        if catalog is None:
+            catalog = get_default_catalog()
+        if store is None:
+            from dugpt.order_store import OrderStore
+            store = OrderStore()
+        self.store = store
+        self.books = books
+        self.item_ids = resolve_item_ids(item_names, catalog)
+        self.latest = None
+        self.log_directory = os.path.expandvars(log_directory)
+        self.checkpoint_file = checkpoint_file
+        self.debounce = debounce
+        self.checkpoints = {}
+        if checkpoint_file and os.path.exists(checkpoint_file):
+            with open(checkpoint_file) as file:
+                self.checkpoints = json.load(file)
+
+    def save_checkpoints(self):
+        if not self.checkpoint_file:
+            return
+        os.makedirs(os.path.dirname(self.checkpoint_file) or '.', exist_ok=True)
+        with open(self.checkpoint_file, 'w') as file:
+            json.dump(self.checkpoints, file)
+
+    def poll(self):
+        """
+        Reads the new bytes of every log file and stores the new or changed orders.
+
+        Returns:
+            int: How many orders were stored.
+        """
+        from dugpt.order_batch import OrderBatch
+
+        if self.latest is None:
+            # The newest snapshot of every order seen so far
+            self.latest = OrderBatch.empty().with_items(self.item_ids)
+        batches = []
+        for log_file in os.listdir(self.log_directory):
+            log_file_path = os.path.join(self.log_directory, log_file)
+            try:
+                stat = os.stat(log_file_path)
+                checkpoint = self.checkpoints.get(log_file_path)
+                offset = 0
+                if checkpoint and checkpoint['inode'] == stat.st_ino and checkpoint['offset'] <= stat.st_size:
+                    offset = checkpoint['offset']
+                if offset == stat.st_size:
+                    continue
+
+                batch, offset = read_appended_orders(log_file_path, offset)
+                self.checkpoints[log_file_path] = {'inode': stat.st_ino, 'offset': offset}
+            except OSError as error:
+                print(f"Unable to read {log_file_path}: {error}")
+                continue
+            batches.append(batch)
+
+        batch = OrderBatch.concat(batches).with_items(self.item_ids)
+        self.latest, changed = self.latest.update(batch.take(batch.item_code >= 0))
+
+        metrics = get_run_metrics()
+        metrics.count('follow', 'records', len(changed))
+        with metrics.stage('store_append'):
+            stored = self.store.append(changed)
+        if self.books is not None:
+            self.books.apply(changed)
+            self.books.expire()
+
+        self.save_checkpoints()
+        return stored
+
+    def run(self):
+        """
+        Polls once, then again after every burst of watchdog events, until Ctrl+C.
+        """
+        from watchdog.observers import Observer
+        from watchdog.events import FileSystemEventHandler
+
+        self.poll()
+
+        modified = threading.Event()
+
+        # Watchdog event handler to detect changes in the log directory
+        class LogFileEventHandler(FileSystemEventHandler):
+            def on_modified(self, event):
+                modified.set()
+
+            def on_created(self, event):
+                modified.set()
+
+        # Set up the watchdog observer
+        observer = Observer()
+        observer.schedule(LogFileEventHandler(), path=self.log_directory, recursive=False)
+        observer.start()
+
+        # Block until something happens, then wait for the burst to settle before parsing
+        try:
+            while True:
+                modified.wait()
+                modified.clear()
+                while modified.wait(self.debounce):
+                    modified.clear()
+                stored = self.poll()
+                print(f"Stored {stored} new or updated orders")
+        except KeyboardInterrupt:
+            observer.stop()
+
+        observer.join()
+
+class LogParser():
+    def __init__(self, sell_orders = True, item_name = "Hematite", enable_watch_dog = False):
+        # ARGs / Configuration
+        # sell_orders False = use buy_orders instead
+        # item_name = what item we want to inspect
+
+        # Step 0: Load items.json (cached, no download unless there is no cache yet)
+        catalog = get_default_catalog()
+
+        # Step 0: Look Up Item Id
+        if catalog.lookup_id(item_name) is None:
+            sys.exit("Unable to find item in items.json")
+
+        # Step 1: Retrieve log files
+        log_directory = os.path.expandvars(LOG_DIRECTORY)
+
+        # Step 2, 3 & 4: Parse log files, match item information and write both sides to CSV in one pass
+        def process_log_files():
+            buckets = process_all_log_files([item_name], catalog, log_directory)
+            self.market_orders = buckets[item_name]['sell' if sell_orders else 'buy']
+
+            # Step 5: Create animation of real-time price changes
+            '''
+            import matplotlib.pyplot as plt
+            import matplotlib.animation as animation
+
+            def animate_prices(item_name):
+                fig, ax = plt.subplots()
+
+                def update(frame):
+                    # Retrieve and update the price data for the given item_name
+                    history.update([item_name], store)
+                    price_data = history.read(item_name, '1h')['close'] / 100
+
+                    # Clear the plot and set new data
+                    ax.clear()
+                    ax.plot(price_data)
+
+                ani = animation.FuncAnimation(fig, update, interval=1000)
+                plt.show()
+
+            # Call the animation function with the item to track
+            animate_prices(item_to_track)
+            '''
+
+        # Follow the logs, only parsing what gets appended
+        if enable_watch_dog:
+            LogFollower([item_name], catalog, log_directory).run()
+        # Initial processing of log files
+        else:
+            process_log_files()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Extract market orders from the game logs into the order store.')
+    parser.add_argument('items', nargs='+', help='displayNameWithSize of every item to extract')
+    parser.add_argument('--log-directory', default=LOG_DIRECTORY, help='Where the game logs live')
+    parser.add_argument('--workers', type=int, default=1, help='Parse log files with this many processes')
+    parser.add_argument('--csv', dest='write_csv', action='store_true', help='Also export the parsed orders as CSV files')
+    parser.add_argument('--follow', action='store_true', help='Keep following the logs, storing new orders as they are written')
+    parser.add_argument('--index', action='store_true', help='Index every log first, later single-item runs then skip to the records they need')
+    add_metrics_arguments(parser)
+    args = parser.parse_args(argv)
+
+    metrics = start_run(profile=args.profile, trace_memory=args.trace_memory)
+    try:
+        if args.follow:
+            LogFollower(args.items, log_directory=args.log_directory).run()
+        else:
+            buckets = process_all_log_files(args.items, log_directory=args.log_directory, workers=args.workers, write_csv=args.write_csv, index=args.index)
+            for item_name, orders in buckets.items():
+                print(f"{item_name}: {len(orders['buy'])} buy orders, {len(orders['sell'])} sell orders")
+    finally:
+        if args.metrics:
+            print(f"Metrics written to {metrics.write_report(args.metrics)}")
+
+if __name__ == '__main__':
+    main()
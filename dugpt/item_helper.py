@@ -0,0 +1,270 @@
+import os
+import re
+import json
+import bisect
+import unicodedata
+
+from dugpt.metrics import get_run_metrics, count
+
+ITEMS_URL = 'https://raw.githubusercontent.com/NutInSpace/DualUniverse-GPT/main/items.json'
+DEFAULT_CACHE_FILE = "items.json"
+
+class ItemCatalog:
+    """
+    items.json, cached on disk and indexed by id and displayNameWithSize.
+
+    The catalog only touches the network when there is no cache file yet or
+    when refresh() is called, so it keeps working offline.
+    """
+    def __init__(self, cache_file=DEFAULT_CACHE_FILE, url=ITEMS_URL, refresh=False):
+        self.cache_file = cache_file
+        self.url = url
+        self.items_data = []
+        self.items_by_id = {}
+        self.items_by_name = {}
+        self._search_index = None
+
+        if refresh or not os.path.exists(cache_file):
+            self.refresh()
+        else:
+            self.load()
+
+    def load(self):
+        with get_run_metrics().stage('load_items'):
+            with open(self.cache_file, encoding='utf-8') as file:
+                self.items_data = json.load(file)
+            self.build_indexes()
+            count('load_items', 'items', len(self.items_data))
+
+    def refresh(self):
+        """
+        Revalidates the cache file against the network.
+
+        The ETag of the last download is kept next to the cache so an unchanged
+        items.json costs a 304 instead of a full download. Any network error
+        falls back to whatever is already cached.
+
+        Returns:
+            bool: True when a new items.json was downloaded.
+        """
+        import requests
+
+        etag_file = self.cache_file + '.etag'
+        headers = {}
+        if os.path.exists(self.cache_file) and os.path.exists(etag_file):
+            with open(etag_file) as file:
+                headers['If-None-Match'] = file.read().strip()
+
+        try:
+            with get_run_metrics().stage('fetch_items'):
+                response = requests.get(self.url, headers=headers, timeout=30)
+                response.raise_for_status()
+            count('fetch_items', 'bytes', len(response.content))
+        except requests.RequestException as e:
+            print(f"Unable to download items.json, using cache: {e}")
+            if os.path.exists(self.cache_file):
+                self.load()
+            return False
+
+        if response.status_code == 304:
+            count('fetch_items', 'not_modified')
+            self.load()
+            return False
+
+        self.items_data = response.json()
+        with open(self.cache_file, 'w', encoding='utf-8') as file:
+            json.dump(self.items_data, file)
+        if response.headers.get('ETag'):
+            with open(etag_file, 'w') as file:
+                file.write(response.headers['ETag'])
+
+        self.build_indexes()
+        return True
+
+    def build_indexes(self):
+        self._search_index = None
+        self.items_by_id = {item['id']: item for item in self.items_data}
+        self.items_by_name = {}
+        for item in self.items_data:
+            # First one wins, same as the old linear scans
+            self.items_by_name.setdefault(item.get('displayNameWithSize'), item)
+
+    def by_id(self, item_id):
+        return self.items_by_id.get(item_id)
+
+    def search_index(self):
+        # Built on first search, dropped whenever the catalog is re-indexed
+        if self._search_index is None:
+            self._search_index = SearchIndex(self.items_data)
+        return self._search_index
+
+    def search(self, query, limit=10):
+        return [item for item, _ in self.search_index().search(query, limit)]
+
+    def resolve_names(self, names):
+        return self.search_index().resolve(names)
+
+    def by_name(self, item_name):
+        return self.items_by_name.get(item_name)
+
+    def lookup_id(self, item_name):
+        item = self.by_name(item_name)
+        return item['id'] if item else None
+
+    def get_item_info(self, item_id, key='displayNameWithSize'):
+        item = self.by_id(item_id)
+        return item.get(key) if item else None
+
+    def __len__(self):
+        return len(self.items_data)
+
+_default_catalog = None
+
+def get_default_catalog():
+    # Every caller shares one catalog, loading items.json is the expensive part
+    global _default_catalog
+    if _default_catalog is None:
+        _default_catalog = ItemCatalog()
+    return _default_catalog
+
+class ItemManager:
+    def __init__(self, catalog=None):
+        self.catalog = catalog or get_default_catalog()
+
+    def lookup_item_mass(self, item_name):
+        item = self.catalog.by_name(item_name)
+        if item is None:
+            return 0
+        return item.get('unitMass', 0)
+
+# Names we search, English first
+NAME_KEYS = ('displayNameWithSize', 'locDisplayNameWithSize', 'locDisplayNameWithSizeDE')
+
+def normalize(text):
+    # Lower case, accents stripped, split into words: 'Fer pur' -> ['fer', 'pur']
+    text = unicodedata.normalize('NFKD', text.casefold())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return re.findall(r'\w+', text)
+
+def trigrams(token):
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class SearchIndex:
+    """
+    Name lookup over items or recipes, built once.
+
+    Every name in every language is split into normalized words. Words map to
+    the entries that use them (inverted index), a sorted word list answers
+    prefixes, and word trigrams find near misses. Results are ranked: a full
+    name match beats matching every word, which beats prefix and fuzzy hits.
+    """
+    def __init__(self, entries, name_keys=NAME_KEYS):
+        self.entries = []
+        self.exact = {}       # normalized full name -> entry indexes
+        self.postings = {}    # word -> entry indexes
+        self.name_lengths = []
+        for entry in entries:
+            names = [entry[key] for key in name_keys if entry.get(key)]
+            if not names:
+                continue
+            index = len(self.entries)
+            self.entries.append(entry)
+            self.name_lengths.append(len(names[0]))
+            for name in names:
+                tokens = normalize(name)
+                self.exact.setdefault(' '.join(tokens), set()).add(index)
+                for token in tokens:
+                    self.postings.setdefault(token, set()).add(index)
+
+        self.vocabulary = sorted(self.postings)
+        self.trigram_index = {}
+        for token in self.vocabulary:
+            for trigram in trigrams(token):
+                self.trigram_index.setdefault(trigram, []).append(token)
+
+    def prefix_tokens(self, prefix):
+        start = bisect.bisect_left(self.vocabulary, prefix)
+        end = bisect.bisect_left(self.vocabulary, prefix + '￿')
+        return self.vocabulary[start:end]
+
+    def fuzzy_tokens(self, token, threshold=0.5):
+        # Words sharing enough trigrams with token, with their similarity
+        wanted = trigrams(token)
+        shared = {}
+        for trigram in wanted:
+            for candidate in self.trigram_index.get(trigram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+        matches = []
+        for candidate, common in shared.items():
+            similarity = 2 * common / (len(wanted) + len(candidate) + 1)
+            if similarity >= threshold:
+                matches.append((candidate, similarity))
+        return matches
+
+    def search(self, query, limit=10, fuzzy=True):
+        """
+        Ranked lookup of a name, in any language.
+
+        Args:
+            query (str): Whole or partial name, typos are tolerated when fuzzy.
+            limit (int): How many results to return.
+            fuzzy (bool): Also match words that are only close.
+
+        Returns:
+            list: (entry, score) pairs, best first.
+        """
+        tokens = normalize(query)
+        if not tokens:
+            return []
+
+        scores = {}
+        matched = {}
+        for token in tokens:
+            hits = {}
+            for index in self.postings.get(token, ()):
+                hits[index] = 3.0
+            for candidate in self.prefix_tokens(token):
+                if candidate != token:
+                    for index in self.postings[candidate]:
+                        hits[index] = max(hits.get(index, 0), 2.0)
+            if fuzzy and len(token) > 2:
+                for candidate, similarity in self.fuzzy_tokens(token):
+                    for index in self.postings[candidate]:
+                        hits[index] = max(hits.get(index, 0), similarity * 2)
+            for index, score in hits.items():
+                scores[index] = scores.get(index, 0) + score
+                matched[index] = matched.get(index, 0) + 1
+
+        for index in self.exact.get(' '.join(tokens), ()):
+            scores[index] = scores.get(index, 0) + 10
+
+        # Entries matching every word first, then by score, then shorter names
+        ranked = sorted(scores, key=lambda index: (matched[index] < len(tokens), -scores[index], self.name_lengths[index]))
+        return [(self.entries[index], scores[index]) for index in ranked[:limit]]
+
+    def resolve(self, names, fuzzy=True, min_score=1.6):
+        """
+        Resolves a batch of names, e.g. all the ores, in one call.
+
+        Args:
+            names (list): Names to look up.
+            fuzzy (bool): Fall back to the best ranked match when there is no exact one.
+            min_score (float): Average score per word the fallback needs, so 'Coal'
+                does not resolve to whatever shares a few letters with it.
+
+        Returns:
+            dict: name -> entry, or None when nothing matched.
+        """
+        resolved = {}
+        for name in names:
+            exact = self.exact.get(' '.join(normalize(name)))
+            if exact:
+                resolved[name] = self.entries[min(exact)]
+            elif fuzzy:
+                best = self.search(name, limit=1)
+                good = best and best[0][1] >= min_score * len(normalize(name))
+                resolved[name] = best[0][0] if good else None
+            else:
+                resolved[name] = None
+        return resolved
@@ -0,0 +1,107 @@
+import re
+import datetime
+import functools
+
+# MarketOrder lexer
+# Pulls market orders straight out of raw log bytes. Every field is cut at its fixed key by a
+# pattern that never backtracks, orders for other items are dropped before anything is
+# converted, and every distinct date is decoded once.
+
+MARKET_ORDER_MARKER = b'MarketOrder:['
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+MAX_CACHED_DATES = 1 << 18
+
+# A record, one line of the log:
+# MarketOrder:[marketId = 1, orderId = 2, itemType = 3, buyQuantity = -4, expirationDate = @(1) 2023-06-01 12:00:00,
+#   updateDate = @(1) 2023-05-30 08:00:00, unitPrice = Currency:[amount = 5]]
+# Key of every field and what its value may be. Dates run up to the next comma, so unlike
+# the lazy (.*?) groups they used to be matched with, a failed record costs one pass.
+FIELDS = (
+    (b'MarketOrder:[marketId = ', rb'(\d+)'),
+    (b', orderId = ', rb'(\d+)'),
+    (b', itemType = ', rb'(\d+)'),
+    (b', buyQuantity = ', rb'(-?\d+)'),
+    (b', expirationDate = @(', rb'\d+\) ([^,\n]*)'),
+    (b', updateDate = @(', rb'\d+\) ([^,\n]*)'),
+    (b', unitPrice = Currency:[amount = ', rb'(\d+)\]'),
+)
+RECORD_PATTERN = re.compile(b''.join(re.escape(key) + value for key, value in FIELDS))
+
+class MarketOrderLexer:
+    """
+    Tokenizes MarketOrder records out of log bytes.
+
+    Bytes that are not valid UTF-8 never stop a scan: dates are decoded with
+    replacement characters and a record with garbage in a number does not
+    match, the rest of the buffer is still read.
+
+    Dates stay 'YYYY-MM-DD HH:MM:SS' strings, which is what the order index,
+    the books and the store compare, but each distinct date is decoded once and
+    the same string object is shared by every order that has it. timestamp()
+    converts a date to epoch seconds once per process.
+    """
+    def __init__(self):
+        self.dates = {}
+
+    def date(self, raw):
+        text = self.dates.get(raw)
+        if text is None:
+            if len(self.dates) >= MAX_CACHED_DATES:
+                self.dates.clear()
+            text = self.dates[raw] = raw.decode('utf-8', 'replace')
+        return text
+
+    def timestamp(self, date):
+        return timestamp(date)
+
+    def lex(self, buffer, stop=None, item_types=None):
+        """
+        Every complete record in buffer[:stop].
+
+        Args:
+            buffer (bytes): Raw log bytes.
+            stop (int): Ignore records that end after this, the whole buffer when None.
+            item_types (set): Only keep orders for these item types, all when None.
+                Other records are skipped before any of their fields are converted.
+
+        Returns:
+            tuple: (orders, end). orders is a list of (market_id, order_id, item_type,
+            buy_quantity, expiration_date, update_date, unit_price) tuples, end is the
+            offset right after the last complete record, 0 when there was none.
+        """
+        if stop is None:
+            stop = len(buffer)
+        orders = []
+        end = 0
+
+        # Fast reject, most chunks of a log have no market data at all
+        if buffer.find(MARKET_ORDER_MARKER, 0, stop) == -1:
+            return orders, end
+
+        append = orders.append
+        date = self.date
+        for match in RECORD_PATTERN.finditer(buffer, 0, stop):
+            end = match.end()
+            item_type = int(match[3])
+            if item_types is not None and item_type not in item_types:
+                continue
+            append((int(match[1]), int(match[2]), item_type, int(match[4]),
+                    date(match[5]), date(match[6]), int(match[7])))
+        return orders, end
+
+@functools.lru_cache(maxsize=MAX_CACHED_DATES)
+def timestamp(date):
+    """
+    Epoch seconds of a log date, computed once per distinct date.
+
+    Args:
+        date (str): A 'YYYY-MM-DD HH:MM:SS' date as the lexer returns it.
+
+    Returns:
+        int: Seconds since 1970-01-01, the date read as UTC. None when it is not a date.
+    """
+    try:
+        parsed = datetime.datetime.strptime(date, DATE_FORMAT)
+    except (TypeError, ValueError):
+        return None
+    return int(parsed.replace(tzinfo=datetime.timezone.utc).timestamp())
@@ -0,0 +1,303 @@
+import os
+import json
+import hashlib
+
+from dugpt.lexer import MarketOrderLexer, RECORD_PATTERN, MARKET_ORDER_MARKER
+
+# Log indexes
+# A small sidecar per log file says which parts of the log hold the MarketOrder records of each
+# item_type and market_id, so a single item or market is a few seeks instead of a full scan.
+
+DEFAULT_INDEX_DIRECTORY = os.path.join('data', 'log_index')
+INDEX_VERSION = 1
+
+# The log is cut into blocks of about this size, always at a line end. An item is indexed by
+# the blocks it appears in, not by every record, which keeps the sidecar small
+BLOCK_SIZE = 64 * 1024
+READ_SIZE = 1024 * 1024
+
+def index_path(log_path, index_directory=DEFAULT_INDEX_DIRECTORY):
+    # Logs from different directories can share a name, the sidecar is keyed by the full path
+    log_path = os.path.abspath(log_path)
+    digest = hashlib.sha1(log_path.encode('utf-8')).hexdigest()[:12]
+    return os.path.join(index_directory, f'{os.path.basename(log_path)}.{digest}.idx.json')
+
+def add_block(runs, block):
+    # Blocks are kept as runs, [[3, 3], [9, 1]] is blocks 3, 4, 5 and 9
+    if runs:
+        first, count = runs[-1]
+        if first + count > block:
+            return
+        if first + count == block:
+            runs[-1][1] += 1
+            return
+    runs.append([block, 1])
+
+def run_blocks(runs):
+    return {first + n for first, count in runs for n in range(count)}
+
+class LogIndex:
+    """
+    Where the market orders of every item_type and market_id are in one log file.
+
+    Game logs are only ever appended to. The index remembers the size,
+    mtime and inode it was built for: a log that grew is indexed from where
+    the index stopped, anything else means the log was replaced and the
+    index is rebuilt.
+
+    Args:
+        log_path (str): The log file.
+        index_directory (str): Where the sidecar files are kept.
+    """
+    def __init__(self, log_path, index_directory=DEFAULT_INDEX_DIRECTORY):
+        self.log_path = log_path
+        self.path = index_path(log_path, index_directory)
+        self.reset()
+
+    def reset(self):
+        self.size = 0
+        self.mtime_ns = 0
+        self.inode = None
+        self.offset = 0          # indexed up to here, always right after a newline
+        self.blocks = []         # (start, end) byte range of every block with market data
+        self.items = {}          # item_type -> runs of block numbers
+        self.markets = {}        # market_id -> runs of block numbers
+
+    @classmethod
+    def open(cls, log_path, index_directory=DEFAULT_INDEX_DIRECTORY, build=True):
+        """
+        The index of a log, brought up to date.
+
+        Args:
+            log_path (str): The log file.
+            index_directory (str): Where the sidecar files are kept.
+            build (bool): Build or extend the index as needed. When False, only an
+                index that is already current or only has to be extended is returned.
+
+        Returns:
+            LogIndex: The index, or None when build is False and it would take a full scan.
+        """
+        log_index = cls(log_path, index_directory)
+        log_index.load()
+        state = log_index.state()
+        if state == 'current':
+            return log_index
+        if state == 'stale' and not build:
+            return None
+        log_index.update()
+        log_index.save()
+        return log_index
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path) as file:
+                sidecar = json.load(file)
+        except (OSError, ValueError):
+            return False
+        if sidecar.get('version') != INDEX_VERSION or sidecar.get('log') != os.path.abspath(self.log_path):
+            return False
+        self.size = sidecar['size']
+        self.mtime_ns = sidecar['mtime_ns']
+        self.inode = sidecar['inode']
+        self.offset = sidecar['offset']
+        self.blocks = [tuple(block) for block in sidecar['blocks']]
+        self.items = {int(key): runs for key, runs in sidecar['items'].items()}
+        self.markets = {int(key): runs for key, runs in sidecar['markets'].items()}
+        return True
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        sidecar = {
+            'version': INDEX_VERSION,
+            'log': os.path.abspath(self.log_path),
+            'size': self.size,
+            'mtime_ns': self.mtime_ns,
+            'inode': self.inode,
+            'offset': self.offset,
+            'blocks': self.blocks,
+            'items': self.items,
+            'markets': self.markets,
+        }
+        # Write then rename, a reader never sees half a sidecar
+        with open(self.path + '.tmp', 'w') as file:
+            json.dump(sidecar, file, separators=(',', ':'))
+        os.replace(self.path + '.tmp', self.path)
+
+    def state(self):
+        """
+        How the index compares to the log on disk.
+
+        Returns:
+            str: 'current', 'grown' (the log was appended to) or 'stale' (rebuild needed).
+        """
+        stat = os.stat(self.log_path)
+        if self.inode is None or stat.st_ino != self.inode or stat.st_size < self.size:
+            return 'stale'
+        if stat.st_size == self.size and stat.st_mtime_ns == self.mtime_ns:
+            return 'current'
+        return 'grown'
+
+    def update(self):
+        """
+        Indexes whatever the index does not cover yet, all of the log when it is stale.
+
+        Returns:
+            int: Bytes scanned.
+        """
+        if self.state() == 'stale':
+            self.reset()
+        stat = os.stat(self.log_path)
+        start = self.offset
+
+        with open(self.log_path, 'rb') as log_file:
+            log_file.seek(self.offset)
+            carry = b''
+            while True:
+                chunk = log_file.read(READ_SIZE)
+                if not chunk:
+                    break
+                buffer = carry + chunk
+                cut = buffer.rfind(b'\n') + 1
+                if cut == 0:
+                    carry = buffer
+                    continue
+                self._index_lines(buffer, cut)
+                carry = buffer[cut:]
+
+        self.size = stat.st_size
+        self.mtime_ns = stat.st_mtime_ns
+        self.inode = stat.st_ino
+        return self.offset - start
+
+    def _index_lines(self, buffer, cut):
+        # buffer[:cut] is whole lines starting at self.offset, cut into blocks at line ends
+        position = 0
+        while position < cut:
+            block_end = buffer.find(b'\n', position + BLOCK_SIZE - 1, cut) + 1 or cut
+            # Blocks without market data are left out, they would never be read
+            if buffer.find(MARKET_ORDER_MARKER, position, block_end) != -1:
+                block = len(self.blocks)
+                self.blocks.append((self.offset + position, self.offset + block_end))
+                items, markets = set(), set()
+                for match in RECORD_PATTERN.finditer(buffer, position, block_end):
+                    items.add(match[3])
+                    markets.add(match[1])
+                for keys, found in ((self.items, items), (self.markets, markets)):
+                    for key in found:
+                        add_block(keys.setdefault(int(key), []), block)
+            position = block_end
+        self.offset += cut
+
+    def ranges(self, item_types=None, market_ids=None):
+        """
+        Byte ranges holding every record of the given items and markets.
+
+        Args:
+            item_types (iterable): Item types to look for, any when None.
+            market_ids (iterable): Market ids to look for, any when None.
+
+        Returns:
+            list: (start, end) byte ranges, sorted, neighbouring blocks merged.
+        """
+        blocks = None
+        for keys, wanted in ((self.items, item_types), (self.markets, market_ids)):
+            if wanted is None:
+                continue
+            found = set().union(*(run_blocks(keys.get(key, [])) for key in wanted))
+            blocks = found if blocks is None else blocks & found
+        if blocks is None:
+            blocks = range(len(self.blocks))
+
+        ranges = []
+        for block in sorted(blocks):
+            start, end = self.blocks[block]
+            if ranges and ranges[-1][1] == start:
+                ranges[-1] = (ranges[-1][0], end)
+            else:
+                ranges.append((start, end))
+        return ranges
+
+    def market_order_chunks(self, item_types=None, market_ids=None):
+        """
+        Streams just the parts of the log that hold the given items and markets.
+
+        The index is not brought up to date first, use LogIndex.open for that. Anything
+        written after the indexed part is scanned as well, so nothing is missed. Ranges
+        are read READ_SIZE at a time, however many blocks were merged into them.
+
+        Args:
+            item_types (set): Item types to extract, any when None.
+            market_ids (set): Market ids to extract, any when None.
+
+        Returns:
+            tuple: (iterator of lists of lexer tuples in log order, bytes it reads)
+        """
+        item_types = set(item_types) if item_types is not None else None
+        market_ids = set(market_ids) if market_ids is not None else None
+        ranges = self.ranges(item_types, market_ids)
+        ranges.append((self.offset, max(self.offset, os.path.getsize(self.log_path))))
+        return self._read_ranges(ranges, item_types, market_ids), sum(end - start for start, end in ranges)
+
+    def _read_ranges(self, ranges, item_types, market_ids):
+        lexer = MarketOrderLexer()
+
+        def lex(buffer, stop):
+            found = lexer.lex(buffer, stop, item_types)[0]
+            if market_ids is not None:
+                found = [order for order in found if order[0] in market_ids]
+            return found
+
+        with open(self.log_path, 'rb') as log_file:
+            for start, end in ranges:
+                log_file.seek(start)
+                remaining = end - start
+                carry = b''
+                while remaining > 0:
+                    chunk = log_file.read(min(READ_SIZE, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    buffer = carry + chunk
+                    # Whole lines only, until the range is done
+                    cut = len(buffer) if remaining <= 0 else buffer.rfind(b'\n') + 1
+                    found = lex(buffer, cut) if cut else []
+                    if found:
+                        yield found
+                    carry = buffer[cut:]
+                if carry:
+                    found = lex(carry, len(carry))
+                    if found:
+                        yield found
+
+    def market_orders(self, item_types=None, market_ids=None):
+        """
+        Same as market_order_chunks, every order in one list.
+
+        Returns:
+            tuple: (orders, bytes read). Orders are lexer tuples in log order.
+        """
+        chunks, read = self.market_order_chunks(item_types, market_ids)
+        return [order for orders in chunks for order in orders], read
+
+def build_log_indexes(log_files, index_directory=DEFAULT_INDEX_DIRECTORY):
+    """
+    Index stage: brings the sidecar of every log up to date.
+
+    Args:
+        log_files (list): Paths of the log files.
+        index_directory (str): Where the sidecar files are kept.
+
+    Returns:
+        dict: log path -> bytes scanned, 0 for logs whose index was current.
+    """
+    scanned = {}
+    for log_path in log_files:
+        log_index = LogIndex(log_path, index_directory)
+        log_index.load()
+        scanned[log_path] = 0
+        if log_index.state() != 'current':
+            scanned[log_path] = log_index.update()
+            log_index.save()
+    return scanned
@@ -0,0 +1,205 @@
+import os
+import sys
+import json
+import time
+import datetime
+import contextlib
+
+# Run metrics
+# Where a run spent its time: every stage records wall and CPU time, what it processed
+# (bytes, records, ...) and cache hits and misses. The report is one JSON document.
+
+def peak_rss_mb():
+    # ru_maxrss is in KB on Linux and bytes on macOS, there is no resource module on Windows
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+class RunMetrics:
+    """
+    Stage timings and counters of one run.
+
+    Args:
+        profile (str): None, 'cprofile' or 'pyinstrument', profiles every stage when set.
+        profile_directory (str): Where the per-stage profiles are written.
+        trace_memory (bool): Track the peak Python memory of every stage with tracemalloc,
+            which makes everything slower.
+    """
+    def __init__(self, profile=None, profile_directory=os.path.join('data', 'profiles'), trace_memory=False):
+        self.profile = profile
+        self.profile_directory = profile_directory
+        self.trace_memory = trace_memory
+        self.started = datetime.datetime.now()
+        self.stages = {}
+        self._active = []
+
+    def _stage(self, name):
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = {'calls': 0, 'seconds': 0.0, 'cpu_seconds': 0.0, 'counters': {}}
+            self.stages[name] = stage
+        return stage
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """
+        Times the with block as one call of the stage.
+
+        Nested stages are timed on their own as well as inside their parent.
+        Profiles and traced memory peaks are only taken for the outermost stage.
+        """
+        stage = self._stage(name)
+        outermost = not self._active
+        profiler = self._start_profiler() if self.profile and outermost else None
+        if self.trace_memory and outermost:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+
+        self._active.append(name)
+        start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield stage
+        finally:
+            stage['calls'] += 1
+            stage['seconds'] += time.perf_counter() - start
+            stage['cpu_seconds'] += time.process_time() - cpu_start
+            self._active.pop()
+            if self.trace_memory and outermost:
+                import tracemalloc
+                peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+                stage['peak_traced_mb'] = max(stage.get('peak_traced_mb', 0), peak)
+            if profiler is not None:
+                self._stop_profiler(profiler, name)
+
+    def count(self, name, counter, amount=1):
+        # e.g. count('scan', 'bytes', 1024)
+        counters = self._stage(name)['counters']
+        counters[counter] = counters.get(counter, 0) + amount
+
+    def cache(self, name, hits, misses):
+        self.count(name, 'cache_hits', hits)
+        self.count(name, 'cache_misses', misses)
+
+    def _start_profiler(self):
+        if self.profile == 'pyinstrument':
+            from pyinstrument import Profiler
+            profiler = Profiler()
+            profiler.start()
+        else:
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+        return profiler
+
+    def _stop_profiler(self, profiler, name):
+        os.makedirs(self.profile_directory, exist_ok=True)
+        path = os.path.join(self.profile_directory, f"{name}-{self.stages[name]['calls']}")
+        if self.profile == 'pyinstrument':
+            profiler.stop()
+            with open(path + '.html', 'w') as file:
+                file.write(profiler.output_html())
+        else:
+            profiler.disable()
+            profiler.dump_stats(path + '.prof')
+
+    def report(self):
+        """
+        The run as a JSON-ready dict.
+
+        Returns:
+            dict: Start time, total seconds, peak RSS and every stage with its
+            timings, counters, rates per second and cache hit rate.
+        """
+        stages = {}
+        for name, stage in self.stages.items():
+            entry = dict(stage, counters=dict(stage['counters']))
+            counters = entry['counters']
+            if stage['seconds']:
+                entry['rates'] = {counter: value / stage['seconds'] for counter, value in counters.items()
+                                  if counter in ('bytes', 'records', 'orders', 'items', 'recipes')}
+            lookups = counters.get('cache_hits', 0) + counters.get('cache_misses', 0)
+            if lookups:
+                entry['cache_hit_rate'] = counters.get('cache_hits', 0) / lookups
+            stages[name] = entry
+        return {
+            'started': self.started.isoformat(timespec='seconds'),
+            'seconds': (datetime.datetime.now() - self.started).total_seconds(),
+            'peak_rss_mb': peak_rss_mb(),
+            'stages': stages,
+        }
+
+    def write_report(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as file:
+            json.dump(self.report(), file, indent=2)
+        return path
+
+_run_metrics = RunMetrics()
+
+def get_run_metrics():
+    # Every stage of the process records into one run
+    return _run_metrics
+
+def start_run(**options):
+    """
+    Starts a fresh run, dropping whatever was recorded so far.
+
+    Args:
+        options: RunMetrics arguments, e.g. profile='cprofile'.
+
+    Returns:
+        RunMetrics: The new run.
+    """
+    global _run_metrics
+    _run_metrics = RunMetrics(**options)
+    return _run_metrics
+
+def stage(name):
+    return get_run_metrics().stage(name)
+
+def count(name, counter, amount=1):
+    get_run_metrics().count(name, counter, amount)
+
+def add_metrics_arguments(parser):
+    # The same switches on every entry point
+    parser.add_argument('--metrics', metavar='PATH', help='Write stage timings and counters to this JSON file')
+    parser.add_argument('--profile', choices=['cprofile', 'pyinstrument'], help='Profile every top-level stage into data/profiles')
+    parser.add_argument('--trace-memory', action='store_true', help='Record the peak Python memory of every top-level stage (slow)')
+
+class Progress:
+    """
+    A status line that is redrawn at most every interval seconds.
+
+    Printing once per order was a measurable share of a large scan.
+    """
+    def __init__(self, label, total=None, interval=0.5, stream=None):
+        self.label = label
+        self.total = total
+        self.interval = interval
+        self.stream = stream or sys.stdout
+        self.done = 0
+        self._last = 0.0
+
+    def update(self, amount=1):
+        self.done += amount
+        now = time.monotonic()
+        if now - self._last >= self.interval:
+            self._last = now
+            self._draw()
+
+    def _draw(self):
+        if self.total:
+            text = f"{self.label} = {self.done:,} / {self.total:,} ({self.done / self.total:.0%})"
+        else:
+            text = f"{self.label} = {self.done:,}"
+        self.stream.write(f"\r{text:<76}")
+        self.stream.flush()
+
+    def close(self):
+        self._draw()
+        self.stream.write("\n")
@@ -0,0 +1,338 @@
+import heapq
+import datetime
+
+from dugpt.lexer import timestamp
+
+# Order books
+# One book per (market_id, item_type), fed the same OrderBatch the log parser yields.
+# Prices stay in cents, as logged, so levels aggregate exactly, dates are epoch seconds.
+
+# Prices are used as tree indexes directly, anything below 2**63 cents
+PRICE_BITS = 63
+PRICE_LIMIT = 1 << PRICE_BITS
+
+def date_key(when):
+    # Epoch seconds, like the batch dates. Log dates are UTC, so are naive datetimes and date strings
+    if isinstance(when, datetime.datetime) and when.tzinfo is not None:
+        return int(when.timestamp())
+    if isinstance(when, (datetime.date, datetime.datetime)):
+        when = when.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(when, str):
+        return timestamp(when)
+    return when
+
+def order_rows(market_orders):
+    # (market_id, order_id, item_type, buy_quantity, unit_price, expiration_date, update_date)
+    # per order of a batch, as plain ints so the books never touch numpy
+    return zip(market_orders.market_id.tolist(), market_orders.order_id.tolist(), market_orders.item_type.tolist(),
+               market_orders.buy_quantity.tolist(), market_orders.unit_price.tolist(),
+               market_orders.expiration_date.tolist(), market_orders.update_date.tolist())
+
+class FenwickTree:
+    """
+    Prefix sums over the indexes 1 .. 2**bits, updated and queried in O(bits).
+
+    The nodes live in a dict and only the ones on the paths of indexes that
+    hold something exist, so a sparse index space as large as every possible
+    price costs nothing.
+    """
+    def __init__(self, bits=PRICE_BITS):
+        self.bits = bits
+        self.size = 1 << bits
+        self.nodes = {}
+
+    def add(self, index, amount):
+        nodes = self.nodes
+        while index <= self.size:
+            value = nodes.get(index, 0) + amount
+            if value:
+                nodes[index] = value
+            else:
+                del nodes[index]
+            index += index & -index
+
+    def prefix(self, index):
+        # Sum of 1 .. index
+        nodes = self.nodes
+        total = 0
+        while index > 0:
+            total += nodes.get(index, 0)
+            index &= index - 1
+        return total
+
+    def search(self, target):
+        """
+        The smallest index whose prefix sum reaches target, values must not be negative.
+
+        Returns:
+            tuple: (index, prefix sum before it), index is size + 1 when the total is short.
+        """
+        nodes = self.nodes
+        position = 0
+        before = 0
+        for bit in range(self.bits, -1, -1):
+            step = position + (1 << bit)
+            if step <= self.size:
+                value = nodes.get(step, 0)
+                if before + value < target:
+                    position = step
+                    before += value
+        return position + 1, before
+
+class BookSide:
+    """
+    The price levels of one side of a book, best price first.
+
+    Every price is a position in two Fenwick trees, one summing quantities
+    and one summing cost, laid out best price first. An order update, the
+    best price, depth, quantity within a price and fill cost are all
+    O(log) walks down those trees, nothing is rebuilt after an update.
+    """
+    def __init__(self, descending):
+        self.descending = descending
+        self.quantities = {}  # price -> aggregated quantity
+        self.quantity_tree = FenwickTree()
+        self.cost_tree = FenwickTree()
+        self.total = 0
+
+    def _index(self, price):
+        # Bids count down from the top of the tree, so the best price always has the lowest index
+        return PRICE_LIMIT - price if self.descending else price + 1
+
+    def _price(self, index):
+        return PRICE_LIMIT - index if self.descending else index - 1
+
+    def add(self, price, quantity):
+        if not 0 <= price < PRICE_LIMIT:
+            raise ValueError(f"Price out of range: {price}")
+        current = self.quantities.get(price, 0)
+        updated = max(current + quantity, 0)
+        if updated:
+            self.quantities[price] = updated
+        else:
+            self.quantities.pop(price, None)
+        change = updated - current
+        if change:
+            index = self._index(price)
+            self.quantity_tree.add(index, change)
+            self.cost_tree.add(index, change * price)
+            self.total += change
+
+    def levels(self):
+        # (price, quantity), best first
+        return [(price, self.quantities[price]) for price in sorted(self.quantities, reverse=self.descending)]
+
+    def best(self):
+        if not self.quantities:
+            return None
+        index, _ = self.quantity_tree.search(1)
+        return self._price(index)
+
+    def depth(self, quantity):
+        """
+        How far into the book filling quantity goes.
+
+        Returns:
+            int: Price of the last level needed, None when the side is too thin.
+        """
+        if not self.quantities or quantity > self.total:
+            return None
+        index, _ = self.quantity_tree.search(max(quantity, 1))
+        return self._price(index)
+
+    def quantity_within(self, price):
+        # Units available at price or better
+        return self.quantity_tree.prefix(min(max(self._index(price), 0), PRICE_LIMIT))
+
+    def fill_cost(self, quantity):
+        """
+        Total cost of filling quantity against this side, best levels first.
+
+        Returns:
+            int: Cost in cents, None when the side is too thin.
+        """
+        if not self.quantities or quantity > self.total:
+            return None
+        if quantity <= 0:
+            return 0
+        index, before = self.quantity_tree.search(quantity)
+        return self.cost_tree.prefix(index - 1) + (quantity - before) * self._price(index)
+
+    def total_quantity(self):
+        return self.total
+
+    def __len__(self):
+        return len(self.quantities)
+
+class OrderBook:
+    """
+    Bid and ask levels of one item on one market, updated order by order.
+
+    An order seen again replaces its previous snapshot unless that one has
+    a newer updateDate, ties going to the later sighting as in
+    OrderBatch.latest. Orders leave the book
+    when expire() passes their expiration date.
+    """
+    def __init__(self, market_id, item_type):
+        self.market_id = market_id
+        self.item_type = item_type
+        self.bids = BookSide(descending=True)
+        self.asks = BookSide(descending=False)
+        self.orders = {}   # order_id -> (buy_quantity, unit_price, expiration_date, update_date)
+        self.expiries = [] # heap of (expiration_date, order_id)
+
+    def _side(self, buy_quantity):
+        # Buy orders are logged with a negative quantity
+        return self.bids if buy_quantity < 0 else self.asks
+
+    def apply(self, market_orders):
+        """
+        Adds or updates the orders of a batch, all of this book's market and item.
+
+        Args:
+            market_orders (OrderBatch): The orders, in the order they were seen.
+
+        Returns:
+            int: How many orders changed the book.
+        """
+        return sum(self.update(order_id, *snapshot) for _, order_id, _, *snapshot in order_rows(market_orders))
+
+    def update(self, order_id, buy_quantity, unit_price, expiration_date, update_date):
+        """
+        Adds or updates one order.
+
+        Returns:
+            bool: True when the book changed.
+        """
+        snapshot = (buy_quantity, unit_price, expiration_date, update_date)
+        current = self.orders.get(order_id)
+        if current is not None:
+            if update_date < current[3] or snapshot == current:
+                return False
+            self._side(current[0]).add(current[1], -abs(current[0]))
+
+        if buy_quantity == 0:
+            # Filled or cancelled, only a change when we had the order
+            return self.orders.pop(order_id, None) is not None
+
+        self.orders[order_id] = snapshot
+        self._side(buy_quantity).add(unit_price, abs(buy_quantity))
+        heapq.heappush(self.expiries, (expiration_date, order_id))
+        return True
+
+    def remove(self, order_id):
+        snapshot = self.orders.pop(order_id, None)
+        if snapshot is not None:
+            self._side(snapshot[0]).add(snapshot[1], -abs(snapshot[0]))
+        return snapshot
+
+    def expire(self, now):
+        """
+        Drops every order that expired at or before now.
+
+        Args:
+            now (datetime, str or int): The current time, naive datetimes and strings in UTC,
+                an int is epoch seconds.
+
+        Returns:
+            int: How many orders were dropped.
+        """
+        now = date_key(now)
+        expired = 0
+        while self.expiries and self.expiries[0][0] <= now:
+            expiration_date, order_id = heapq.heappop(self.expiries)
+            snapshot = self.orders.get(order_id)
+            # The heap keeps stale entries of orders that were updated since, skip those
+            if snapshot is not None and snapshot[2] == expiration_date:
+                self.remove(order_id)
+                expired += 1
+        return expired
+
+    def best_bid(self):
+        return self.bids.best()
+
+    def best_ask(self):
+        return self.asks.best()
+
+    def spread(self):
+        if not self.bids or not self.asks:
+            return None
+        return self.asks.best() - self.bids.best()
+
+    def depth(self, quantity, side='sell'):
+        """
+        Worst price touched when trading quantity right now.
+
+        Args:
+            quantity (int): Units to trade.
+            side (str): 'buy' to buy from the asks, 'sell' to sell into the bids.
+
+        Returns:
+            int: Price in cents, None when the book is too thin.
+        """
+        return (self.asks if side == 'buy' else self.bids).depth(quantity)
+
+    def vwap(self, quantity, side='buy'):
+        """
+        Volume-weighted average price of filling quantity against the book.
+
+        Args:
+            quantity (int): Units to fill.
+            side (str): 'buy' to buy from the asks, 'sell' to sell into the bids.
+
+        Returns:
+            float: Average price in cents, None when the book is too thin.
+        """
+        cost = (self.asks if side == 'buy' else self.bids).fill_cost(quantity)
+        if cost is None or quantity <= 0:
+            return None
+        return cost / quantity
+
+    def __len__(self):
+        return len(self.orders)
+
+class OrderBooks:
+    """
+    Every book we have orders for, keyed by (market_id, item_type).
+    """
+    def __init__(self):
+        self.books = {}
+
+    def book(self, market_id, item_type):
+        key = (market_id, item_type)
+        book = self.books.get(key)
+        if book is None:
+            book = OrderBook(market_id, item_type)
+            self.books[key] = book
+        return book
+
+    def apply(self, market_orders):
+        """
+        Routes parsed orders to their books.
+
+        Args:
+            market_orders (OrderBatch): The orders, in the order they were seen.
+
+        Returns:
+            int: How many orders changed a book.
+        """
+        changed = 0
+        for market_id, order_id, item_type, *snapshot in order_rows(market_orders):
+            changed += self.book(market_id, item_type).update(order_id, *snapshot)
+        return changed
+
+    def expire(self, now=None):
+        # Expiration dates are logged in UTC
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        return sum(book.expire(now) for book in self.books.values())
+
+    def markets(self, item_type):
+        return [book for (_, book_item_type), book in self.books.items() if book_item_type == item_type]
+
+    def best_bid(self, item_type):
+        # Best bid across every market, as (price, market_id)
+        return max(((book.best_bid(), book.market_id) for book in self.markets(item_type) if book.bids), default=None)
+
+    def best_ask(self, item_type):
+        # Best ask across every market, as (price, market_id)
+        return min(((book.best_ask(), book.market_id) for book in self.markets(item_type) if book.asks), default=None)
@@ -0,0 +1,224 @@
+import os
+import json
+import uuid
+import shutil
+import datetime
+import urllib.parse
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_STORE_DIRECTORY = os.path.join('data', 'orders')
+
+# Column name -> dtype, one .npy file per column in every part
+ORDER_COLUMNS = {
+    'market_id': np.int64,
+    'order_id': np.int64,
+    'item_type': np.int64,
+    'unit_price': np.int64,  # cents, as logged
+    'buy_quantity': np.int32,
+    'expiration_date': 'datetime64[s]',
+    'update_date': 'datetime64[s]',
+    'order_type': np.int8,
+}
+ORDER_TYPES = ['Buy', 'Sell']
+# Written into a compacted part, the names of the parts it merged
+REPLACES_FILE = 'replaces.json'
+
+def utc_datetime64(when):
+    # Stored dates are UTC as logged, aware datetimes are converted, naive ones taken as UTC
+    if getattr(when, 'tzinfo', None) is not None:
+        when = when.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return np.datetime64(when, 's')
+
+class OrderStore:
+    """
+    Typed, columnar store of market orders.
+
+    Orders are partitioned by item and ingestion day:
+    <root>/<item>/<YYYY-MM-DD>/part-<n>-<suffix>/<column>.npy
+
+    Every append writes a new part. n keeps parts in write order, the random
+    suffix keeps writers that pick the same n at the same time apart. Days
+    are UTC days, like the log dates. Reads prune partitions by item and day,
+    then apply the price and expiration predicates to memory-mapped columns
+    before copying anything else out.
+    """
+    def __init__(self, root=DEFAULT_STORE_DIRECTORY):
+        self.root = root
+
+    def item_directory(self, item_name):
+        return os.path.join(self.root, urllib.parse.quote(item_name, safe=''))
+
+    def items(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(urllib.parse.unquote(name) for name in os.listdir(self.root))
+
+    def days(self, item_name):
+        item_directory = self.item_directory(item_name)
+        if not os.path.isdir(item_directory):
+            return []
+        return sorted(os.listdir(item_directory))
+
+    def append(self, market_orders, ingest_day=None):
+        """
+        Writes parsed orders as a new part of each item's partition for the day.
+
+        Args:
+            market_orders (OrderBatch): Orders from the log parser with item codes assigned.
+            ingest_day (date): Partition to write to, today in UTC when None.
+
+        Returns:
+            int: How many orders were written, orders of unknown items are not.
+        """
+        ingest_day = (ingest_day or datetime.datetime.now(datetime.timezone.utc).date()).isoformat()
+
+        written = 0
+        for item_name, orders in market_orders.by_item().items():
+            if not len(orders):
+                continue
+            day_directory = os.path.join(self.item_directory(item_name), ingest_day)
+            os.makedirs(day_directory, exist_ok=True)
+            part_name = f'part-{len(os.listdir(day_directory)):05d}-{uuid.uuid4().hex[:12]}'
+            self._write_part(os.path.join(day_directory, part_name), self._columns_from_batch(orders))
+            written += len(orders)
+
+        return written
+
+    def _columns_from_batch(self, orders):
+        # The batch is already typed, dates only need viewing as datetime64
+        columns = orders.to_numpy()
+        columns = {name: columns[name].astype(dtype, copy=False) for name, dtype in ORDER_COLUMNS.items() if name != 'order_type'}
+        # Buy orders are logged with a negative quantity
+        columns['order_type'] = np.where(columns['buy_quantity'] < 0, 0, 1).astype(np.int8)
+        return columns
+
+    def _write_part(self, part_directory, columns, replaces=()):
+        # Write to a temporary directory first so a reader never sees half a part
+        temp_directory = part_directory + '.tmp'
+        os.makedirs(temp_directory, exist_ok=True)
+        for name, values in columns.items():
+            np.save(os.path.join(temp_directory, name + '.npy'), values)
+        if replaces:
+            # Parts this one holds the orders of, readers skip them until they are deleted
+            with open(os.path.join(temp_directory, REPLACES_FILE), 'w') as file:
+                json.dump(list(replaces), file)
+        os.replace(temp_directory, part_directory)
+
+    def _parts(self, day_directory):
+        """
+        The parts of a partition to read, in write order.
+
+        Returns:
+            tuple: (parts, replaced), replaced the parts a compacted part already holds.
+        """
+        parts = sorted(part for part in os.listdir(day_directory) if not part.endswith('.tmp'))
+        replaced = set()
+        for part in parts:
+            manifest = os.path.join(day_directory, part, REPLACES_FILE)
+            if os.path.exists(manifest):
+                with open(manifest) as file:
+                    replaced.update(json.load(file))
+        return [part for part in parts if part not in replaced], sorted(replaced.intersection(parts))
+
+    def _read_part(self, part_directory, min_price=None, max_price=None, expires_after=None, order_type=None):
+        def column(name):
+            return np.load(os.path.join(part_directory, name + '.npy'), mmap_mode='r')
+
+        # Predicates first, on the memory-mapped columns
+        mask = None
+        def narrow(condition):
+            nonlocal mask
+            mask = condition if mask is None else mask & condition
+
+        if min_price is not None or max_price is not None:
+            unit_price = column('unit_price')
+            if min_price is not None:
+                narrow(unit_price >= min_price)
+            if max_price is not None:
+                narrow(unit_price <= max_price)
+        if expires_after is not None:
+            narrow(column('expiration_date') > utc_datetime64(expires_after))
+        if order_type is not None:
+            narrow(column('order_type') == ORDER_TYPES.index(order_type))
+
+        if mask is None:
+            return {name: np.array(column(name)) for name in ORDER_COLUMNS}
+        return {name: column(name)[mask] for name in ORDER_COLUMNS}
+
+    def read(self, item_names=None, since=None, until=None, min_price=None, max_price=None, expires_after=None, order_type=None, latest=True):
+        """
+        Loads orders into a typed DataFrame, reading only the partitions that match.
+
+        Args:
+            item_names (list): Items to load, every item when None.
+            since (date): First ingestion day to load.
+            until (date): Last ingestion day to load.
+            min_price (int): Lowest unit_price in cents.
+            max_price (int): Highest unit_price in cents.
+            expires_after (datetime): Drop orders expiring at or before this, naive means UTC.
+            order_type (str): 'Buy' or 'Sell', both when None.
+            latest (bool): Keep only the newest snapshot of each (market_id, order_id).
+
+        Returns:
+            DataFrame: One row per order, with item_name and order_type as categoricals.
+        """
+        if item_names is None:
+            item_names = self.items()
+        since = since.isoformat() if since else None
+        until = until.isoformat() if until else None
+
+        parts = []
+        item_codes = []
+        for code, item_name in enumerate(item_names):
+            for day in self.days(item_name):
+                if (since and day < since) or (until and day > until):
+                    continue
+                day_directory = os.path.join(self.item_directory(item_name), day)
+                for part in self._parts(day_directory)[0]:
+                    columns = self._read_part(os.path.join(day_directory, part), min_price, max_price, expires_after, order_type)
+                    parts.append(columns)
+                    item_codes.append(np.full(len(columns['order_id']), code, dtype=np.int32))
+
+        if parts:
+            data = {name: np.concatenate([part[name] for part in parts]) for name in ORDER_COLUMNS}
+            codes = np.concatenate(item_codes)
+        else:
+            data = {name: np.empty(0, dtype=dtype) for name, dtype in ORDER_COLUMNS.items()}
+            codes = np.empty(0, dtype=np.int32)
+
+        df = pd.DataFrame({name: data[name] for name in ORDER_COLUMNS if name != 'order_type'})
+        df['order_type'] = pd.Categorical.from_codes(data['order_type'], categories=ORDER_TYPES)
+        df['item_name'] = pd.Categorical.from_codes(codes, categories=list(item_names))
+
+        if latest and len(df):
+            # Parts are read oldest first, so a stable sort keeps later sightings last on ties
+            df = df.sort_values('update_date', kind='stable')
+            df = df.drop_duplicates(subset=['market_id', 'order_id'], keep='last').sort_index()
+
+        return df.reset_index(drop=True)
+
+    def compact(self, item_name=None):
+        """
+        Merges the parts of each partition into one, so reads open fewer files.
+
+        Args:
+            item_name (str): Only compact this item, every item when None.
+        """
+        for name in ([item_name] if item_name else self.items()):
+            for day in self.days(name):
+                day_directory = os.path.join(self.item_directory(name), day)
+                parts, replaced = self._parts(day_directory)
+                # Finish a compaction that stopped before deleting the parts it merged
+                for part in replaced:
+                    shutil.rmtree(os.path.join(day_directory, part))
+                if len(parts) < 2:
+                    continue
+                loaded = [self._read_part(os.path.join(day_directory, part)) for part in parts]
+                merged = {column: np.concatenate([part[column] for part in loaded]) for column in ORDER_COLUMNS}
+                # The merged part is in place before anything is deleted, a crash in between
+                # leaves old parts that its manifest already hides from readers
+                self._write_part(os.path.join(day_directory, f'part-00000-{uuid.uuid4().hex[:12]}'), merged, replaces=parts)
+                for part in parts:
+                    shutil.rmtree(os.path.join(day_directory, part))
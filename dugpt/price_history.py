@@ -0,0 +1,209 @@
+import os
+import json
+import datetime
+import urllib.parse
+
+import numpy as np
+import pandas as pd
+
+from dugpt.order_store import ORDER_TYPES
+
+DEFAULT_BARS_DIRECTORY = os.path.join('data', 'bars')
+DEFAULT_INTERVALS = ['1h', '1D']
+
+# The bars of every market together are kept under this market id
+ALL_MARKETS = 0
+
+# Column name -> dtype, one .npy file per column
+BAR_COLUMNS = {
+    'market_id': np.int64,
+    'order_type': np.int8,
+    'time': 'datetime64[s]',  # start of the interval
+    'open': np.int64,         # prices in cents, as logged
+    'high': np.int64,
+    'low': np.int64,
+    'close': np.int64,
+    'volume': np.int64,       # units listed, summed over every snapshot updated in the interval
+    'orders': np.int32,       # snapshots updated in the interval
+}
+BAR_KEY = ['market_id', 'order_type', 'time']
+
+def make_bars(snapshots, interval):
+    """
+    Open/high/low/close/volume of order snapshots, per market, side and interval.
+
+    Volume is listed quantity per snapshot, not units traded: an order updated
+    three times in an interval adds its quantity three times. Each distinct
+    snapshot is counted once, no matter how often it was logged.
+
+    Args:
+        snapshots (DataFrame): Order snapshots as read from the OrderStore, sorted by update_date.
+        interval (str): Bar length as a pandas frequency, e.g. '1h' or '1D'.
+
+    Returns:
+        DataFrame: One row per bar, columns as in BAR_COLUMNS.
+    """
+    df = pd.DataFrame({
+        'market_id': snapshots['market_id'].to_numpy(),
+        'order_type': snapshots['order_type'].cat.codes.to_numpy(),
+        'time': snapshots['update_date'].dt.floor(interval).to_numpy(),
+        'price': snapshots['unit_price'].to_numpy(),
+        'quantity': snapshots['buy_quantity'].abs().to_numpy(),
+    })
+    # Every market on its own, then all of them together
+    df = pd.concat([df, df.assign(market_id=ALL_MARKETS)], ignore_index=True)
+    bars = df.groupby(BAR_KEY, sort=True).agg(
+        open=('price', 'first'),
+        high=('price', 'max'),
+        low=('price', 'min'),
+        close=('price', 'last'),
+        volume=('quantity', 'sum'),
+        orders=('price', 'size'),
+    )
+    return bars.reset_index()
+
+def merge_bars(old, new):
+    # new only has snapshots updated after everything in old, so old opens and new closes
+    bars = pd.concat([old, new], ignore_index=True)
+    bars = bars.groupby(BAR_KEY, sort=True).agg(
+        open=('open', 'first'),
+        high=('high', 'max'),
+        low=('low', 'min'),
+        close=('close', 'last'),
+        volume=('volume', 'sum'),
+        orders=('orders', 'sum'),
+    )
+    return bars.reset_index()
+
+class PriceHistory:
+    """
+    Precomputed OHLCV bars of every item, built from the order store.
+
+    Bars live in <root>/<item>/<interval>/<column>.npy with a meta.json
+    holding the newest updateDate already folded in and the orders folded
+    in at that second. update() only reads the snapshots updated after
+    that, plus ones at that second for other orders, builds their bars and
+    merges them into the stored ones. Snapshots logged later with an older updateDate
+    than the mark are not folded in. Volume means listed quantity per
+    snapshot, see make_bars.
+    """
+    def __init__(self, root=DEFAULT_BARS_DIRECTORY, intervals=DEFAULT_INTERVALS):
+        self.root = root
+        self.intervals = intervals
+
+    def directory(self, item_name, interval):
+        return os.path.join(self.root, urllib.parse.quote(item_name, safe=''), interval)
+
+    def meta(self, item_name, interval):
+        # {'watermark': newest updateDate folded in, 'watermark_orders': [[market_id, order_id], ...] folded in at it}
+        meta_file = os.path.join(self.directory(item_name, interval), 'meta.json')
+        if not os.path.exists(meta_file):
+            return None
+        with open(meta_file) as file:
+            return json.load(file)
+
+    def watermark(self, item_name, interval):
+        meta = self.meta(item_name, interval)
+        return meta and meta.get('watermark')
+
+    def update(self, item_names, store):
+        """
+        Folds the snapshots stored since the last update into the bars.
+
+        Args:
+            item_names (list): Items to update.
+            store (OrderStore): Where the parsed orders are.
+
+        Returns:
+            int: How many new snapshots went into the bars.
+        """
+        folded = 0
+        for item_name in item_names:
+            # Only the partitions that can hold snapshots newer than every interval's mark.
+            # Partitions are named after the UTC ingest day, a day of slack covers the ones
+            # written with local days before that
+            watermarks = [self.watermark(item_name, interval) for interval in self.intervals]
+            since = None
+            if watermarks and None not in watermarks:
+                since = pd.Timestamp(min(watermarks)).date() - datetime.timedelta(days=1)
+
+            # Every distinct snapshot of every order, not just the latest
+            snapshots = store.read([item_name], since=since, latest=False)
+            snapshots = snapshots.dropna(subset=['update_date'])
+            snapshots = snapshots.drop_duplicates(subset=['market_id', 'order_id', 'update_date'], keep='last')
+            snapshots = snapshots.sort_values('update_date', kind='stable')
+
+            for interval in self.intervals:
+                meta = self.meta(item_name, interval)
+                if meta is None:
+                    new = snapshots
+                else:
+                    # Snapshots at the mark's second can arrive in a later ingest, only the orders
+                    # already folded in at it are left out
+                    watermark = pd.Timestamp(meta['watermark'])
+                    folded_at_mark = {tuple(key) for key in meta.get('watermark_orders', [])}
+                    at_mark = (snapshots['update_date'] == watermark).to_numpy().copy()
+                    keys = zip(snapshots['market_id'].to_numpy()[at_mark].tolist(), snapshots['order_id'].to_numpy()[at_mark].tolist())
+                    at_mark[at_mark] = [key not in folded_at_mark for key in keys]
+                    new = snapshots[(snapshots['update_date'] > watermark).to_numpy() | at_mark]
+                if new.empty:
+                    continue
+                bars = make_bars(new, interval)
+                if meta is not None:
+                    bars = merge_bars(self.read(item_name, interval, market_id=None, order_type=None), bars)
+
+                newest = new['update_date'].max()
+                at_newest = new[new['update_date'] == newest]
+                watermark_orders = set(zip(at_newest['market_id'].tolist(), at_newest['order_id'].tolist()))
+                if meta is not None and pd.Timestamp(meta['watermark']) == newest:
+                    watermark_orders |= folded_at_mark
+                self._write(item_name, interval, bars, newest, sorted(watermark_orders))
+                folded += len(new)
+        return folded
+
+    def _write(self, item_name, interval, bars, watermark, watermark_orders):
+        directory = self.directory(item_name, interval)
+        # Write to a temporary directory first so a reader never sees half the bars
+        temp_directory = directory + '.tmp'
+        os.makedirs(temp_directory, exist_ok=True)
+        for name, dtype in BAR_COLUMNS.items():
+            np.save(os.path.join(temp_directory, name + '.npy'), bars[name].to_numpy().astype(dtype))
+        with open(os.path.join(temp_directory, 'meta.json'), 'w') as file:
+            json.dump({'watermark': pd.Timestamp(watermark).isoformat(), 'watermark_orders': [list(key) for key in watermark_orders]}, file)
+        if os.path.isdir(directory):
+            old_directory = directory + '.old'
+            os.replace(directory, old_directory)
+            os.replace(temp_directory, directory)
+            for name in os.listdir(old_directory):
+                os.remove(os.path.join(old_directory, name))
+            os.rmdir(old_directory)
+        else:
+            os.replace(temp_directory, directory)
+
+    def read(self, item_name, interval='1h', market_id=ALL_MARKETS, order_type='Sell', since=None):
+        """
+        Loads stored bars.
+
+        Args:
+            item_name (str): The item.
+            interval (str): One of the intervals the bars were built with.
+            market_id (int): One market, ALL_MARKETS for every market together, None for all rows.
+            order_type (str): 'Buy' or 'Sell', both when None.
+            since (datetime): First bar to load.
+
+        Returns:
+            DataFrame: Bars sorted by market, side and time, prices in cents.
+        """
+        directory = self.directory(item_name, interval)
+        if not os.path.exists(os.path.join(directory, 'meta.json')):
+            return pd.DataFrame({name: np.empty(0, dtype=dtype) for name, dtype in BAR_COLUMNS.items()})
+
+        columns = {name: np.load(os.path.join(directory, name + '.npy'), mmap_mode='r') for name in BAR_COLUMNS}
+        mask = np.ones(len(columns['time']), dtype=bool)
+        if market_id is not None:
+            mask &= columns['market_id'] == market_id
+        if order_type is not None:
+            mask &= columns['order_type'] == ORDER_TYPES.index(order_type)
+        if since is not None:
+            mask &= columns['time'] >= np.datetime64(pd.Timestamp(since), 's')
+        return pd.DataFrame({name: np.asarray(values[mask]) for name, values in columns.items()})
@@ -0,0 +1,251 @@
+import json
+import math
+import heapq
+import argparse
+
+from dugpt.recipe_db import load_recipes
+from dugpt.recipes import BillOfMaterials, used_ingredients, product_quantity, default_recipe_file
+
+# Production Planner
+# Purpose: Turn a target list (as built by build_recipe_table in reference.lua) into a schedule
+# for the industry units we have, using each recipe's time and tier.
+
+def industry_units(units_per_tier):
+    # tier -> list of unit names, e.g. {1: 2} -> {1: ['T1-1', 'T1-2']}
+    return {tier: [f"T{tier}-{n + 1}" for n in range(count)] for tier, count in units_per_tier.items()}
+
+class ProductionPlanner:
+    """
+    Schedules the recipe runs of a target list across industry units.
+
+    A unit can run recipes of its own tier or lower. Jobs are list scheduled
+    by critical path: the job with the longest chain of work still behind it
+    goes first, onto the unit where it finishes earliest, and never before
+    the jobs making its ingredients are done.
+    """
+    def __init__(self, recipes, bill_of_materials=None):
+        self.bill_of_materials = bill_of_materials or BillOfMaterials(recipes)
+
+    def jobs(self, targets, stock=None, max_runs_per_job=None):
+        """
+        Breaks a target list into jobs.
+
+        Args:
+            targets (list): [{'id': item id, 'quantity': units}], the build_recipe_table format.
+            stock (dict): item id -> units already on hand.
+            max_runs_per_job (int): Split longer runs so several units can share them.
+
+        Returns:
+            list: Job dicts with recipe, item, tier, runs, quantity (units of item the
+            runs make), duration and the recipes that have to finish first ('depends_on').
+        """
+        return self._jobs(self._explode(targets, stock)['batches'], max_runs_per_job)
+
+    def _explode(self, targets, stock):
+        wanted = {}
+        for target in targets:
+            wanted[target['id']] = wanted.get(target['id'], 0) + target['quantity']
+        return self.bill_of_materials.explode(wanted, stock=stock)
+
+    def _jobs(self, batches, max_runs_per_job):
+        bom = self.bill_of_materials
+
+        # A recipe waits for every recipe making one of its ingredients
+        depends_on = {}
+        for recipe_id in batches:
+            producers = set()
+            for ingredient_id, _ in used_ingredients(bom.recipes_by_id[recipe_id]):
+                producer = bom.recipes_by_product.get(ingredient_id)
+                if producer is not None and producer['id'] in batches and producer['id'] != recipe_id:
+                    producers.add(producer['id'])
+            depends_on[recipe_id] = sorted(producers)
+
+        # One job per recipe, or several when split
+        jobs = []
+        for recipe_id, runs in batches.items():
+            recipe = bom.recipes_by_id[recipe_id]
+            chunk = max_runs_per_job or runs
+            for start in range(0, runs, chunk):
+                job = {
+                    'job': len(jobs),
+                    'recipe': recipe_id,
+                    'item': recipe['products'][0]['id'],
+                    'name': bom.name(recipe['products'][0]['id']),
+                    'tier': max(recipe.get('tier', 1), 1),
+                    'runs': min(chunk, runs - start),
+                    'depends_on': depends_on[recipe_id],
+                }
+                job['quantity'] = job['runs'] * product_quantity(recipe, job['item'])
+                job['duration'] = job['runs'] * recipe.get('time', 0)
+                jobs.append(job)
+        return jobs
+
+    def schedule(self, targets, units_per_tier, stock=None, max_runs_per_job=None):
+        """
+        Plans which unit crafts what, and when.
+
+        Args:
+            targets (list): [{'id': item id, 'quantity': units}], the build_recipe_table format.
+            units_per_tier (dict): tier -> number of industry units of that tier.
+            stock (dict): item id -> units already on hand.
+            max_runs_per_job (int): Split longer runs so several units can share them.
+
+        Returns:
+            dict: 'makespan' in seconds, 'units' unit name -> ordered jobs with start and end,
+            'unscheduled' jobs no unit is of a high enough tier for or that wait on each other,
+            and 'bought' item id -> units of craftable items to buy instead, the recipe cycle members.
+        """
+        explosion = self._explode(targets, stock)
+        jobs = self._jobs(explosion['batches'], max_runs_per_job)
+        bought = {item_id: units for item_id, units in explosion['raw'].items() if item_id in self.bill_of_materials.cycles}
+        units = industry_units(units_per_tier)
+        tiers = sorted(units)
+
+        # Dependencies are between recipes, all the jobs of a recipe become ready together
+        jobs_by_recipe = {}
+        for job in jobs:
+            jobs_by_recipe.setdefault(job['recipe'], []).append(job)
+        consumers = {recipe_id: [] for recipe_id in jobs_by_recipe}
+        waiting = {}
+        for recipe_id, recipe_jobs in jobs_by_recipe.items():
+            waiting[recipe_id] = len(recipe_jobs[0]['depends_on'])
+            for producer in recipe_jobs[0]['depends_on']:
+                consumers[producer].append(recipe_id)
+
+        # Critical path: a job's own time plus the longest chain of consumers after it
+        priority = {}
+        order = self._dependency_order(waiting, consumers)
+        for recipe_id in reversed(order):
+            longest = max(job['duration'] for job in jobs_by_recipe[recipe_id])
+            priority[recipe_id] = longest + max((priority[c] for c in consumers[recipe_id] if c in priority), default=0)
+
+        # Recipes waiting on each other, directly or through others, never become ready
+        ordered = set(order)
+        unscheduled = [job for job in jobs if job['recipe'] not in ordered]
+
+        # Free time of every unit, a heap per tier
+        free = {tier: [(0, name) for name in units[tier]] for tier in tiers}
+        for heap in free.values():
+            heapq.heapify(heap)
+
+        ready = []
+        def release(recipe_id):
+            for job in jobs_by_recipe[recipe_id]:
+                heapq.heappush(ready, (-priority[recipe_id], job['job']))
+
+        for recipe_id, count in waiting.items():
+            if count == 0:
+                release(recipe_id)
+
+        finish = {}  # recipe id -> when its last job is done
+        remaining = {recipe_id: len(recipe_jobs) for recipe_id, recipe_jobs in jobs_by_recipe.items()}
+        plan = {name: [] for tier in tiers for name in units[tier]}
+        while ready:
+            _, job_id = heapq.heappop(ready)
+            job = jobs[job_id]
+            recipe_id = job['recipe']
+            earliest = max((finish[d] for d in job['depends_on']), default=0)
+
+            # Earliest start on any unit of a high enough tier
+            best = None
+            for tier in tiers:
+                if tier < job['tier'] or not free[tier]:
+                    continue
+                start = max(free[tier][0][0], earliest)
+                if best is None or start < best[0]:
+                    best = (start, tier)
+
+            if best is None or earliest == math.inf:
+                unscheduled.append(job)
+                end = math.inf
+            else:
+                start, tier = best
+                _, name = heapq.heappop(free[tier])
+                end = start + job['duration']
+                heapq.heappush(free[tier], (end, name))
+                plan[name].append(dict(job, unit=name, start=start, end=end))
+
+            finish[recipe_id] = max(finish.get(recipe_id, 0), end)
+            remaining[recipe_id] -= 1
+            if remaining[recipe_id] == 0:
+                for consumer in consumers[recipe_id]:
+                    waiting[consumer] -= 1
+                    if waiting[consumer] == 0:
+                        release(consumer)
+
+        makespan = max((job['end'] for unit_jobs in plan.values() for job in unit_jobs), default=0)
+        return {'makespan': makespan, 'units': plan, 'unscheduled': unscheduled, 'bought': bought}
+
+    def _dependency_order(self, waiting, consumers):
+        # Recipes ordered so every recipe comes after the recipes it depends on
+        waiting = dict(waiting)
+        ready = [recipe_id for recipe_id, count in waiting.items() if count == 0]
+        order = []
+        while ready:
+            recipe_id = ready.pop()
+            order.append(recipe_id)
+            for consumer in consumers[recipe_id]:
+                waiting[consumer] -= 1
+                if waiting[consumer] == 0:
+                    ready.append(consumer)
+        return order
+
+def schedule_to_json(schedule):
+    return json.dumps(schedule, default=str)
+
+def schedule_to_lua(schedule):
+    """
+    Writes a schedule as a Lua table a program board can load.
+
+    Returns:
+        str: 'return { makespan = ..., units = { ["T1-1"] = { {id=..., quantity=..., runs=..., ...}, ... } } }'
+    """
+    lines = ["return {", f"  makespan = {schedule['makespan']},", "  units = {"]
+    for name, jobs in schedule['units'].items():
+        lines.append(f'    ["{name}"] = {{')
+        for job in jobs:
+            # id/quantity (units of product) match the entries of build_recipe_table, after lists the recipes to wait for
+            lines.append(f"      {{ id = {job['item']}, quantity = {job['quantity']}, runs = {job['runs']}, recipe = {job['recipe']}, "
+                         f"start = {job['start']}, finish = {job['end']}, after = {{ {', '.join(str(d) for d in job['depends_on'])} }}, job = {job['job']} }},")
+        lines.append("    },")
+    lines.append("  },")
+    lines.append("}")
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description='Plan industry queues for a target list.')
+    parser.add_argument('targets', help='JSON file with [{"id": item id, "quantity": units}]')
+    parser.add_argument('--units', nargs='+', default=['1=1', '2=1', '3=1', '4=1', '5=1'], help='Industry units per tier, as tier=count')
+    parser.add_argument('--stock', help='JSON file with {item id: units on hand}')
+    parser.add_argument('--max-runs', type=int, default=None, help='Split jobs longer than this many runs')
+    parser.add_argument('--recipes', default=default_recipe_file, help='recipes.json to plan with')
+    parser.add_argument('--lua', help='Write the schedule as a Lua table to this file')
+    args = parser.parse_args()
+
+    with open(args.targets) as file:
+        targets = json.load(file)
+    stock = None
+    if args.stock:
+        with open(args.stock) as file:
+            stock = {int(item_id): units for item_id, units in json.load(file).items()}
+    units_per_tier = {int(tier): int(count) for tier, count in (unit.split('=') for unit in args.units)}
+
+    planner = ProductionPlanner(load_recipes(args.recipes))
+    schedule = planner.schedule(targets, units_per_tier, stock, args.max_runs)
+
+    for name, jobs in schedule['units'].items():
+        print(f"{name}: {len(jobs)} jobs, busy until {max((job['end'] for job in jobs), default=0):,}s")
+    print(f"Makespan: {schedule['makespan']:,}s")
+    if schedule['unscheduled']:
+        print(f"{len(schedule['unscheduled'])} jobs could not be scheduled: no high enough tier unit, or recipes waiting on each other")
+    for item_id, units in schedule['bought'].items():
+        print(f"Buy {units} x {planner.bill_of_materials.name(item_id)}: its recipes go round in a cycle")
+
+    if args.lua:
+        with open(args.lua, 'w') as file:
+            file.write(schedule_to_lua(schedule))
+    else:
+        print(schedule_to_json(schedule))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+import argparse
+import datetime
+
+import numpy as np
+
+from dugpt.recipes import BillOfMaterials, product_quantity, used_ingredients, default_recipe_file
+from dugpt.recipe_db import load_recipes
+
+# Recipe profitability
+# Every recipe is reduced once to the raw materials one run takes, crafting everything below it.
+# Ranking against a set of prices is then one sparse matrix-vector product.
+
+class ProfitabilityEngine:
+    """
+    Material cost, sale price and margin of every recipe at market prices.
+
+    The recipe graph is walked once, ingredients before products, to find
+    how many units of each raw material one run of every recipe takes. Those
+    requirements are kept as a sparse recipe x raw material matrix in
+    coordinate form, so costing all recipes against new prices is a single
+    weighted bincount instead of a recursive walk per recipe.
+
+    Like RecipeCostEngine, ingredients are costed per unit (no rounding up to
+    whole batches), catalysts only count for what is used up and items in a
+    recipe cycle are bought as raw materials.
+    """
+    def __init__(self, recipes):
+        recipes = list(recipes or [])
+        bill_of_materials = BillOfMaterials(recipes)
+        self.names = bill_of_materials.names
+
+        # Step 1: Raw units that go into one unit of every item, ingredients first
+        requirements = {}
+        def requirement(item_id):
+            if item_id not in requirements:
+                requirements[item_id] = {item_id: 1}  # raw material or cycle, bought
+            return requirements[item_id]
+
+        for item_id in reversed(bill_of_materials.order):
+            recipe = bill_of_materials.recipes_by_product.get(item_id)
+            if recipe is None or item_id in bill_of_materials.cycles:
+                continue
+            made = product_quantity(recipe, item_id)
+            total = {}
+            for ingredient_id, used in bill_of_materials.edges[item_id]:
+                for raw_id, amount in requirement(ingredient_id).items():
+                    total[raw_id] = total.get(raw_id, 0) + used * amount / made
+            requirements[item_id] = total
+
+        # Step 2: One row per recipe, one column per raw material
+        self.raw_ids = sorted({raw_id for recipe in recipes for ingredient_id, _ in used_ingredients(recipe)
+                               for raw_id in requirement(ingredient_id)})
+        self.raw_columns = {raw_id: column for column, raw_id in enumerate(self.raw_ids)}
+        rows, columns, amounts = [], [], []
+        for row, recipe in enumerate(recipes):
+            batch = {}
+            for ingredient_id, used in used_ingredients(recipe):
+                for raw_id, amount in requirement(ingredient_id).items():
+                    batch[raw_id] = batch.get(raw_id, 0) + used * amount
+            for raw_id, amount in batch.items():
+                rows.append(row)
+                columns.append(self.raw_columns[raw_id])
+                amounts.append(amount)
+        self.rows = np.array(rows, dtype=np.int64)
+        self.columns = np.array(columns, dtype=np.int64)
+        self.amounts = np.array(amounts, dtype=np.float64)
+
+        # Step 3: What every recipe makes and how long it takes
+        self.recipe_ids = np.array([recipe['id'] for recipe in recipes], dtype=np.int64)
+        self.product_ids = np.array([recipe['products'][0]['id'] if recipe.get('products') else 0 for recipe in recipes], dtype=np.int64)
+        self.product_quantities = np.array([product_quantity(recipe, recipe['products'][0]['id']) if recipe.get('products') else 0
+                                            for recipe in recipes], dtype=np.float64)
+        self.times = np.array([recipe.get('time') or 0 for recipe in recipes], dtype=np.float64)
+        self.tiers = np.array([recipe.get('tier') or 0 for recipe in recipes], dtype=np.int64)
+
+    def __len__(self):
+        return len(self.recipe_ids)
+
+    def requirements(self):
+        """
+        The requirement matrix as a dense array, mostly for inspection.
+
+        Returns:
+            ndarray: recipes x raw materials, raw units per run, columns in raw_ids order.
+        """
+        matrix = np.zeros((len(self.recipe_ids), len(self.raw_ids)))
+        np.add.at(matrix, (self.rows, self.columns), self.amounts)
+        return matrix
+
+    def material_costs(self, prices):
+        """
+        Raw material cost of one run of every recipe.
+
+        Args:
+            prices (dict): item id -> price of one unit. Missing raw materials make the cost NaN.
+
+        Returns:
+            ndarray: One cost per recipe, in the order the recipes were given.
+        """
+        price_vector = np.array([prices.get(raw_id, np.nan) for raw_id in self.raw_ids], dtype=np.float64)
+        if not len(self.amounts):
+            return np.zeros(len(self.recipe_ids))
+        return np.bincount(self.rows, weights=self.amounts * price_vector[self.columns], minlength=len(self.recipe_ids))
+
+    def rank(self, buy_prices, sell_prices=None):
+        """
+        Ranks every recipe by margin per hour of crafting.
+
+        Args:
+            buy_prices (dict): item id -> what a unit costs, e.g. the lowest sell order.
+            sell_prices (dict): item id -> what a unit sells for, e.g. the highest buy order.
+                buy_prices when None.
+
+        Returns:
+            DataFrame: One row per recipe with material_cost, sale_price, margin (all per run)
+            and margin_per_hour, best first. Recipes missing a price come last with NaNs.
+        """
+        import pandas as pd
+
+        sell_prices = buy_prices if sell_prices is None else sell_prices
+        material_cost = self.material_costs(buy_prices)
+        unit_price = np.array([sell_prices.get(product_id, np.nan) for product_id in self.product_ids.tolist()], dtype=np.float64)
+        sale_price = unit_price * self.product_quantities
+        margin = sale_price - material_cost
+        with np.errstate(divide='ignore', invalid='ignore'):
+            margin_per_hour = np.where(self.times > 0, margin / (self.times / 3600), np.nan)
+
+        ranking = pd.DataFrame({
+            'recipe_id': self.recipe_ids,
+            'product_id': self.product_ids,
+            'product': [self.names.get(product_id, str(product_id)) for product_id in self.product_ids.tolist()],
+            'tier': self.tiers,
+            'time': self.times,
+            'material_cost': material_cost,
+            'sale_price': sale_price,
+            'margin': margin,
+            'margin_per_hour': margin_per_hour,
+        })
+        return ranking.sort_values('margin_per_hour', ascending=False, na_position='last', kind='stable').reset_index(drop=True)
+
+def market_prices(orders):
+    """
+    Best prices per item from parsed orders.
+
+    Args:
+        orders (DataFrame): Orders as read from the OrderStore, unit_price in cents.
+
+    Returns:
+        tuple: (asks, bids), item id -> lowest sell order and item id -> highest buy order, in cents.
+    """
+    sells = orders[orders['order_type'] == 'Sell']
+    buys = orders[orders['order_type'] == 'Buy']
+    asks = sells.groupby('item_type')['unit_price'].min()
+    bids = buys.groupby('item_type')['unit_price'].max()
+    return asks.astype(float).to_dict(), bids.astype(float).to_dict()
+
+def book_prices(books, item_ids):
+    """
+    Best prices per item across every market of live OrderBooks.
+
+    Returns:
+        tuple: (asks, bids) like market_prices.
+    """
+    asks, bids = {}, {}
+    for item_id in item_ids:
+        ask = books.best_ask(item_id)
+        bid = books.best_bid(item_id)
+        if ask is not None:
+            asks[item_id] = float(ask[0])
+        if bid is not None:
+            bids[item_id] = float(bid[0])
+    return asks, bids
+
+def main(argv=None):
+    from dugpt.order_store import OrderStore
+
+    parser = argparse.ArgumentParser(description='Rank recipes by margin per hour at current market prices.')
+    parser.add_argument('--recipes', default=default_recipe_file, help='recipes.json to rank')
+    parser.add_argument('--top', type=int, default=25, help='How many recipes to show')
+    parser.add_argument('--sell-at', choices=['bid', 'ask'], default='bid',
+                        help='Value products at the highest buy order (sell now) or the lowest sell order (list and wait)')
+    parser.add_argument('--output', help='Also write the full ranking to this CSV file')
+    args = parser.parse_args(argv)
+
+    engine = ProfitabilityEngine(load_recipes(args.recipes))
+    orders = OrderStore().read(expires_after=datetime.datetime.now(datetime.timezone.utc))
+    asks, bids = market_prices(orders)
+    ranking = engine.rank(asks, bids if args.sell_at == 'bid' else asks)
+
+    priced = ranking['margin_per_hour'].notna().sum()
+    print(f"{priced:,} of {len(ranking):,} recipes have prices for every material and their product")
+    shown = ranking.head(args.top).copy()
+    for column in ('material_cost', 'sale_price', 'margin', 'margin_per_hour'):
+        shown[column] = shown[column] / 100  # cents -> dollars
+    print(shown[['product', 'tier', 'time', 'material_cost', 'sale_price', 'margin', 'margin_per_hour']].to_string(index=False))
+    if args.output:
+        ranking.to_csv(args.output, index=False)
+
+if __name__ == '__main__':
+    main()
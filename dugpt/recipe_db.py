@@ -0,0 +1,204 @@
+import os
+import json
+import mmap
+import struct
+from array import array
+from collections.abc import Sequence
+
+# Compiled recipe database
+# recipes.json repeats three display names for every ingredient and product of every recipe,
+# so parsing it is most of the recipe tool's start up. The compiled file keeps the same data
+# as flat arrays plus one table of interned strings, and is memory mapped instead of parsed.
+
+MAGIC = b'DURB'
+VERSION = 1
+HEADER = struct.Struct('<4sHxxqqIIIII')
+NO_STRING = 0xFFFFFFFF
+NAME_KEYS = ('displayNameWithSize', 'locDisplayNameWithSize', 'locDisplayNameWithSizeDE')
+
+# Section name, array typecode, in file order
+SECTIONS = [
+    ('recipe_ids', 'Q'), ('times', 'I'), ('tiers', 'b'), ('nanocraftable', 'B'),
+    ('ingredient_offsets', 'I'), ('ingredient_ids', 'Q'), ('ingredient_quantities', 'd'), ('ingredient_names', 'I'),
+    ('product_offsets', 'I'), ('product_ids', 'Q'), ('product_quantities', 'd'), ('product_names', 'I'),
+    ('string_offsets', 'I'), ('strings', 'B'),
+]
+
+def default_cache_path(json_path):
+    return os.path.splitext(json_path)[0] + '.bin'
+
+def compile_recipes(json_path, cache_path=None):
+    """
+    Compiles recipes.json into the binary format.
+
+    Args:
+        json_path (str): The recipes.json to compile.
+        cache_path (str): Where to write it, recipes.bin next to the JSON when None.
+
+    Returns:
+        str: The path of the compiled file.
+    """
+    cache_path = cache_path or default_cache_path(json_path)
+    stat = os.stat(json_path)
+    with open(json_path, encoding='utf-8') as file:
+        recipes = json.load(file)
+
+    strings = {}
+    def intern(value):
+        if value is None:
+            return NO_STRING
+        return strings.setdefault(value, len(strings))
+
+    sections = {name: array(typecode) for name, typecode in SECTIONS}
+    sections['ingredient_offsets'].append(0)
+    sections['product_offsets'].append(0)
+    for recipe in recipes:
+        sections['recipe_ids'].append(recipe['id'])
+        sections['times'].append(recipe.get('time', 0))
+        sections['tiers'].append(recipe.get('tier', 0))
+        sections['nanocraftable'].append(1 if recipe.get('nanocraftable') else 0)
+        for kind in ('ingredient', 'product'):
+            edges = recipe.get(kind + 's', [])
+            for edge in edges:
+                sections[kind + '_ids'].append(edge['id'])
+                sections[kind + '_quantities'].append(edge['quantity'])
+                sections[kind + '_names'].extend(intern(edge.get(key)) for key in NAME_KEYS)
+            sections[kind + '_offsets'].append(len(sections[kind + '_ids']))
+
+    blob = bytearray()
+    sections['string_offsets'].append(0)
+    for value in strings:
+        blob += value.encode('utf-8')
+        sections['string_offsets'].append(len(blob))
+    sections['strings'] = array('B', blob)
+
+    header = HEADER.pack(MAGIC, VERSION, stat.st_mtime_ns, stat.st_size, len(recipes),
+                         len(sections['ingredient_ids']), len(sections['product_ids']), len(strings), len(blob))
+
+    # Write next to the target then swap, a reader never sees half a file
+    temp_path = cache_path + '.tmp'
+    with open(temp_path, 'wb') as file:
+        file.write(header)
+        for name, _ in SECTIONS:
+            data = sections[name].tobytes()
+            file.write(data)
+            file.write(b'\0' * (-len(data) % 8))
+    os.replace(temp_path, cache_path)
+    return cache_path
+
+class CompiledRecipes(Sequence):
+    """
+    The recipes of a compiled database, as a read-only list of recipe dicts.
+
+    The arrays are views into the memory-mapped file. A recipe dict is only
+    built, in the same shape as recipes.json, the first time it is asked for.
+    """
+    def __init__(self, cache_path):
+        self.cache_path = cache_path
+        with open(cache_path, 'rb') as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+
+        magic, version, self.source_mtime_ns, self.source_size, n_recipes, n_ingredients, n_products, n_strings, n_bytes = HEADER.unpack_from(view)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{cache_path} is not a compiled recipe database")
+
+        counts = {
+            'recipe_ids': n_recipes, 'times': n_recipes, 'tiers': n_recipes, 'nanocraftable': n_recipes,
+            'ingredient_offsets': n_recipes + 1, 'ingredient_ids': n_ingredients, 'ingredient_quantities': n_ingredients, 'ingredient_names': 3 * n_ingredients,
+            'product_offsets': n_recipes + 1, 'product_ids': n_products, 'product_quantities': n_products, 'product_names': 3 * n_products,
+            'string_offsets': n_strings + 1, 'strings': n_bytes,
+        }
+        position = HEADER.size
+        for name, typecode in SECTIONS:
+            size = counts[name] * array(typecode).itemsize
+            setattr(self, name, view[position:position + size].cast(typecode))
+            position += size + (-size % 8)
+
+        self._strings = {}
+        self._recipes = {}
+        self._columns = {}
+
+    def string(self, index):
+        # Interned strings are decoded once
+        if index == NO_STRING:
+            return None
+        value = self._strings.get(index)
+        if value is None:
+            value = bytes(self.strings[self.string_offsets[index]:self.string_offsets[index + 1]]).decode('utf-8')
+            self._strings[index] = value
+        return value
+
+    def _column(self, name):
+        # Building dicts from Python lists is a lot faster than indexing the memoryviews
+        column = self._columns.get(name)
+        if column is None:
+            column = getattr(self, name).tolist()
+            self._columns[name] = column
+        return column
+
+    def _edges(self, kind, index):
+        offsets = self._column(kind + '_offsets')
+        ids = self._column(kind + '_ids')
+        quantities = self._column(kind + '_quantities')
+        names = self._column(kind + '_names')
+        edges = []
+        for edge in range(offsets[index], offsets[index + 1]):
+            quantity = quantities[edge]
+            entry = {'quantity': int(quantity) if quantity.is_integer() else quantity, 'id': ids[edge]}
+            for key, name in zip(NAME_KEYS, names[3 * edge:3 * edge + 3]):
+                if name != NO_STRING:
+                    entry[key] = self.string(name)
+            edges.append(entry)
+        return edges
+
+    def __len__(self):
+        return len(self.recipe_ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        recipe = self._recipes.get(index)
+        if recipe is None:
+            if not 0 <= index < len(self):
+                raise IndexError(index)
+            recipe = {
+                'id': self._column('recipe_ids')[index],
+                'tier': self._column('tiers')[index],
+                'time': self._column('times')[index],
+                'nanocraftable': bool(self._column('nanocraftable')[index]),
+                'ingredients': self._edges('ingredient', index),
+                'products': self._edges('product', index),
+            }
+            self._recipes[index] = recipe
+        return recipe
+
+def is_stale(json_path, cache_path):
+    # The compiled file remembers the mtime and size of the JSON it came from
+    if not os.path.exists(cache_path):
+        return True
+    stat = os.stat(json_path)
+    with open(cache_path, 'rb') as file:
+        header = file.read(HEADER.size)
+    if len(header) < HEADER.size:
+        return True
+    magic, version, mtime_ns, size = HEADER.unpack(header)[:4]
+    return magic != MAGIC or version != VERSION or mtime_ns != stat.st_mtime_ns or size != stat.st_size
+
+def load_recipes(json_path, cache_path=None):
+    """
+    Loads recipes through the compiled database, compiling it first when recipes.json changed.
+
+    Args:
+        json_path (str): The recipes.json file.
+        cache_path (str): The compiled file, recipes.bin next to the JSON when None.
+
+    Returns:
+        CompiledRecipes: The recipes, as a lazy read-only list of dicts.
+    """
+    cache_path = cache_path or default_cache_path(json_path)
+    if is_stale(json_path, cache_path):
+        compile_recipes(json_path, cache_path)
+    return CompiledRecipes(cache_path)
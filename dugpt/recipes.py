@@ -0,0 +1,596 @@
+import json
+import math
+import random
+import re
+import contextlib
+
+from dugpt.recipe_db import load_recipes
+from dugpt.item_helper import SearchIndex
+from dugpt.metrics import get_run_metrics
+
+item_data = None  # Global variable to store the loaded item data
+items_by_id = {}  # id -> item, rebuilt with item_data
+item_index = None  # Name search over item_data, built on first search
+recipe_index = None  # Name search over recipe products, built on first search
+recipe_data = None  # Global variable to store the recipe data
+default_item_file = "items.json"
+default_recipe_file = "recipes.json"
+
+def load_item_data(file_path=default_item_file):
+    global item_data, items_by_id, item_index
+    try:
+        with open(file_path) as file:
+            item_data = json.load(file)
+        items_by_id = {item['id']: item for item in item_data}
+        item_index = None
+        print("Item data loaded successfully.")
+    except FileNotFoundError:
+        print("File not found. Unable to load item data.")
+
+def load_recipe_data(file_path=default_recipe_file):
+    global recipe_data, cost_engine, bill_of_materials, recipe_index
+    try:
+        # Compiled, memory-mapped copy of the JSON, rebuilt when the JSON changes
+        try:
+            recipe_data = load_recipes(file_path)
+        except PermissionError:
+            with open(file_path) as file:
+                recipe_data = json.load(file)
+        cost_engine = None
+        bill_of_materials = None
+        recipe_index = None
+        print("Recipe data loaded successfully.")
+    except FileNotFoundError:
+        print("File not found. Unable to load recipe data.")
+
+def save_item_data(file_path=default_item_file):
+    if item_data:
+        try:
+            with open(file_path, 'w') as file:
+                json.dump(item_data, file)
+            print("Item data saved successfully.")
+        except:
+            print("Error occurred while saving item data.")
+    else:
+        print("No item data to save.")
+
+def save_recipe_data(file_path=default_recipe_file):
+    if recipe_data:
+        try:
+            with open(file_path, 'w') as file:
+                json.dump(list(recipe_data), file)
+            print("Recipe data saved successfully.")
+        except:
+            print("Error occurred while saving recipe data.")
+    else:
+        print("No recipe data to save.")
+
+def select_random_items(item_list, num_items):
+    """
+    Selects a specified number of random items from a given list.
+    
+    Args:
+        item_list (list): The list of items to choose from.
+        num_items (int): The number of items to select.
+        
+    Returns:
+        list: A list of randomly selected items.
+    """
+    if num_items > len(item_list):
+        num_items = len(item_list)
+        
+    random_items = random.sample(item_list, num_items)
+    return random_items
+
+def print_items(limit=10):
+    if item_data:
+        count = len(item_data)
+        print(f"Item data count: {count}")
+        
+        if limit:
+            for item in select_random_items(item_data, limit):
+                print_item(item)
+                print()
+        else: 
+            for item in item_data:
+                print_item(item)
+                print()
+            
+    else:
+        print("No item data loaded.")
+
+def print_item(item):
+    print(f"Item ID: {item['id']}")
+    print(f"Display Name with Size: {item['displayNameWithSize']}")
+    #print(f"Local Display Name with Size: {item['locDisplayNameWithSize']}")
+    #print(f"Description: {item['description']}")
+    if item.get('schematics'):
+        print("Schematics:", end=" ")
+        for schematic_id in item['schematics']:
+            schematic_item = items_by_id.get(schematic_id)
+            if schematic_item:
+                #print(f"- Schematic ID: {schematic_item['id']}")
+                print(f"  Schematic Display Name: {schematic_item['displayNameWithSize']}")
+                #print(f"  Schematic Local Display Name with Size: {schematic_item['locDisplayNameWithSize']}")
+    else:
+        print("No schematics available.")
+    if item.get('products'):
+        cost = calculate_item_cost(item)
+        print(f"Item Cost: {cost}")
+    else:
+        print("No products available.")
+
+def print_recipes(limit=10):
+    if recipe_data:
+        count = len(recipe_data)
+        print(f"Recipe data count: {count}")
+        if limit:
+            for recipe in select_random_items(recipe_data, limit):
+                print_recipe(recipe)
+                print()
+        else:
+            for recipe in recipe_data:
+                print_recipe(recipe)
+                print()
+    else:
+        print("No recipe data loaded.")
+
+def print_recipe(recipe):
+    print(f"Recipe ID: {recipe['id']}")
+    if recipe.get('ingredients'):
+        print("Ingredients:")
+        for ingredient in recipe['ingredients']:
+            #print(f"- Ingredient ID: {ingredient['id']}")
+            print(f"  Ingredient Display Name: {ingredient['displayNameWithSize']}")
+    else:
+        print("No ingredients available.")
+    if recipe.get('products'):
+        product = recipe['products'][0]  # Only use the first product in the list
+        print("Product:")
+        # print(f"- Product ID: {product['id']}")
+        print(f"  Product Display Name: {product['displayNameWithSize']}")
+    else:
+        print("No products available.")
+
+def sample_item_data():
+    if item_data:
+        if len(item_data) > 0:
+            random_item = random.choice(item_data)
+            print("Random item:")
+            print_item(random_item)
+        else:
+            print("No item data items.")
+    else:
+        print("No item data loaded.")
+
+def sample_recipe_data():
+    if recipe_data:
+        if len(recipe_data) > 0:
+            random_recipe = random.choice(recipe_data)
+            print("Random recipe:")
+            print_recipe(random_recipe)
+        else:
+            print("No recipe data items.")
+    else:
+        print("No recipe data loaded.")
+
+def index_recipes_by_product(recipes):
+    # product id -> recipe, the recipe that makes an item as its main product wins over a by-product
+    recipes_by_product = {}
+    for recipe in recipes:
+        for product in recipe.get('products', [])[:1]:
+            recipes_by_product.setdefault(product['id'], recipe)
+    for recipe in recipes:
+        for product in recipe.get('products', [])[1:]:
+            recipes_by_product.setdefault(product['id'], recipe)
+    return recipes_by_product
+
+def used_ingredients(recipe):
+    # (ingredient id, quantity) one run uses up, catalysts the recipe gives back don't count
+    returned = {}
+    for product in recipe.get('products', []):
+        returned[product['id']] = returned.get(product['id'], 0) + product['quantity']
+
+    used = []
+    for ingredient in recipe.get('ingredients', []):
+        quantity = ingredient['quantity'] - returned.get(ingredient['id'], 0)
+        if quantity > 0:
+            used.append((ingredient['id'], quantity))
+    return used
+
+def product_quantity(recipe, item_id):
+    return sum(product['quantity'] for product in recipe['products'] if product['id'] == item_id)
+
+def order_items(edges):
+    """
+    Every item, each product ahead of its ingredients, and the items in recipe cycles.
+
+    Tarjan's strongly connected components over item -> ingredient edges. Only
+    the members of a component with more than one item, or an item that uses
+    itself up, are in a cycle and get bought instead of crafted. Items that
+    merely sit below a cycle are crafted like any other.
+
+    Args:
+        edges (dict): item id -> used_ingredients of the recipe making it.
+
+    Returns:
+        tuple: (order, cycles), order a list of item ids, cycles a set of them.
+    """
+    index, lowlink = {}, {}
+    stack, on_stack = [], set()
+    components = []
+
+    def visit(item_id):
+        index[item_id] = lowlink[item_id] = len(index)
+        stack.append(item_id)
+        on_stack.add(item_id)
+        return item_id, iter(edges.get(item_id, ()))
+
+    # Iterative, a deep recipe chain would overflow the recursion limit
+    nodes = list(edges) + [ingredient_id for ingredients in edges.values() for ingredient_id, _ in ingredients]
+    for root in nodes:
+        if root in index:
+            continue
+        work = [visit(root)]
+        while work:
+            item_id, ingredients = work[-1]
+            for ingredient_id, _ in ingredients:
+                if ingredient_id not in index:
+                    work.append(visit(ingredient_id))
+                    break
+                if ingredient_id in on_stack:
+                    lowlink[item_id] = min(lowlink[item_id], index[ingredient_id])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[item_id])
+                if lowlink[item_id] == index[item_id]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == item_id:
+                            break
+                    components.append(component)
+
+    # Components come out ingredients first
+    order = [item_id for component in reversed(components) for item_id in component]
+    cycles = {item_id for component in components if len(component) > 1 for item_id in component}
+    cycles.update(item_id for item_id, ingredients in edges.items() if any(ingredient_id == item_id for ingredient_id, _ in ingredients))
+    return order, cycles
+
+class RecipeCostEngine:
+    """
+    Per-unit crafting cost of every item, computed once and memoized.
+
+    Items no recipe produces are raw materials and cost their price (1 by
+    default, so a cost is the number of raw units that go into an item).
+    A crafted item costs its recipe's ingredients divided by how many units
+    the recipe makes. Ingredients a recipe gives back, like catalysts, only
+    count for what is used up. Items in a recipe cycle are bought, costing
+    their price like a raw material, the same set BillOfMaterials buys.
+    """
+    def __init__(self, recipes, prices=None, default_price=1):
+        self.default_price = default_price
+        self.prices = {}
+        self.cycles = set()
+        self.set_recipes(recipes)
+        self.set_prices(prices or {})
+
+    def set_recipes(self, recipes):
+        self.recipes = recipes or []
+        self.recipes_by_id = {recipe['id']: recipe for recipe in self.recipes}
+        self.recipes_by_product = index_recipes_by_product(self.recipes)
+        # Found once up front, so a cycle member's cost doesn't depend on which item was asked for first
+        _, self.cycles = order_items({item_id: used_ingredients(recipe) for item_id, recipe in self.recipes_by_product.items()})
+        self.invalidate()
+
+    def set_prices(self, prices):
+        # item id -> price of one raw unit
+        self.prices = dict(prices)
+        self.invalidate()
+
+    def invalidate(self):
+        self.unit_costs = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def recipe_for(self, item_id):
+        return self.recipes_by_product.get(item_id)
+
+    def unit_cost(self, item_id):
+        """
+        Cost of one unit of an item.
+
+        Args:
+            item_id (int): The item to cost.
+
+        Returns:
+            float: The per-unit cost. Part of a recipe cycle is costed as a raw material.
+        """
+        cost = self.unit_costs.get(item_id)
+        if cost is not None:
+            self.cache_hits += 1
+            return cost
+        self.cache_misses += 1
+
+        recipe = self.recipe_for(item_id)
+        if recipe is None or item_id in self.cycles:
+            cost = self.prices.get(item_id, self.default_price)
+        else:
+            cost = self.batch_cost(recipe) / product_quantity(recipe, item_id)
+
+        self.unit_costs[item_id] = cost
+        return cost
+
+    def batch_cost(self, recipe):
+        """
+        Cost of the ingredients one run of a recipe uses up.
+
+        Args:
+            recipe (dict): A recipe from recipes.json.
+
+        Returns:
+            float: The cost of one batch.
+        """
+        cost = 0
+        for ingredient_id, used in used_ingredients(recipe):
+            cost += self.unit_cost(ingredient_id) * used
+        return cost
+
+    def cost_all_recipes(self):
+        """
+        Costs every recipe in one call.
+
+        Returns:
+            dict: recipe id -> batch cost.
+        """
+        with self.metered():
+            return {recipe['id']: self.batch_cost(recipe) for recipe in self.recipes}
+
+    @contextlib.contextmanager
+    def metered(self, stage='recipe_cost'):
+        # Times the block and records the memo hits and misses it caused
+        metrics = get_run_metrics()
+        hits, misses = self.cache_hits, self.cache_misses
+        with metrics.stage(stage):
+            yield
+        metrics.cache(stage, self.cache_hits - hits, self.cache_misses - misses)
+
+cost_engine = None  # Global cost engine, built from recipe_data on first use
+
+def get_cost_engine():
+    global cost_engine
+    if cost_engine is None:
+        cost_engine = RecipeCostEngine(recipe_data)
+    return cost_engine
+
+def calculate_item_cost(item):
+    # Per-unit cost of an item, 0 when nothing crafts it
+    engine = get_cost_engine()
+    if engine.recipe_for(item['id']) is None:
+        return 0
+    with engine.metered():
+        return engine.unit_cost(item['id'])
+
+def calculate_recipe_cost(recipe):
+    if 'ingredients' in recipe and 'products' in recipe:
+        engine = get_cost_engine()
+        with engine.metered():
+            return engine.batch_cost(recipe)
+    else:
+        return 0
+
+def calculate_ingredient_cost(ingredient):
+    if 'quantity' in ingredient and 'id' in ingredient:
+        engine = get_cost_engine()
+        with engine.metered():
+            return engine.unit_cost(ingredient['id']) * ingredient['quantity']
+    return 0
+
+class BillOfMaterials:
+    """
+    Explodes a shopping list of items into the raw materials it takes.
+
+    The recipe graph is put in topological order once, every product ahead
+    of its ingredients. Exploding a list is then one sweep down that order,
+    pushing each item's demand into its ingredients, so any number of
+    targets costs the same single pass.
+    """
+    def __init__(self, recipes):
+        self.recipes_by_id = {recipe['id']: recipe for recipe in recipes or []}
+        self.recipes_by_product = index_recipes_by_product(recipes or [])
+        self.names = {}
+        for recipe in recipes or []:
+            for edge in recipe.get('ingredients', []) + recipe.get('products', []):
+                if edge.get('displayNameWithSize'):
+                    self.names.setdefault(edge['id'], edge['displayNameWithSize'])
+        self.edges = {item_id: used_ingredients(recipe) for item_id, recipe in self.recipes_by_product.items()}
+        self.order, self.cycles = order_items(self.edges)
+
+    def name(self, item_id):
+        return self.names.get(item_id, str(item_id))
+
+    def explode(self, targets, whole_batches=True, stock=None):
+        """
+        Works out everything needed to make a list of items.
+
+        Args:
+            targets (dict): item id -> how many units to make.
+            whole_batches (bool): Recipes run a whole number of times, rounding up.
+            stock (dict): item id -> units already on hand, used before crafting more.
+
+        Returns:
+            dict: 'raw' item id -> units to gather, 'batches' recipe id -> runs,
+            'surplus' item id -> units made beyond what was needed.
+        """
+        demand = dict(targets)
+        stock = dict(stock or {})
+        raw = {}
+        batches = {}
+        surplus = {}
+        for item_id in self.order:
+            needed = demand.pop(item_id, 0)
+            on_hand = min(stock.get(item_id, 0), needed)
+            if on_hand > 0:
+                stock[item_id] -= on_hand
+                needed -= on_hand
+            if needed <= 0:
+                continue
+
+            recipe = self.recipes_by_product.get(item_id)
+            if recipe is None or item_id in self.cycles:
+                raw[item_id] = raw.get(item_id, 0) + needed
+                continue
+
+            made = product_quantity(recipe, item_id)
+            runs = math.ceil(needed / made) if whole_batches else needed / made
+            batches[recipe['id']] = batches.get(recipe['id'], 0) + runs
+            if runs * made > needed:
+                surplus[item_id] = runs * made - needed
+            for ingredient_id, used in self.edges[item_id]:
+                demand[ingredient_id] = demand.get(ingredient_id, 0) + runs * used
+
+        # Targets the recipes have never heard of
+        for item_id, needed in demand.items():
+            if needed > 0:
+                raw[item_id] = raw.get(item_id, 0) + needed
+
+        return {'raw': raw, 'batches': batches, 'surplus': surplus}
+
+bill_of_materials = None  # Global BOM engine, built from recipe_data on first use
+
+def get_bill_of_materials():
+    global bill_of_materials
+    if bill_of_materials is None:
+        bill_of_materials = BillOfMaterials(recipe_data)
+    return bill_of_materials
+
+def print_bill_of_materials(targets):
+    bom = get_bill_of_materials()
+    result = bom.explode(targets)
+    print("Raw materials:")
+    for item_id, quantity in sorted(result['raw'].items(), key=lambda entry: -entry[1]):
+        print(f"  {bom.name(item_id)}: {quantity:,.2f}")
+    print(f"Recipe runs: {sum(result['batches'].values()):,.0f} across {len(result['batches'])} recipes")
+
+def get_item_index():
+    global item_index
+    if item_index is None:
+        item_index = SearchIndex(item_data or [])
+    return item_index
+
+def get_recipe_index():
+    # Recipes are found by the names of their main product, with the recipe id attached
+    global recipe_index
+    if recipe_index is None:
+        recipe_index = SearchIndex(dict(recipe['products'][0], recipe=recipe['id']) for recipe in recipe_data or [] if recipe['products'])
+    return recipe_index
+
+def find_items(names):
+    """
+    Resolves a batch of item names, in any language, in one call.
+
+    Args:
+        names (list): Item names, e.g. the ores.
+
+    Returns:
+        dict: name -> item, None for names that matched nothing.
+    """
+    return get_item_index().resolve(names)
+
+def find_recipe(name, limit=5):
+    # Index entries carry the id of the recipe they came from, several recipes can make the same product
+    recipes_by_id = get_cost_engine().recipes_by_id
+    return [recipes_by_id[product['recipe']] for product, _ in get_recipe_index().search(name, limit)]
+
+def find_item_by_display_name(display_name, limit=10):
+    if item_data:
+        if re.search(r'[\\^$*+?()\[\]{}|]', display_name):
+            # Still a regex, scan like before
+            regex_pattern = re.compile(display_name, re.IGNORECASE)
+            found_items = [item for item in item_data if item.get('displayNameWithSize') and regex_pattern.search(item['displayNameWithSize'])]
+        else:
+            # Exact, prefix and close matches in any language, best first
+            found_items = [item for item, _ in get_item_index().search(display_name, limit)]
+        if found_items:
+            print(f"Found {len(found_items)} item(s) with displayNameWithSize matching '{display_name}':")
+            for item in found_items:
+                print_item(item)
+                print()
+        else:
+            print(f"No item found with displayNameWithSize matching '{display_name}'")
+    else:
+        print("No item data loaded.")
+
+def menu():
+    while True:
+        print("\nMENU")
+        print("1. Load item data from JSON file (default: {})".format(default_item_file))
+        print("2. Save item data to JSON file (default: {})".format(default_item_file))
+        print("3. Print item data")
+        print("4. Print recipe data")
+        print("5. Sample item data")
+        print("6. Sample recipe data")
+        print("7. Calculate item cost")
+        print("8. Find item by displayNameWithSize")
+        print("9. Bill of materials")
+        print("10. Exit")
+
+        choice = input("Enter your choice (1-10): ")
+
+        if choice == '1':
+            item_file_path = input("Enter the item data JSON file path (default: {}): ".format(default_item_file)) or default_item_file
+            recipe_file_path = input("Enter the recipe data JSON file path (default: {}): ".format(default_recipe_file)) or default_recipe_file
+            load_item_data(item_file_path)
+            load_recipe_data(recipe_file_path)
+        elif choice == '2':
+            item_file_path = input("Enter the item data JSON file path (default: {}): ".format(default_item_file)) or default_item_file
+            recipe_file_path = input("Enter the recipe data JSON file path (default: {}): ".format(default_recipe_file)) or default_recipe_file
+            save_item_data(item_file_path)
+            save_recipe_data(recipe_file_path)
+        elif choice == '3':
+            print_items()
+        elif choice == '4':
+            print_recipes()
+        elif choice == '5':
+            sample_item_data()
+        elif choice == '6':
+            sample_recipe_data()
+        elif choice == '7':
+            item_id = input("Enter the item ID to calculate the item cost: ")
+            item_id = int(item_id) if item_id.isdigit() else item_id
+            if get_cost_engine().recipe_for(item_id):
+                cost = calculate_item_cost({'id': item_id})
+                print("Item cost for item with ID '{}': {}".format(item_id, cost))
+            else:
+                print("Item with ID '{}' not found.".format(item_id))
+        elif choice == '8':
+            display_name = input("Enter the displayNameWithSize to find: ")
+            find_item_by_display_name(display_name)
+        elif choice == '9':
+            targets = {}
+            while True:
+                item_id = input("Enter an item ID to make (blank when done): ")
+                if not item_id:
+                    break
+                quantity = input("How many: ")
+                targets[int(item_id)] = float(quantity or 1)
+            print_bill_of_materials(targets)
+        elif choice == '10':
+            break
+        else:
+            print("Invalid choice. Please try again.")
+
+def main():
+    # Load the default data files initially
+    load_item_data()
+    load_recipe_data()
+
+    # Start the menu
+    menu()
+
+if __name__ == '__main__':
+    main()
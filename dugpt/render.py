@@ -0,0 +1,124 @@
+import os
+import datetime
+import concurrent.futures
+
+import numpy as np
+import pandas as pd
+
+# Headless chart rendering
+# Everything here uses Figure and the Agg canvas directly, never the pyplot state machine,
+# so charts can be drawn in worker processes without a display.
+
+DEFAULT_IMAGE_DIRECTORY = os.path.join('data', 'img')
+DEFAULT_PRICE_BUCKETS = 40
+
+def volume_by_price(df, buckets=DEFAULT_PRICE_BUCKETS):
+    """
+    Pre-aggregates the volume of one item's orders into price buckets, per side.
+
+    Args:
+        df (DataFrame): Processed orders of one item, unit_price in dollars.
+        buckets (int): How many price buckets to split the price range into.
+
+    Returns:
+        DataFrame: price (bucket middle), Buy and Sell volume, one row per bucket.
+    """
+    if df.empty:
+        return pd.DataFrame({'price': [], 'Buy': [], 'Sell': []})
+    prices = df['unit_price'].to_numpy(dtype=float)
+    edges = np.linspace(prices.min(), prices.max(), buckets + 1)
+    if edges[0] == edges[-1]:
+        edges = np.array([edges[0] - 0.5, edges[0] + 0.5])
+    bucket = np.clip(np.searchsorted(edges, prices, side='right') - 1, 0, len(edges) - 2)
+
+    volume = pd.DataFrame({'bucket': bucket, 'order_type': df['order_type'].astype(str).to_numpy(), 'quantity': df['buy_quantity'].to_numpy()})
+    volume = volume.pivot_table(index='bucket', columns='order_type', values='quantity', aggfunc='sum', fill_value=0)
+    volume = volume.reindex(index=range(len(edges) - 1), columns=['Buy', 'Sell'], fill_value=0)
+    volume.insert(0, 'price', (edges[:-1] + edges[1:]) / 2)
+    return volume.reset_index(drop=True)
+
+def chart_path(item_name, output_directory=DEFAULT_IMAGE_DIRECTORY, image_format='png'):
+    return os.path.join(output_directory, f"{item_name.replace(' ', '_')}.{image_format}")
+
+def render_market_chart(item_name, volume, summary, path):
+    """
+    Draws one item's volume by price and its market summary to an image file.
+
+    Args:
+        item_name (str): The item, for the title.
+        volume (DataFrame): Output of volume_by_price.
+        summary (dict): The MarketSummary fields of the item.
+        path (str): Where to write the image, the extension picks PNG or SVG.
+
+    Returns:
+        str: path
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.ticker import FuncFormatter
+
+    fig = Figure(figsize=(12, 6), layout='tight')
+    FigureCanvasAgg(fig)
+    grid = fig.add_gridspec(1, 2, width_ratios=[3, 1])
+    ax = fig.add_subplot(grid[0])
+    text_ax = fig.add_subplot(grid[1])
+    text_ax.axis('off')
+
+    # One bar per price bucket and side, instead of one per order
+    height = (volume['price'].iloc[1] - volume['price'].iloc[0]) * 0.45 if len(volume) > 1 else 0.45
+    ax.barh(volume['price'] - height / 2, volume['Buy'], height=height, label='Buy', color='C0')
+    ax.barh(volume['price'] + height / 2, volume['Sell'], height=height, label='Sell', color='C1')
+    ax.yaxis.set_major_formatter(FuncFormatter(lambda x, pos: '${:,.2f}'.format(x)))
+    ax.set_xlabel('Volume')
+    ax.set_ylabel('Unit Price')
+    ax.legend(title='order_type')
+    ax.grid(True, alpha=0.3)
+
+    # Summary next to the bars, values scaled like the interactive chart
+    lines = [
+        (0.50, f"Highest Buy Order: ${summary['highest_buy_order']:,.2f}", 12, 'bold'),
+        (0.45, f"Lowest Sell Order: ${summary['lowest_sell_order']:,.2f}", 12, 'bold'),
+        (0.35, f"Mean Buy Price ${summary['mean_buy_price']:,.2f}", 10, 'normal'),
+        (0.30, f"Mean Sell Price : ${summary['mean_sell_price']:,.2f}", 10, 'normal'),
+        (0.25, f"Mean Price (All) ${summary['mean_market_price']:,.2f}", 10, 'normal'),
+        (0.20, f"Total Value (Buy): ${summary['buy_value'] / 1e6:,.2f}", 10, 'normal'),
+        (0.15, f"Total Value (Sell): ${summary['sell_value'] / 1e6:,.2f}", 10, 'normal'),
+        (0.10, f"Total Mass (Sell): {summary['sell_mass'] / 1e6:,.4f} tons", 10, 'normal'),
+        (0.05, 'Units in (Billions, Megatons)', 10, 'normal'),
+    ]
+    for y, text, size, weight in lines:
+        text_ax.text(0, y + 0.3, text, transform=text_ax.transAxes, fontsize=size, fontweight=weight)
+
+    today = datetime.date.today().strftime("%Y-%m-%d")
+    fig.suptitle(f"All Markets : Volume by price of Buy and Sell Orders : {item_name}\nDate of Analysis: {today} Sample Pop : {summary['num_orders']}")
+
+    fig.savefig(path)
+    return path
+
+def render_market_charts(volumes, summaries, output_directory=DEFAULT_IMAGE_DIRECTORY, image_format='png', workers=None):
+    """
+    Renders one chart per item, in parallel.
+
+    Only the pre-aggregated volumes and the summaries are sent to the
+    workers, so each job is small no matter how many orders an item has.
+
+    Args:
+        volumes (dict): item_name -> output of volume_by_price.
+        summaries (dict): item_name -> MarketSummary fields.
+        output_directory (str): Where to write the images.
+        image_format (str): 'png' or 'svg'.
+        workers (int): Worker processes, one per CPU when None, in process when 1.
+
+    Returns:
+        list: Paths of the written images.
+    """
+    os.makedirs(output_directory, exist_ok=True)
+    jobs = [(item_name, volume, summaries[item_name], chart_path(item_name, output_directory, image_format))
+            for item_name, volume in volumes.items() if item_name in summaries]
+
+    if workers == 1:
+        return [render_market_chart(*job) for job in jobs]
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(render_market_chart, *job) for job in jobs]
+        return [future.result() for future in futures]
@@ -0,0 +1,489 @@
+import os
+import sys
+import json
+import math
+import asyncio
+import datetime
+import argparse
+import traceback
+import urllib.parse
+
+from dugpt.item_helper import DEFAULT_CACHE_FILE
+from dugpt.metrics import get_run_metrics, start_run, add_metrics_arguments, count
+
+# Query service
+# A long-running server on localhost that keeps the item catalog, the recipe indexes and the
+# latest orders in memory and answers HTTP/JSON queries about them. Answers are cached until
+# new log data is ingested. Standard library only, pandas is loaded once at startup.
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+MAX_CACHED_RESPONSES = 4096
+MAX_LINE_SIZE = 64 * 1024
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+class QueryError(Exception):
+    """A query that can't be answered, sent back as {"error": message} with status."""
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+def jsonable(value):
+    # NaN is not JSON and json doesn't know numpy scalars, both are fixed up all the way down
+    if isinstance(value, dict):
+        return {key: jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [jsonable(item) for item in value]
+    if hasattr(value, 'item'):
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+def encode(result):
+    return json.dumps(jsonable(result), separators=(',', ':'), allow_nan=False).encode('utf-8')
+
+def first(query, name, default=None):
+    values = query.get(name)
+    return values[0] if values else default
+
+class MarketService:
+    """
+    Everything the queries need, loaded once, and the queries themselves.
+
+    The catalog and recipes are read at startup, the cost and bill of
+    materials indexes built once. Orders come from the OrderStore into live
+    OrderBooks; with a log directory a LogFollower appends whatever the game
+    writes next to both. Nothing here is thread-safe, QueryServer runs one
+    query or ingest at a time.
+
+    Args:
+        item_names (list): Items the follower extracts from the logs.
+        items_file (str): items.json, must exist, the service never downloads it.
+        recipes_file (str): recipes.json.
+        store (OrderStore): Where the parsed orders are, data/orders when None.
+        log_directory (str): Game logs to follow, no ingestion when None.
+    """
+    def __init__(self, item_names, items_file=DEFAULT_CACHE_FILE, recipes_file=None, store=None, log_directory=None):
+        self.item_names = list(item_names)
+        self.items_file = items_file
+        self.recipes_file = recipes_file
+        self.store = store
+        self.log_directory = log_directory
+        self.loaded_at = None
+
+    def load(self):
+        """
+        Loads the catalog, recipes and orders. Slow, done once before serving.
+        """
+        from dugpt.item_helper import ItemCatalog
+        from dugpt.ingest import LogFollower
+        from dugpt.order_book import OrderBooks
+        from dugpt.order_store import OrderStore
+        from dugpt.recipe_db import load_recipes
+        from dugpt.recipes import RecipeCostEngine, BillOfMaterials, default_recipe_file
+
+        metrics = get_run_metrics()
+        with metrics.stage('service_load'):
+            # Step 1: Catalog and recipe indexes
+            self.catalog = ItemCatalog(self.items_file)
+            self.recipes = list(load_recipes(self.recipes_file or default_recipe_file))
+            self.cost_engine = RecipeCostEngine(self.recipes)
+            self.market_cost_engine = None
+            self.bill_of_materials = BillOfMaterials(self.recipes)
+
+            # Step 2: Live books from the orders that have not expired yet
+            self.store = self.store or OrderStore()
+            self.books = OrderBooks()
+            self.books.apply(self.stored_orders())
+            self.processed = None
+
+            # Step 3: Follow the logs from where the last run stopped
+            self.follower = None
+            if self.log_directory:
+                self.follower = LogFollower(self.item_names, self.catalog, self.log_directory, store=self.store, books=self.books)
+            count('service_load', 'recipes', len(self.recipes))
+            count('service_load', 'orders', sum(len(book) for book in self.books.books.values()))
+        self.loaded_at = datetime.datetime.now()
+
+    def stored_orders(self):
+        from dugpt.order_batch import OrderBatch
+
+        orders = self.store.read(expires_after=datetime.datetime.now(datetime.timezone.utc))
+        return OrderBatch.from_frame(orders)
+
+    def ingest(self):
+        """
+        Drops expired orders and reads whatever the logs gained since the last call.
+
+        Returns:
+            int: Orders that were stored or expired, 0 when no answer can have changed.
+        """
+        changed = self.books.expire()
+        if self.follower is not None:
+            changed += self.follower.poll()
+        if changed:
+            self.processed = None
+            self.market_cost_engine = None
+        return changed
+
+    def item_id(self, query, name='item'):
+        # An item by id or by name in any language, the closest match when not exact
+        value = first(query, name)
+        if value is None:
+            raise QueryError(f"Missing '{name}'")
+        if value.isdigit():
+            return int(value)
+        item_id = self.catalog.lookup_id(value)
+        if item_id is None:
+            item = self.catalog.resolve_names([value]).get(value)
+            if item is None:
+                raise QueryError(f"Unknown item '{value}'", 404)
+            item_id = item['id']
+        return item_id
+
+    def item_name(self, item_id):
+        return self.catalog.get_item_info(item_id) or self.bill_of_materials.name(item_id)
+
+    def health(self, query):
+        return {
+            'status': 'ok',
+            'loaded_at': self.loaded_at.isoformat(timespec='seconds'),
+            'items': len(self.catalog),
+            'recipes': len(self.recipes),
+            'books': len(self.books.books),
+            'orders': sum(len(book) for book in self.books.books.values()),
+            'following': self.log_directory if self.follower is not None else None,
+        }
+
+    def best(self, query):
+        """
+        Best bid and ask of an item, across every market or on one.
+
+        Query:
+            item: Id or name. market: Market id, every market when left out.
+
+        Returns:
+            dict: bid and ask as {price, market_id, quantity}, None for an empty side.
+            Prices in cents, as logged.
+        """
+        item_type = self.item_id(query)
+        market = first(query, 'market')
+        if market is not None:
+            if not market.isdigit():
+                raise QueryError(f"Bad market '{market}'")
+            book = self.books.books.get((int(market), item_type))
+            books = [book] if book is not None else []
+        else:
+            books = self.books.markets(item_type)
+
+        def best_level(side, pick):
+            candidates = [(getattr(book, side).best(), book) for book in books if getattr(book, side)]
+            if not candidates:
+                return None
+            price, book = pick(candidates, key=lambda candidate: candidate[0])
+            return {'price': price, 'market_id': book.market_id, 'quantity': getattr(book, side).quantities[price]}
+
+        bid, ask = best_level('bids', max), best_level('asks', min)
+        return {
+            'item_type': item_type,
+            'item_name': self.item_name(item_type),
+            'markets': len(books),
+            'bid': bid,
+            'ask': ask,
+            'spread': ask['price'] - bid['price'] if bid and ask else None,
+        }
+
+    def summary(self, query):
+        """
+        MarketSummary statistics, as DataProcessor shows them on the plots.
+
+        Query:
+            item: One or more names, every stored item when left out.
+
+        Returns:
+            dict: item_name -> MarketSummary fields. Prices in dollars.
+        """
+        from dugpt.analyze import process_all_items, market_summaries, lookup_item_masses
+
+        if self.processed is None:
+            # Every stored item processed at once, kept until the next ingest
+            self.processed = process_all_items(self.store.read())
+        item_names = query.get('item') or self.store.items()
+        missing = [item_name for item_name in item_names if item_name not in self.store.items()]
+        if missing:
+            raise QueryError(f"No orders for {', '.join(missing)}", 404)
+
+        df = self.processed[self.processed['item_name'].isin(item_names)]
+        summaries = market_summaries(df, lookup_item_masses(item_names))
+        return {item_name: summary._asdict() for item_name, summary in summaries.items()}
+
+    def recipe_cost(self, query):
+        """
+        What one unit of an item and one run of its recipe cost.
+
+        Query:
+            item: Id or name. prices: 'raw' (default) counts raw units, 'market' costs
+                raw materials at their best ask, null when one has no ask.
+
+        Returns:
+            dict: recipe_id, products_per_batch, unit_cost and batch_cost.
+        """
+        from dugpt.recipes import RecipeCostEngine, product_quantity
+        from dugpt.profitability import book_prices
+
+        item_id = self.item_id(query)
+        prices = first(query, 'prices', 'raw')
+        if prices not in ('raw', 'market'):
+            raise QueryError(f"prices is 'raw' or 'market', not '{prices}'")
+        engine = self.cost_engine
+        if prices == 'market':
+            if self.market_cost_engine is None:
+                item_ids = {item_type for _, item_type in self.books.books}
+                asks, _ = book_prices(self.books, item_ids)
+                self.market_cost_engine = RecipeCostEngine(self.recipes, asks, default_price=float('nan'))
+            engine = self.market_cost_engine
+
+        recipe = engine.recipe_for(item_id)
+        if recipe is None:
+            raise QueryError(f"No recipe makes {self.item_name(item_id)}", 404)
+        with engine.metered('service_recipe_cost'):
+            return {
+                'item_id': item_id,
+                'item_name': self.item_name(item_id),
+                'recipe_id': recipe['id'],
+                'prices': prices,
+                'products_per_batch': product_quantity(recipe, item_id),
+                'unit_cost': engine.unit_cost(item_id),
+                'batch_cost': engine.batch_cost(recipe),
+                'in_cycle': item_id in engine.cycles,
+            }
+
+    def bom(self, query):
+        """
+        Raw materials and recipe runs it takes to make some items.
+
+        Query:
+            target: 'item:quantity', repeated, item by id or name. Or item and quantity.
+            whole_batches: 0 to allow fractional recipe runs.
+
+        Returns:
+            dict: raw, batches and surplus lists, like BillOfMaterials.explode.
+        """
+        targets = {}
+        for target in query.get('target') or [f"{first(query, 'item', '')}:{first(query, 'quantity', '1')}"]:
+            name, _, quantity = target.rpartition(':')
+            try:
+                quantity = float(quantity)
+            except ValueError:
+                raise QueryError(f"Bad quantity in '{target}'")
+            item_id = self.item_id({'item': [name]})
+            targets[item_id] = targets.get(item_id, 0) + quantity
+
+        whole_batches = first(query, 'whole_batches', '1') != '0'
+        result = self.bill_of_materials.explode(targets, whole_batches=whole_batches)
+        return {
+            'targets': [{'item_id': item_id, 'item_name': self.item_name(item_id), 'quantity': quantity} for item_id, quantity in targets.items()],
+            'raw': [{'item_id': item_id, 'item_name': self.item_name(item_id), 'quantity': quantity}
+                    for item_id, quantity in sorted(result['raw'].items(), key=lambda entry: -entry[1])],
+            'batches': [{'recipe_id': recipe_id, 'runs': runs} for recipe_id, runs in result['batches'].items()],
+            'surplus': [{'item_id': item_id, 'item_name': self.item_name(item_id), 'quantity': quantity} for item_id, quantity in result['surplus'].items()],
+        }
+
+# Path -> (MarketService method, cached until the next ingest)
+ROUTES = {
+    '/health': ('health', False),
+    '/market/best': ('best', True),
+    '/market/summary': ('summary', True),
+    '/recipes/cost': ('recipe_cost', True),
+    '/recipes/bom': ('bom', True),
+}
+
+class QueryServer:
+    """
+    HTTP/1.1 front of a MarketService, on asyncio streams.
+
+    GET answers are cached by path and query. A repeated query is answered
+    from the cache without waiting for anything, everything else runs one at
+    a time in a worker thread so the event loop keeps serving cached answers.
+    POST /ingest, or the poll loop, reads new log data and clears the cache
+    when anything changed.
+
+    Args:
+        service (MarketService): The loaded service.
+        poll_interval (float): Seconds between ingests, never when None.
+    """
+    def __init__(self, service, poll_interval=None):
+        self.service = service
+        self.poll_interval = poll_interval
+        self.cache = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.generation = 0  # bumped on every ingest that changed something
+        self.lock = None
+
+    async def call(self, stage, method, *args):
+        # One query or ingest at a time, in a thread, timed as a metrics stage there
+        def timed():
+            with get_run_metrics().stage(stage):
+                return method(*args)
+        async with self.lock:
+            return await asyncio.get_running_loop().run_in_executor(None, timed)
+
+    async def ingest(self):
+        changed = await self.call('service_ingest', self.service.ingest)
+        if changed:
+            self.cache.clear()
+            self.generation += 1
+        return {'changed': changed, 'generation': self.generation}
+
+    async def answer(self, method, target):
+        """
+        The response to one request.
+
+        Returns:
+            tuple: (status, JSON body bytes, True when it came from the cache)
+        """
+        url = urllib.parse.urlsplit(target)
+        if url.path == '/ingest':
+            if method != 'POST':
+                return 405, encode({'error': 'POST /ingest'}), False
+            return 200, encode(await self.ingest()), False
+
+        route = ROUTES.get(url.path)
+        if route is None:
+            return 404, encode({'error': f"No such path '{url.path}'", 'paths': sorted(ROUTES) + ['/ingest']}), False
+        if method != 'GET':
+            return 405, encode({'error': f"GET {url.path}"}), False
+        name, cacheable = route
+
+        query = urllib.parse.parse_qs(url.query)
+        key = (url.path, tuple(sorted((field, tuple(values)) for field, values in query.items())))
+        if cacheable:
+            body = self.cache.get(key)
+            if body is not None:
+                self.cache_hits += 1
+                return 200, body, True
+            self.cache_misses += 1
+
+        try:
+            result = await self.call('service_query', getattr(self.service, name), query)
+        except QueryError as e:
+            return e.status, encode({'error': str(e)}), False
+        if name == 'health':
+            result.update(generation=self.generation, cached=len(self.cache), cache_hits=self.cache_hits, cache_misses=self.cache_misses)
+
+        body = encode(result)
+        if cacheable:
+            if len(self.cache) >= MAX_CACHED_RESPONSES:
+                self.cache.clear()
+            self.cache[key] = body
+        return 200, body, False
+
+    async def handle(self, reader, writer):
+        # One connection, kept open between requests unless the client says otherwise
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    field, _, value = line.decode('latin-1').partition(':')
+                    headers[field.strip().lower()] = value.strip()
+                # Nothing takes a body, it is read and dropped
+                length = headers.get('content-length', '0')
+                if length.isdigit() and int(length):
+                    await reader.readexactly(int(length))
+
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    status, body, cached, version = 400, encode({'error': 'Bad request line'}), False, 'HTTP/1.0'
+                else:
+                    try:
+                        status, body, cached = await self.answer(method.upper(), target)
+                    except Exception:
+                        # A bug, not a bad request: log it and keep serving
+                        print(f"Error answering {method} {target}:", file=sys.stderr)
+                        traceback.print_exc()
+                        status, body, cached = 500, encode({'error': 'Internal server error'}), False
+
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(body)}\r\n"
+                    f"X-Cache: {'hit' if cached else 'miss'}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def poll(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            await self.ingest()
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, ready=None):
+        """
+        Serves until cancelled.
+
+        Args:
+            host (str): Interface to listen on, localhost only by default.
+            port (int): Port to listen on, 0 for any free one.
+            ready (callable): Called with the bound (host, port) once listening.
+        """
+        self.lock = asyncio.Lock()
+        server = await asyncio.start_server(self.handle, host, port, limit=MAX_LINE_SIZE)
+        poller = asyncio.create_task(self.poll()) if self.poll_interval else None
+        try:
+            if ready is not None:
+                ready(server.sockets[0].getsockname()[:2])
+            async with server:
+                await server.serve_forever()
+        finally:
+            if poller is not None:
+                poller.cancel()
+
+def main(argv=None):
+    from dugpt.recipes import default_recipe_file
+
+    parser = argparse.ArgumentParser(description='Serve market and recipe queries as JSON on localhost.')
+    parser.add_argument('items', nargs='*', help='displayNameWithSize of every item to follow in the logs, the ores when none')
+    parser.add_argument('--host', default=DEFAULT_HOST, help='Interface to listen on')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='Port to listen on')
+    parser.add_argument('--items-file', default=DEFAULT_CACHE_FILE, help='items.json')
+    parser.add_argument('--recipes', default=default_recipe_file, help='recipes.json')
+    parser.add_argument('--log-directory', help='Follow the game logs in this directory, new orders are ingested as they are written')
+    parser.add_argument('--poll', type=float, default=5.0, help='Seconds between ingests, 0 to only ingest on POST /ingest')
+    add_metrics_arguments(parser)
+    args = parser.parse_args(argv)
+    if not os.path.exists(args.items_file):
+        parser.error(f"{args.items_file} not found, fetch it first with market_csv_to_pickled_ore.py --refresh-items")
+
+    item_names = args.items
+    if not item_names:
+        from dugpt.analyze import item_names
+
+    metrics = start_run(profile=args.profile, trace_memory=args.trace_memory)
+    try:
+        service = MarketService(item_names, args.items_file, args.recipes, log_directory=args.log_directory)
+        service.load()
+        server = QueryServer(service, poll_interval=args.poll or None)
+        asyncio.run(server.serve(args.host, args.port, ready=lambda address: print(f"Serving on http://{address[0]}:{address[1]}")))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if args.metrics:
+            print(f"Metrics written to {metrics.write_report(args.metrics)}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,9 @@
+import sys
+
+# Moved to dugpt/production_planner.py, this file keeps `python production_planner.py` and `import production_planner` working
+from dugpt import production_planner
+
+if __name__ == '__main__':
+    production_planner.main()
+else:
+    sys.modules[__name__] = production_planner
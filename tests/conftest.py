@@ -0,0 +1,30 @@
+import os
+import sys
+
+import pytest
+
+# The tests import dugpt from this checkout, like the benchmarks do
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+NOISE_LINE = '<record><date>2023-06-01T12:00:00</date><message>Some unrelated game event</message></record>\n'
+
+def market_order_line(market_id, order_id, item_type, buy_quantity, expiration_date, update_date, unit_price):
+    return (f'<message>MarketOrder:[marketId = {market_id}, orderId = {order_id}, itemType = {item_type}, '
+            f'buyQuantity = {buy_quantity}, expirationDate = @(1) {expiration_date}, '
+            f'updateDate = @(1) {update_date}, unitPrice = Currency:[amount = {unit_price}]]</message>\n')
+
+@pytest.fixture
+def write_log():
+    """
+    Writes a game log out of order tuples, noise lines between them.
+
+    Orders are (market_id, order_id, item_type, buy_quantity, expiration_date,
+    update_date, unit_price), the same tuples the lexer returns.
+    """
+    def write(path, orders, noise=1, mode='w'):
+        with open(path, mode) as log_file:
+            for order in orders:
+                log_file.write(NOISE_LINE * noise)
+                log_file.write(market_order_line(*order))
+        return str(path)
+    return write
@@ -0,0 +1,69 @@
+import json
+import math
+
+import pandas as pd
+import pytest
+
+from dugpt import item_helper
+from dugpt.analyze import DataProcessor, market_summaries, process_all_items
+from dugpt.item_helper import ItemCatalog
+
+EXPIRES = '2030-01-01 00:00:00'
+
+@pytest.fixture(autouse=True)
+def catalog(tmp_path, monkeypatch):
+    # Masses come from a small items.json instead of the downloaded one
+    items_file = tmp_path / 'items.json'
+    items_file.write_text(json.dumps([{'id': 7, 'displayNameWithSize': 'Hematite', 'unitMass': 5.04},
+                                      {'id': 8, 'displayNameWithSize': 'Coal', 'unitMass': 1.35}]))
+    monkeypatch.setattr(item_helper, '_default_catalog', ItemCatalog(str(items_file)))
+
+def orders(*rows):
+    # (item_name, order_type, unit_price in cents, buy_quantity) as the OrderStore reads them
+    return pd.DataFrame([{'item_name': item_name, 'order_type': order_type, 'unit_price': unit_price,
+                          'buy_quantity': buy_quantity, 'expiration_date': EXPIRES}
+                         for item_name, order_type, unit_price, buy_quantity in rows])
+
+def test_summaries_of_mixed_and_buy_only_items():
+    df = process_all_items(orders(('Hematite', 'Buy', 2000, -10), ('Hematite', 'Buy', 4000, -30),
+                                  ('Hematite', 'Sell', 6000, 20), ('Coal', 'Buy', 1000, -4)))
+    summaries = market_summaries(df, {'Hematite': 5.04, 'Coal': 1.35})
+
+    hematite = summaries['Hematite']
+    assert (hematite.num_orders, hematite.buy_quantity, hematite.sell_quantity) == (3, 40, 20)
+    assert (hematite.mean_buy_price, hematite.mean_sell_price) == (30.0, 60.0)
+    assert (hematite.highest_buy_order, hematite.lowest_sell_order, hematite.spread) == (40.0, 60.0, 20.0)
+    assert hematite.mean_market_price == 40.0
+    assert (hematite.buy_value, hematite.sell_value) == (1600.0, 800.0)
+    assert hematite.sell_mass == pytest.approx(100.8)
+
+    # No sell orders: the sell side is missing, not zero priced
+    coal = summaries['Coal']
+    assert (coal.num_orders, coal.mean_buy_price, coal.sell_quantity, coal.sell_mass) == (1, 10.0, 0, 0.0)
+    assert math.isnan(coal.mean_sell_price) and math.isnan(coal.lowest_sell_order) and math.isnan(coal.spread)
+
+def test_summarize_once_per_process_data():
+    processor = DataProcessor('Hematite')
+    frame = orders(('Hematite', 'Buy', 2000, -10), ('Hematite', 'Sell', 6000, 20))
+    processor.process_data(frame[frame.order_type == 'Buy'].copy(), frame[frame.order_type == 'Sell'].copy(), bid_max=250)
+    summary = processor.summarize()
+    assert processor.summarize() is summary
+    assert (summary.num_orders, summary.mean_market_price, summary.buy_mass) == (2, 40.0, pytest.approx(50.4))
+
+def test_summarize_an_item_with_no_orders_left():
+    processor = DataProcessor('Hematite')
+    # Both orders are above bid_max and filtered out
+    frame = orders(('Hematite', 'Buy', 90000, -10), ('Hematite', 'Sell', 95000, 20))
+    processor.process_data(frame[frame.order_type == 'Buy'].copy(), frame[frame.order_type == 'Sell'].copy(), bid_max=250)
+    summary = processor.summarize()
+    assert (summary.item_name, summary.num_orders, summary.buy_quantity, summary.sell_value) == ('Hematite', 0, 0, 0.0)
+    assert math.isnan(summary.mean_buy_price) and math.isnan(summary.spread)
+
+def test_gold_nuggets_get_their_tier_bounds():
+    df = process_all_items(orders(('Gold nuggets', 'Sell', 100000, 5), ('Hematite', 'Sell', 100000, 5),
+                                  ('Unknown ore', 'Sell', 10000, 5)))
+    # 1000$ is sensible for a tier 4 ore, not for tier 1 Hematite
+    assert df.set_index('item_name')[['ore_tier', 'bid_max']].to_dict('index') == {
+        'Gold nuggets': {'ore_tier': 4, 'bid_max': 5000},
+        'Unknown ore': {'ore_tier': 1, 'bid_max': 250},
+    }
@@ -0,0 +1,125 @@
+import json
+
+import pytest
+
+from dugpt.ingest import (LogFollower, extract_market_orders, extract_market_orders_parallel, find_market_orders, iter_market_order_chunks,
+                          iter_market_orders, parse_log_range, read_appended_orders, split_log_files, update_order_index, MARKET_ORDER_FIELDS)
+from dugpt.order_batch import OrderBatch
+from dugpt.item_helper import ItemCatalog
+from dugpt.order_book import OrderBooks
+from dugpt.order_store import OrderStore
+
+from conftest import market_order_line
+
+EXPIRES = '2030-01-01 00:00:00'
+
+def catalog(tmp_path):
+    items_file = tmp_path / 'items.json'
+    items_file.write_text(json.dumps([{'id': 7, 'displayNameWithSize': 'Hematite'}, {'id': 8, 'displayNameWithSize': 'Coal'}]))
+    return ItemCatalog(str(items_file))
+
+def test_follower_stores_only_new_or_newer_snapshots(tmp_path, write_log):
+    log_directory = tmp_path / 'logs'
+    log_directory.mkdir()
+    log_path = log_directory / 'game.log'
+    store, books = OrderStore(str(tmp_path / 'store')), OrderBooks()
+    follower = LogFollower(['Hematite', 'Coal'], catalog(tmp_path), str(log_directory), checkpoint_file=None, store=store, books=books)
+
+    write_log(log_path, [
+        (1, 10, 7, 5, EXPIRES, '2023-06-01 08:00:00', 100),
+        (1, 11, 8, -3, EXPIRES, '2023-06-01 08:00:00', 40),
+        (1, 12, 99, 1, EXPIRES, '2023-06-01 08:00:00', 1),  # not an item we follow
+        (1, 10, 7, 5, EXPIRES, '2023-06-01 08:00:00', 100),
+    ])
+    assert follower.poll() == 2
+    assert books.best_ask(7) == (100, 1) and books.best_bid(8) == (40, 1)
+
+    # The same snapshot again and an older one change nothing, a newer one does
+    write_log(log_path, [
+        (1, 11, 8, -3, EXPIRES, '2023-06-01 08:00:00', 40),
+        (1, 10, 7, 5, EXPIRES, '2023-05-01 08:00:00', 90),
+        (1, 10, 7, 2, EXPIRES, '2023-06-02 08:00:00', 95),
+    ], mode='a')
+    assert follower.poll() == 1
+    assert follower.poll() == 0
+    assert books.best_ask(7) == (95, 1)
+
+    stored = store.read(['Hematite'], latest=False)
+    assert sorted(zip(stored['order_id'], stored['unit_price'])) == [(10, 95), (10, 100)]
+
+def test_unreadable_logs_are_reported_and_skipped(tmp_path, write_log, capsys):
+    log_path = write_log(tmp_path / 'game.log', [(1, 10, 7, 5, EXPIRES, '2023-06-01 08:00:00', 100)])
+    missing = str(tmp_path / 'gone.log')
+    orders = extract_market_orders(['Hematite'], catalog(tmp_path), [missing, log_path])
+    assert orders['Hematite']['sell'].order_id.tolist() == [10]
+    assert len(parse_log_range(missing, 0, 100)) == 0
+    assert capsys.readouterr().out.count(f"Unable to read {missing}") == 2
+
+def test_update_order_index_keeps_the_newest_snapshot():
+    order_index = {}
+    first = dict(zip(MARKET_ORDER_FIELDS, (1, 5, 7, 3, EXPIRES, '2023-06-02 08:00:00', 100)))
+    assert update_order_index(order_index, first)
+    assert not update_order_index(order_index, dict(first))
+    assert not update_order_index(order_index, dict(first, update_date='2023-06-01 08:00:00', unit_price=90))
+    # Same updateDate, different snapshot: the later sighting wins
+    assert update_order_index(order_index, dict(first, unit_price=95))
+    assert update_order_index(order_index, dict(first, update_date='2023-06-03 08:00:00'))
+    assert order_index[(1, 5)]['update_date'] == '2023-06-03 08:00:00' and order_index[(1, 5)]['unit_price'] == 100
+
+def many_orders(count):
+    return [(order_id % 3 + 1, order_id, 7 + order_id % 2, order_id % 5 - 2, EXPIRES, f'2023-06-01 08:{order_id % 60:02d}:00', 100 + order_id)
+            for order_id in range(count)]
+
+def rows(batch):
+    return list(zip(batch.order_id.tolist(), batch.unit_price.tolist()))
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 100, 333, 1 << 20])
+def test_records_cut_by_a_chunk_boundary_are_carried_over(tmp_path, write_log, chunk_size):
+    orders = many_orders(60)
+    log_path = write_log(tmp_path / 'game.log', orders, noise=2)
+    assert [order for chunk in iter_market_order_chunks(log_path, chunk_size) for order in chunk] == orders
+
+@pytest.mark.parametrize('range_size', [50, 999, 4096, 1 << 20])
+def test_byte_ranges_parse_every_record_once(tmp_path, write_log, range_size):
+    orders = many_orders(60)
+    log_path = write_log(tmp_path / 'game.log', orders, noise=2)
+    tasks = split_log_files([log_path], range_size)
+    parsed = OrderBatch.concat([parse_log_range(*task, chunk_size=128) for task in tasks])
+    assert rows(parsed) == [(order[1], order[6]) for order in orders]
+
+def test_appended_half_lines_wait_for_the_next_read(tmp_path, write_log):
+    orders = many_orders(3)
+    log_path = write_log(tmp_path / 'game.log', orders[:2])
+    with open(log_path, 'a') as log_file:
+        line = market_order_line(*orders[2])
+        log_file.write(line[:40])
+    batch, offset = read_appended_orders(log_path, 0, chunk_size=64)
+    assert batch.order_id.tolist() == [0, 1]
+    with open(log_path, 'a') as log_file:
+        log_file.write(line[40:])
+    batch, _ = read_appended_orders(log_path, offset)
+    assert batch.order_id.tolist() == [2]
+
+def test_parallel_extraction_matches_the_serial_one(tmp_path, write_log):
+    orders = many_orders(200)
+    # The same orders again, updated later, in a second log
+    later = [order[:5] + ('2023-06-02 08:00:00', order[6] + 1) for order in orders[::3]]
+    log_files = [write_log(tmp_path / 'a.log', orders, noise=2), write_log(tmp_path / 'b.log', later)]
+    serial = extract_market_orders(['Hematite', 'Coal'], catalog(tmp_path), log_files)
+    parallel = extract_market_orders_parallel(['Hematite', 'Coal'], catalog(tmp_path), log_files, workers=2, range_size=2048)
+    assert serial.keys() == parallel.keys() == {'Hematite', 'Coal'}
+    for item_name, sides in serial.items():
+        for side in ('buy', 'sell'):
+            assert rows(sides[side]) == rows(parallel[item_name][side])
+    assert sum(len(sides['buy']) + len(sides['sell']) for sides in serial.values()) == 200
+
+def test_streamed_and_looked_up_orders_come_as_batches(tmp_path, write_log):
+    orders = many_orders(50)
+    log_path = write_log(tmp_path / 'game.log', orders)
+    batches = list(iter_market_orders(log_path, chunk_size=500, item_ids={7: 'Hematite'}))
+    assert len(batches) > 1 and all(isinstance(batch, OrderBatch) for batch in batches)
+    streamed = OrderBatch.concat(batches)
+    assert rows(streamed) == [(order[1], order[6]) for order in orders]
+    assert streamed.item_code.tolist() == [0 if order[2] == 7 else -1 for order in orders]
+    found = find_market_orders([log_path], item_types={8}, market_ids={2})
+    assert rows(found) == [(order[1], order[6]) for order in orders if order[2] == 8 and order[0] == 2]
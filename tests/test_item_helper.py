@@ -0,0 +1,57 @@
+from dugpt import recipes
+from dugpt.item_helper import SearchIndex, normalize
+
+ITEMS = [
+    {'id': 1, 'displayNameWithSize': 'Pure Iron', 'locDisplayNameWithSize': 'Fer pur', 'locDisplayNameWithSizeDE': 'Reines Eisen'},
+    {'id': 2, 'displayNameWithSize': 'Iron Scrap', 'locDisplayNameWithSize': 'Débris de fer'},
+    {'id': 3, 'displayNameWithSize': 'Hematite'},
+    {'id': 4, 'displayNameWithSize': 'Coal'},
+    {'id': 5, 'displayNameWithSize': 'Basic Pipe xs'},
+    {'id': 6},  # no name, left out of the index
+]
+
+def ids(results):
+    return [entry['id'] for entry, _ in results]
+
+def test_normalize_folds_case_and_accents():
+    assert normalize('Débris  de FER!') == ['debris', 'de', 'fer']
+
+def test_exact_names_rank_first():
+    index = SearchIndex(ITEMS)
+    assert len(index.entries) == 5
+    assert ids(index.search('pure iron'))[0] == 1
+    assert ids(index.search('iron'))[:2] == [1, 2]
+
+def test_prefixes_and_typos_match():
+    index = SearchIndex(ITEMS)
+    assert ids(index.search('hema')) == [3]
+    assert ids(index.search('hematit'))[0] == 3
+    assert ids(index.search('hemtite'))[0] == 3
+    assert ids(index.search('hemtite', fuzzy=False)) == []
+    assert index.search('') == []
+
+def test_every_language_is_searched():
+    index = SearchIndex(ITEMS)
+    assert ids(index.search('fer pur'))[0] == 1
+    assert ids(index.search('reines eisen'))[0] == 1
+    assert ids(index.search('debris'))[0] == 2
+
+def test_resolve_takes_exact_names_and_close_enough_ones():
+    index = SearchIndex(ITEMS)
+    resolved = index.resolve(['Coal', 'Hematit', 'Fer pur', 'Unobtainium'])
+    assert {name: entry and entry['id'] for name, entry in resolved.items()} == {
+        'Coal': 4, 'Hematit': 3, 'Fer pur': 1, 'Unobtainium': None}
+    assert index.resolve(['Hematit'], fuzzy=False) == {'Hematit': None}
+
+def test_find_recipe_returns_the_recipe_each_entry_came_from(monkeypatch):
+    # Two recipes make the same product, each must come back once
+    recipe_data = [
+        {'id': 10, 'products': [{'id': 1, 'displayNameWithSize': 'Pure Iron', 'quantity': 1}], 'ingredients': [{'id': 3, 'quantity': 2}]},
+        {'id': 11, 'products': [{'id': 1, 'displayNameWithSize': 'Pure Iron', 'quantity': 2}], 'ingredients': [{'id': 2, 'quantity': 3}]},
+        {'id': 12, 'products': [{'id': 4, 'displayNameWithSize': 'Coal', 'quantity': 1}], 'ingredients': []},
+    ]
+    monkeypatch.setattr(recipes, 'recipe_data', recipe_data)
+    monkeypatch.setattr(recipes, 'recipe_index', None)
+    monkeypatch.setattr(recipes, 'cost_engine', None)
+    assert sorted(recipe['id'] for recipe in recipes.find_recipe('pure iron')) == [10, 11]
+    assert [recipe['id'] for recipe in recipes.find_recipe('coal')] == [12]
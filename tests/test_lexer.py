@@ -0,0 +1,59 @@
+from dugpt.lexer import MarketOrderLexer, timestamp
+
+from conftest import NOISE_LINE, market_order_line
+
+EXPIRES = '2030-01-01 00:00:00'
+ORDER = (1, 10, 7, -5, EXPIRES, '2023-06-01 08:00:00', 100)
+
+def line(*order):
+    return market_order_line(*order).encode('utf-8')
+
+def test_buffers_without_market_orders_are_rejected():
+    assert MarketOrderLexer().lex(NOISE_LINE.encode() * 100) == ([], 0)
+    # The marker past stop does not count either
+    buffer = NOISE_LINE.encode() + line(*ORDER)
+    assert MarketOrderLexer().lex(buffer, stop=len(NOISE_LINE)) == ([], 0)
+
+def test_other_items_are_skipped_but_read_past():
+    buffer = line(*ORDER) + line(2, 11, 8, 3, EXPIRES, '2023-06-01 09:00:00', 40)
+    orders, end = MarketOrderLexer().lex(buffer, item_types={7})
+    assert orders == [ORDER]
+    assert end == len(buffer) - len(']</message>\n')
+    assert MarketOrderLexer().lex(buffer, item_types={99}) == ([], end)
+
+def test_malformed_records_are_skipped():
+    good = line(*ORDER)
+    bad = [
+        line(1, 'x', 7, -5, EXPIRES, '2023-06-01 08:00:00', 100),    # not a number
+        line(1, 12, 7, '--5', EXPIRES, '2023-06-01 08:00:00', 100),
+        good.replace(b', itemType = 7', b''),                         # missing field
+        good.replace(b'unitPrice', b'unit_price'),
+        good.replace(b'amount = 100]]', b'amount = '),                # cut off before the price
+    ]
+    orders, end = MarketOrderLexer().lex(b''.join(bad) + good)
+    assert orders == [ORDER]
+    assert end == len(b''.join(bad) + good) - len(']</message>\n')
+
+def test_truncated_records_wait_for_the_rest():
+    buffer = line(*ORDER) + line(2, 11, 8, 3, EXPIRES, '2023-06-01 09:00:00', 40)
+    cut = len(buffer) - 30
+    orders, end = MarketOrderLexer().lex(buffer[:cut])
+    assert orders == [ORDER] and end < len(line(*ORDER))
+    # A record ending after stop is left for the next read
+    assert MarketOrderLexer().lex(buffer, stop=cut) == (orders, end)
+
+def test_bytes_that_are_not_utf8_do_not_stop_a_scan():
+    lexer = MarketOrderLexer()
+    garbage = b'<message>\xff\xfe\x80 MarketOrder:[marketId = \xc3</message>\n'
+    broken_date = line(*ORDER).replace(b'2023-06-01 08:00:00', b'2023-06-01 08:00:0\xff')
+    orders, _ = lexer.lex(garbage + broken_date + line(*ORDER))
+    assert len(orders) == 2 and orders[1] == ORDER
+    # The broken date decodes with a replacement character and has no timestamp
+    assert orders[0][5] == '2023-06-01 08:00:0�'
+    assert timestamp(orders[0][5]) is None
+    assert timestamp(orders[1][5]) == 1685606400
+
+def test_dates_are_decoded_once():
+    lexer = MarketOrderLexer()
+    orders, _ = lexer.lex(line(*ORDER) + line(1, 11, 7, -5, EXPIRES, '2023-06-01 08:00:00', 90))
+    assert orders[0][4] is orders[1][4] and orders[0][5] is orders[1][5]
@@ -0,0 +1,70 @@
+import os
+
+import pytest
+
+from dugpt import log_index
+from dugpt.log_index import LogIndex, index_path
+from dugpt.ingest import iter_market_order_chunks
+
+def orders(count, item_types=4, markets=3, day=1):
+    return [(order_id % markets + 1, order_id, order_id % item_types + 1, -order_id if order_id % 2 else order_id,
+             f'2030-01-{day:02d} 12:00:00', f'2023-06-{day:02d} 08:00:00', 100 + order_id) for order_id in range(count)]
+
+@pytest.fixture(autouse=True)
+def small_blocks(monkeypatch):
+    # Many blocks and many reads per range out of a small log
+    monkeypatch.setattr(log_index, 'BLOCK_SIZE', 1024)
+    monkeypatch.setattr(log_index, 'READ_SIZE', 700)
+
+def scan(path, item_types=None, market_ids=None):
+    return [order for chunk in iter_market_order_chunks(path, item_types=item_types) for order in chunk
+            if market_ids is None or order[0] in market_ids]
+
+def test_indexed_lookups_match_a_full_scan(tmp_path, write_log):
+    path = write_log(tmp_path / 'log.txt', orders(400), noise=3)
+    index = LogIndex.open(path, tmp_path / 'index')
+    for item_types, market_ids in (({1}, None), (None, {2}), ({3}, {3}), ({1, 2}, {1}), ({99}, None)):
+        found, read = index.market_orders(item_types, market_ids)
+        assert found == scan(path, item_types, market_ids)
+        assert read <= os.path.getsize(path)
+
+def test_chunks_are_read_a_piece_at_a_time(tmp_path, write_log):
+    path = write_log(tmp_path / 'log.txt', orders(400), noise=0)
+    index = LogIndex.open(path, tmp_path / 'index')
+    chunks, read = index.market_order_chunks()
+    chunks = list(chunks)
+    assert len(chunks) > 10
+    assert [order for chunk in chunks for order in chunk] == scan(path)
+    assert read == os.path.getsize(path)
+
+def test_grown_log_is_extended_and_the_tail_is_read(tmp_path, write_log):
+    path = write_log(tmp_path / 'log.txt', orders(200))
+    LogIndex.open(path, tmp_path / 'index')
+    write_log(path, orders(50, day=2), mode='a')
+    # Not extended yet, the part past the index is scanned
+    index = LogIndex(path, tmp_path / 'index')
+    index.load()
+    assert index.state() == 'grown'
+    assert index.market_orders({2})[0] == scan(path, {2})
+
+    index = LogIndex.open(path, tmp_path / 'index')
+    assert index.state() == 'current'
+    assert index.offset == os.path.getsize(path)
+    assert index.market_orders({2})[0] == scan(path, {2})
+
+def test_logs_with_the_same_name_get_their_own_sidecar(tmp_path, write_log):
+    os.makedirs(tmp_path / 'a')
+    os.makedirs(tmp_path / 'b')
+    first = write_log(tmp_path / 'a' / 'log.txt', orders(100))
+    second = write_log(tmp_path / 'b' / 'log.txt', orders(60, item_types=2, day=3))
+    assert index_path(first, tmp_path / 'index') != index_path(second, tmp_path / 'index')
+    LogIndex.open(first, tmp_path / 'index')
+    LogIndex.open(second, tmp_path / 'index')
+    assert LogIndex.open(first, tmp_path / 'index').market_orders({3})[0] == scan(first, {3})
+
+def test_sidecar_of_another_log_is_not_loaded(tmp_path, write_log):
+    first = write_log(tmp_path / 'first.txt', orders(100))
+    second = write_log(tmp_path / 'second.txt', orders(100, day=4))
+    LogIndex.open(first, tmp_path / 'index')
+    os.replace(index_path(first, tmp_path / 'index'), index_path(second, tmp_path / 'index'))
+    assert not LogIndex(second, tmp_path / 'index').load()
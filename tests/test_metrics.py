@@ -0,0 +1,49 @@
+import io
+import json
+
+from dugpt import metrics
+from dugpt.metrics import Progress, count, get_run_metrics, stage, start_run
+
+def test_stages_and_counters_make_the_report(tmp_path):
+    run = start_run()
+    assert get_run_metrics() is run
+    with stage('scan'):
+        count('scan', 'bytes', 4096)
+        count('scan', 'records')
+        count('scan', 'records')
+        with stage('lex'):
+            run.cache('lex', hits=3, misses=1)
+    with stage('scan'):
+        pass
+
+    with open(run.write_report(str(tmp_path / 'run.json'))) as file:
+        report = json.load(file)
+    assert set(report) == {'started', 'seconds', 'peak_rss_mb', 'stages'}
+    scan = report['stages']['scan']
+    assert scan['calls'] == 2 and scan['counters'] == {'bytes': 4096, 'records': 2}
+    assert scan['seconds'] >= report['stages']['lex']['seconds'] >= 0
+    assert set(scan['rates']) == {'bytes', 'records'}
+    assert report['stages']['lex']['cache_hit_rate'] == 0.75
+    # A new run starts empty
+    assert start_run().report()['stages'] == {}
+
+def test_progress_redraws_once_per_interval(monkeypatch):
+    stream = io.StringIO()
+    monkeypatch.setattr(metrics.time, 'monotonic', lambda: 5000.0)
+    progress = Progress('Orders', total=200, interval=3600, stream=stream)
+    for _ in range(200):
+        progress.update()
+    progress.close()
+    lines = stream.getvalue().split('\r')[1:]
+    assert [line.rstrip() for line in lines] == ['Orders = 1 / 200 (0%)', 'Orders = 200 / 200 (100%)']
+    assert stream.getvalue().endswith('\n')
+
+def test_progress_without_a_total(monkeypatch):
+    stream = io.StringIO()
+    ticks = [1000.0, 1000.1, 1001.0]
+    monkeypatch.setattr(metrics.time, 'monotonic', lambda: ticks.pop(0) if ticks else 1001.0)
+    progress = Progress('Bytes', interval=0.5, stream=stream)
+    progress.update(1500)
+    progress.update(1500)
+    progress.update(1500)
+    assert [line.rstrip() for line in stream.getvalue().split('\r')[1:]] == ['Bytes = 1,500', 'Bytes = 4,500']
@@ -0,0 +1,69 @@
+import random
+
+from dugpt.ingest import MARKET_ORDER_FIELDS, update_order_index
+from dugpt.order_batch import OrderBatch, NAT
+
+ITEM_IDS = {7: 'Hematite', 8: 'Coal'}
+
+def market_order_dict(order):
+    # A lexer tuple as the order dict update_order_index takes
+    return dict(zip(MARKET_ORDER_FIELDS, order))
+
+def sightings(count, seed):
+    # Few orders seen many times: older, equal and newer updateDates, some prices changing on a tie
+    rng = random.Random(seed)
+    orders = []
+    for _ in range(count):
+        order_id = rng.randrange(20)
+        orders.append((order_id % 3 + 1, order_id, 7 + order_id % 2, rng.choice([-3, 0, 5]), '2030-01-01 00:00:00',
+                       f'2023-06-0{rng.randrange(1, 4)} 08:00:00', rng.choice([100, 110])))
+    return orders
+
+def indexed(orders):
+    # The dict path, what update_order_index keeps
+    order_index = {}
+    for market_order in map(market_order_dict, orders):
+        update_order_index(order_index, market_order)
+    return order_index
+
+def keys_and_values(batch):
+    return sorted(zip(batch.market_id.tolist(), batch.order_id.tolist(), batch.update_date.tolist(),
+                      batch.buy_quantity.tolist(), batch.unit_price.tolist()))
+
+def as_batch_rows(market_orders):
+    return keys_and_values(OrderBatch.from_orders([tuple(market_order.values()) for market_order in market_orders]))
+
+def test_latest_matches_update_order_index():
+    for seed in range(20):
+        orders = sightings(200, seed)
+        order_index = indexed(orders)
+        assert keys_and_values(OrderBatch.from_orders(orders).latest()) == as_batch_rows(order_index.values())
+
+def test_latest_keeps_sighting_order_and_handles_missing_dates():
+    batch = OrderBatch.from_orders([
+        (1, 2, 7, 5, '', '2023-06-02 08:00:00', 100),
+        (1, 1, 7, 5, '', 'not a date', 100),
+        (1, 2, 7, 5, '', '2023-06-01 08:00:00', 90),
+        (1, 1, 7, 4, '', '2023-06-01 08:00:00', 100),
+    ])
+    latest = batch.latest()
+    assert latest.order_id.tolist() == [2, 1]
+    assert latest.unit_price.tolist() == [100, 100] and latest.buy_quantity.tolist() == [5, 4]
+    assert (latest.expiration_date == NAT).all()
+    assert len(OrderBatch.empty().latest()) == 0
+
+def test_update_reports_the_orders_that_changed():
+    for seed in range(20):
+        orders = sightings(300, seed)
+        latest, order_index = OrderBatch.empty(['Hematite', 'Coal']), {}
+        for start in range(0, len(orders), 37):
+            chunk = orders[start:start + 37]
+            latest, changed = latest.update(OrderBatch.from_orders(chunk, ITEM_IDS))
+            before = dict(order_index)
+            for market_order in map(market_order_dict, chunk):
+                update_order_index(order_index, market_order)
+            # Net of the chunk: orders that are new or whose latest snapshot is not the same any more
+            expected = [market_order for key, market_order in order_index.items() if before.get(key) != market_order]
+            assert keys_and_values(changed) == as_batch_rows(expected)
+            assert changed.item_names == ['Hematite', 'Coal']
+        assert keys_and_values(latest) == as_batch_rows(order_index.values())
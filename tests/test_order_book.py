@@ -0,0 +1,113 @@
+import random
+
+import pytest
+
+from dugpt.order_batch import OrderBatch
+from dugpt.order_book import BookSide, OrderBook, OrderBooks, FenwickTree
+
+class ListSide:
+    # The obvious sorted-list side, what BookSide must agree with
+    def __init__(self, descending):
+        self.descending = descending
+        self.quantities = {}
+
+    def add(self, price, quantity):
+        self.quantities[price] = self.quantities.get(price, 0) + quantity
+        if self.quantities[price] <= 0:
+            del self.quantities[price]
+
+    def levels(self):
+        return sorted(self.quantities.items(), reverse=self.descending)
+
+    def fill_cost(self, quantity):
+        cost, left = 0, quantity
+        for price, available in self.levels():
+            take = min(left, available)
+            cost += take * price
+            left -= take
+            if not left:
+                return cost
+        return None if left > 0 or not self.quantities else cost
+
+    def depth(self, quantity):
+        filled = 0
+        for price, available in self.levels():
+            filled += available
+            if filled >= quantity:
+                return price
+        return None
+
+    def quantity_within(self, price):
+        return sum(available for level, available in self.levels() if (level >= price if self.descending else level <= price))
+
+def test_fenwick_prefix_and_search():
+    tree = FenwickTree(bits=10)
+    values = {3: 5, 10: 1, 700: 4, 1024: 2}
+    for index, value in values.items():
+        tree.add(index, value)
+    assert tree.prefix(2) == 0
+    assert tree.prefix(10) == 6
+    assert tree.prefix(1024) == 12
+    assert tree.search(1) == (3, 0)
+    assert tree.search(6) == (10, 5)
+    assert tree.search(7) == (700, 6)
+    assert tree.search(13)[0] == 1025
+    tree.add(10, -1)
+    assert tree.search(6) == (700, 5)
+
+@pytest.mark.parametrize('descending', [True, False])
+def test_book_side_matches_a_sorted_list(descending):
+    rng = random.Random(descending)
+    side, reference = BookSide(descending), ListSide(descending)
+    for _ in range(500):
+        price = rng.choice([rng.randrange(1, 50), rng.randrange(1, 10 ** 12)])
+        quantity = rng.randrange(1, 100)
+        if reference.quantities and rng.random() < 0.4:
+            price = rng.choice(list(reference.quantities))
+            quantity = -rng.randrange(1, reference.quantities[price] + 1)
+        side.add(price, quantity)
+        reference.add(price, quantity)
+
+        levels = reference.levels()
+        assert side.best() == (levels[0][0] if levels else None)
+        assert len(side) == len(levels)
+        total = sum(available for _, available in levels)
+        assert side.total_quantity() == total
+        for wanted in (1, total // 2, total, total + 1):
+            assert side.depth(wanted) == reference.depth(wanted)
+            assert side.fill_cost(wanted) == reference.fill_cost(wanted)
+        probe = rng.randrange(1, 60)
+        assert side.quantity_within(probe) == reference.quantity_within(probe)
+    assert side.levels() == reference.levels()
+
+def orders(*rows):
+    # (order_id, buy_quantity, unit_price[, update_date]) -> a batch on market 1, item 7
+    return OrderBatch.from_orders([(1, row[0], 7, row[1], '2030-01-01 00:00:00', row[3] if len(row) > 3 else '2023-06-01 08:00:00', row[2])
+                                   for row in rows])
+
+def test_unknown_order_with_no_quantity_changes_nothing():
+    book = OrderBook(1, 7)
+    assert book.apply(orders((1, 0, 100))) == 0
+    assert len(book) == 0 and book.best_ask() is None
+
+def test_order_updates_replace_older_snapshots():
+    book = OrderBook(1, 7)
+    assert book.apply(orders((1, 10, 100), (2, -5, 90))) == 2
+    assert book.spread() == 10
+    assert book.apply(orders((1, 3, 50, '2023-05-01 00:00:00'), (1, 10, 100))) == 0
+    assert book.apply(orders((1, 4, 120, '2023-06-02 00:00:00'))) == 1
+    assert book.asks.levels() == [(120, 4)]
+    assert book.apply(orders((1, 0, 120, '2023-06-03 00:00:00'))) == 1
+    assert book.best_ask() is None and book.best_bid() == 90
+
+def test_books_route_and_expire_batches():
+    books = OrderBooks()
+    batch = OrderBatch.from_orders([
+        (1, 1, 7, 10, '2023-06-02 00:00:00', '2023-06-01 00:00:00', 100),
+        (2, 2, 7, 5, '2030-01-01 00:00:00', '2023-06-01 00:00:00', 110),
+        (1, 3, 8, -4, '2030-01-01 00:00:00', '2023-06-01 00:00:00', 50),
+    ])
+    assert books.apply(batch) == 3
+    assert books.best_ask(7) == (100, 1)
+    assert books.expire('2023-06-02 00:00:00') == 1
+    assert books.best_ask(7) == (110, 2) and books.best_bid(8) == (50, 1)
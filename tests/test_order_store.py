@@ -0,0 +1,80 @@
+import os
+import datetime
+import threading
+
+from dugpt.order_batch import OrderBatch
+from dugpt.order_store import OrderStore
+
+DAY = datetime.date(2023, 6, 1)
+EXPIRES = '2030-01-01 00:00:00'
+
+def batch(order_ids, item_type=7):
+    return OrderBatch.from_orders([(1, order_id, item_type, 5, EXPIRES, '2023-06-01 08:00:00', 100) for order_id in order_ids],
+                                  {7: 'Hematite'})
+
+def test_append_counts_only_the_orders_it_writes(tmp_path):
+    store = OrderStore(str(tmp_path))
+    orders = OrderBatch.concat([batch([1, 2]), batch([3], item_type=99)])
+    assert store.append(orders, DAY) == 2
+    assert store.read(['Hematite'])['order_id'].tolist() == [1, 2]
+
+def test_concurrent_appends_never_share_a_part(tmp_path):
+    store = OrderStore(str(tmp_path))
+    start = threading.Barrier(8)
+    def append(writer):
+        start.wait()
+        store.append(batch(range(writer * 100, writer * 100 + 100)), DAY)
+    threads = [threading.Thread(target=append, args=(writer,)) for writer in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(store.read(['Hematite'])['order_id']) == list(range(800))
+
+def test_orders_read_back_as_they_were_written(tmp_path):
+    store = OrderStore(str(tmp_path))
+    orders = OrderBatch.from_orders([
+        (1, 1, 7, -3, EXPIRES, '2023-06-01 08:00:00', 100),
+        (2, 2, 8, 5, '', '2023-06-01 09:30:15', 2 ** 40),
+        (1, 1, 7, -2, EXPIRES, '2023-06-02 08:00:00', 105),
+    ], {7: 'Hematite', 8: 'Coal'})
+    store.append(orders, DAY)
+    store.append(batch([3]), DAY + datetime.timedelta(days=1))
+
+    stored = store.read(['Hematite', 'Coal'], until=DAY, latest=False)
+    assert stored['order_type'].tolist() == ['Buy', 'Buy', 'Sell']
+    read = OrderBatch.from_frame(stored)
+    assert read.item_names == ['Hematite', 'Coal']
+    for name in ('market_id', 'order_id', 'item_type', 'unit_price', 'buy_quantity', 'expiration_date', 'update_date', 'item_code'):
+        assert getattr(read, name).tolist() == getattr(orders.take([0, 2, 1]), name).tolist()
+
+    latest = store.read(['Hematite'])
+    assert list(zip(latest['order_id'], latest['unit_price'])) == [(1, 105), (3, 100)]
+    assert store.read(['Hematite'], expires_after=datetime.datetime(2031, 1, 1)).empty
+
+def test_compaction_interrupted_before_cleanup_loses_and_doubles_nothing(tmp_path, monkeypatch):
+    store = OrderStore(str(tmp_path))
+    for order_ids in ([1, 2], [3], [4, 5]):
+        store.append(batch(order_ids), DAY)
+    expected = sorted(store.read(['Hematite'], latest=False)['order_id'])
+
+    # Crash right after the merged part is written
+    def crash(path):
+        raise OSError("crashed")
+    monkeypatch.setattr('dugpt.order_store.shutil.rmtree', crash)
+    try:
+        store.compact()
+    except OSError:
+        pass
+    assert sorted(store.read(['Hematite'], latest=False)['order_id']) == expected
+
+    monkeypatch.undo()
+    store.compact()
+    day_directory = os.path.join(store.item_directory('Hematite'), DAY.isoformat())
+    assert len(os.listdir(day_directory)) == 1
+    assert sorted(store.read(['Hematite'], latest=False)['order_id']) == expected
+
+def test_append_partitions_by_utc_day(tmp_path):
+    store = OrderStore(str(tmp_path))
+    store.append(batch([1]))
+    assert store.days('Hematite') == [datetime.datetime.now(datetime.timezone.utc).date().isoformat()]
@@ -0,0 +1,46 @@
+import datetime
+
+from dugpt.order_batch import OrderBatch
+from dugpt.order_store import OrderStore
+from dugpt.price_history import PriceHistory, ALL_MARKETS
+
+ITEM_IDS = {7: 'Hematite'}
+EXPIRES = '2030-01-01 00:00:00'
+
+def orders(*rows):
+    # (order_id, quantity, unit_price, update_date) sell orders on market 1
+    return OrderBatch.from_orders([(1, order_id, 7, quantity, EXPIRES, update_date, unit_price)
+                                   for order_id, quantity, unit_price, update_date in rows], ITEM_IDS)
+
+def test_update_reads_from_the_watermark_day_and_counts_snapshots_once(tmp_path):
+    store = OrderStore(str(tmp_path / 'orders'))
+    history = PriceHistory(str(tmp_path / 'bars'), intervals=['1h'])
+    reads = []
+    read = store.read
+    store.read = lambda *args, **kwargs: reads.append(kwargs.get('since')) or read(*args, **kwargs)
+
+    store.append(orders((1, 5, 100, '2023-06-01 08:10:00'), (2, 3, 120, '2023-06-01 08:20:00')), datetime.date(2023, 6, 1))
+    assert history.update(['Hematite'], store) == 2
+    # Logged again the next week, already folded in and left out of the read
+    store.append(orders((2, 3, 120, '2023-06-01 08:20:00')), datetime.date(2023, 6, 8))
+    store.append(orders((1, 4, 90, '2023-06-10 09:00:00'), (1, 4, 90, '2023-06-10 09:00:00')), datetime.date(2023, 6, 10))
+    assert history.update(['Hematite'], store) == 1
+    assert reads == [None, datetime.date(2023, 5, 31)]
+
+    bars = history.read('Hematite', '1h', market_id=ALL_MARKETS)
+    assert bars[['open', 'high', 'low', 'close', 'volume', 'orders']].values.tolist() == [[100, 120, 100, 120, 8, 2], [90, 90, 90, 90, 4, 1]]
+
+def test_snapshots_at_the_watermark_second_from_a_later_ingest_are_folded_once(tmp_path):
+    store = OrderStore(str(tmp_path / 'orders'))
+    history = PriceHistory(str(tmp_path / 'bars'), intervals=['1h'])
+    store.append(orders((1, 5, 100, '2023-06-01 08:10:00')), datetime.date(2023, 6, 1))
+    assert history.update(['Hematite'], store) == 1
+    # Another order updated in the same second, logged after the first update
+    store.append(orders((2, 3, 120, '2023-06-01 08:10:00')), datetime.date(2023, 6, 1))
+    assert history.update(['Hematite'], store) == 1
+    assert history.update(['Hematite'], store) == 0
+    store.append(orders((3, 1, 90, '2023-06-01 08:10:00'), (1, 5, 100, '2023-06-01 08:10:00')), datetime.date(2023, 6, 2))
+    assert history.update(['Hematite'], store) == 1
+
+    bars = history.read('Hematite', '1h', market_id=ALL_MARKETS)
+    assert bars[['open', 'high', 'low', 'close', 'volume', 'orders']].values.tolist() == [[100, 120, 90, 90, 9, 3]]
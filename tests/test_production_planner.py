@@ -0,0 +1,50 @@
+from dugpt.production_planner import ProductionPlanner, schedule_to_lua
+
+from test_recipes import recipe, CYCLE_RECIPES, A, B, E
+
+def test_lua_quantity_is_units_of_product():
+    # Ten units of item 1 per run, 25 wanted takes three runs
+    planner = ProductionPlanner([recipe(101, 1, [(2, 4)], quantity=10)])
+    schedule = planner.schedule([{'id': 1, 'quantity': 25}], {1: 1})
+    job, = schedule['units']['T1-1']
+    assert (job['runs'], job['quantity']) == (3, 30)
+    assert 'id = 1, quantity = 30, runs = 3, recipe = 101' in schedule_to_lua(schedule)
+
+def test_jobs_wait_for_a_high_enough_tier():
+    planner = ProductionPlanner([dict(recipe(101, 1, [(2, 1)]), tier=2), recipe(103, 3, [(2, 1)])])
+    schedule = planner.schedule([{'id': 1, 'quantity': 1}, {'id': 3, 'quantity': 1}], {1: 2})
+    assert [job['recipe'] for job in schedule['unscheduled']] == [101]
+    assert [job['recipe'] for jobs in schedule['units'].values() for job in jobs] == [103]
+    assert schedule['makespan'] == 60
+
+def test_jobs_start_after_their_ingredients_are_made():
+    # 1 is made from 2, which is made from 4; spare units do not let 1 start early
+    recipes = [recipe(101, 1, [(2, 1)], time=30), recipe(102, 2, [(4, 1)], time=100)]
+    schedule = ProductionPlanner(recipes).schedule([{'id': 1, 'quantity': 2}], {1: 3}, max_runs_per_job=1)
+    jobs = {}
+    for unit_jobs in schedule['units'].values():
+        for job in unit_jobs:
+            jobs.setdefault(job['recipe'], []).append(job)
+    assert len(jobs[101]) == len(jobs[102]) == 2
+    assert min(job['start'] for job in jobs[101]) >= max(job['end'] for job in jobs[102])
+    assert schedule['makespan'] == 130
+
+def test_long_runs_are_split_and_stock_is_used_first():
+    planner = ProductionPlanner([recipe(101, 1, [(2, 4)], quantity=10)])
+    jobs = planner.jobs([{'id': 1, 'quantity': 95}], stock={1: 20}, max_runs_per_job=3)
+    assert [(job['runs'], job['quantity'], job['duration']) for job in jobs] == [(3, 30, 180), (3, 30, 180), (2, 20, 120)]
+    schedule = planner.schedule([{'id': 1, 'quantity': 95}], {1: 2}, stock={1: 20}, max_runs_per_job=3)
+    assert schedule['makespan'] == 300 and not schedule['unscheduled']
+
+def test_cycle_members_are_reported_as_bought():
+    schedule = ProductionPlanner(CYCLE_RECIPES).schedule([{'id': A, 'quantity': 5}, {'id': E, 'quantity': 1}], {1: 1})
+    assert schedule['bought'] == {A: 5}
+    assert [job['recipe'] for job in schedule['units']['T1-1']] == [103, 105]
+
+def test_recipes_waiting_on_each_other_are_unscheduled():
+    planner = ProductionPlanner(CYCLE_RECIPES)
+    # Crafting through the cycle makes 101 and 102 each wait for the other
+    planner.bill_of_materials.cycles = set()
+    schedule = planner.schedule([{'id': A, 'quantity': 1}, {'id': B, 'quantity': 1}], {1: 1})
+    assert sorted(job['recipe'] for job in schedule['unscheduled']) == [101, 102]
+    assert [job['recipe'] for job in schedule['units']['T1-1']] == [103]
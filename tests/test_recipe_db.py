@@ -0,0 +1,46 @@
+import os
+import json
+
+from dugpt.recipe_db import CompiledRecipes, load_recipes, is_stale
+
+RECIPES = [
+    {'id': 101, 'tier': 1, 'time': 60, 'nanocraftable': True,
+     'ingredients': [{'quantity': 2, 'id': 7, 'displayNameWithSize': 'Hematite', 'locDisplayNameWithSize': 'Hématite',
+                      'locDisplayNameWithSizeDE': 'Hämatit'}],
+     'products': [{'quantity': 1, 'id': 1, 'displayNameWithSize': 'Pure Iron', 'locDisplayNameWithSize': 'Fer pur'}]},
+    {'id': 102, 'tier': 3, 'time': 1800, 'nanocraftable': False,
+     'ingredients': [{'quantity': 0.5, 'id': 1, 'displayNameWithSize': 'Pure Iron', 'locDisplayNameWithSize': 'Fer pur'},
+                     {'quantity': 10, 'id': 8, 'displayNameWithSize': 'Coal'}],
+     'products': [{'quantity': 3, 'id': 2, 'displayNameWithSize': 'Steel'}]},
+    {'id': 103, 'tier': 0, 'time': 0, 'nanocraftable': False, 'ingredients': [], 'products': []},
+]
+
+def write_recipes(path, recipes):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(recipes, file)
+    return str(path)
+
+def test_recipes_round_trip_through_the_compiled_file(tmp_path):
+    json_path = write_recipes(tmp_path / 'recipes.json', RECIPES)
+    recipes = load_recipes(json_path)
+    assert isinstance(recipes, CompiledRecipes)
+    assert os.path.exists(tmp_path / 'recipes.bin')
+    assert len(recipes) == 3 and list(recipes) == RECIPES
+    assert recipes[-1] == RECIPES[-1] and recipes[1:] == RECIPES[1:]
+    # Loading again maps the same file instead of compiling it again
+    assert not is_stale(json_path, str(tmp_path / 'recipes.bin'))
+    assert list(load_recipes(json_path)) == RECIPES
+
+def test_a_stale_compiled_file_is_rebuilt(tmp_path):
+    json_path = write_recipes(tmp_path / 'recipes.json', RECIPES)
+    cache_path = str(tmp_path / 'recipes.bin')
+    load_recipes(json_path)
+
+    changed = [dict(RECIPES[0], time=90)]
+    write_recipes(json_path, changed)
+    # A different mtime even where the clock is coarse
+    stat = os.stat(json_path)
+    os.utime(json_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert is_stale(json_path, cache_path)
+    assert list(load_recipes(json_path)) == changed
+    assert not is_stale(json_path, cache_path)
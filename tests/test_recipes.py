@@ -0,0 +1,66 @@
+import itertools
+
+from dugpt.recipes import BillOfMaterials, RecipeCostEngine
+from dugpt.profitability import ProfitabilityEngine
+
+A, B, C, D, E = 1, 2, 3, 4, 5
+
+def recipe(recipe_id, product_id, ingredients, quantity=1, time=60):
+    return {
+        'id': recipe_id,
+        'tier': 1,
+        'time': time,
+        'products': [{'id': product_id, 'quantity': quantity}],
+        'ingredients': [{'id': ingredient_id, 'quantity': used} for ingredient_id, used in ingredients],
+    }
+
+# A and B make each other, C hangs below the cycle but is made from D like any other item
+CYCLE_RECIPES = [
+    recipe(101, A, [(B, 1), (C, 1)]),
+    recipe(102, B, [(A, 1)]),
+    recipe(103, C, [(D, 2)]),
+    recipe(105, E, [(C, 1)]),
+]
+
+def test_only_cycle_members_are_bought():
+    bill_of_materials = BillOfMaterials(CYCLE_RECIPES)
+    assert bill_of_materials.cycles == {A, B}
+
+def test_products_come_before_their_ingredients():
+    order = BillOfMaterials(CYCLE_RECIPES).order
+    assert sorted(order) == [A, B, C, D, E]
+    for product_id, ingredient_id in ((A, C), (E, C), (C, D), (B, C)):
+        assert order.index(product_id) < order.index(ingredient_id)
+
+def test_explode_crafts_items_below_a_cycle():
+    result = BillOfMaterials(CYCLE_RECIPES).explode({E: 1})
+    assert result['raw'] == {D: 2}
+    assert result['batches'] == {105: 1, 103: 1}
+
+def test_explode_buys_cycle_members():
+    result = BillOfMaterials(CYCLE_RECIPES).explode({A: 1, C: 1})
+    assert result['raw'] == {A: 1, D: 2}
+    assert result['batches'] == {103: 1}
+
+def test_self_consuming_recipe_is_a_cycle():
+    recipes = [recipe(201, A, [(A, 2), (D, 1)], quantity=1)]
+    assert BillOfMaterials(recipes).cycles == {A}
+
+def test_profitability_crafts_items_below_a_cycle():
+    engine = ProfitabilityEngine(CYCLE_RECIPES)
+    costs = dict(zip(engine.recipe_ids.tolist(), engine.material_costs({B: 10.0, D: 3.0}).tolist()))
+    assert costs[105] == 6.0
+    assert costs[101] == 16.0
+
+def test_cycle_costs_do_not_depend_on_query_order():
+    prices = {B: 10.0, D: 3.0, A: 50.0}
+    profitability = ProfitabilityEngine(CYCLE_RECIPES)
+    batch_costs = dict(zip(profitability.recipe_ids.tolist(), profitability.material_costs(prices).tolist()))
+    for first, second in itertools.permutations([A, B, C, E], 2):
+        engine = RecipeCostEngine(CYCLE_RECIPES, prices)
+        engine.unit_cost(first)
+        engine.unit_cost(second)
+        # Cycle members cost their price, everything else is crafted
+        assert {item_id: engine.unit_cost(item_id) for item_id in (A, B, C, E)} == {A: 50.0, B: 10.0, C: 6.0, E: 6.0}
+        assert engine.cycles == {A, B}
+        assert {recipe['id']: engine.batch_cost(recipe) for recipe in CYCLE_RECIPES} == batch_costs
@@ -0,0 +1,46 @@
+import asyncio
+import datetime
+
+from dugpt.order_batch import OrderBatch
+from dugpt.order_book import OrderBooks
+from dugpt.service import QueryServer
+
+class BrokenService:
+    def health(self, query):
+        return {'status': 'ok'}
+
+    def best(self, query):
+        # A bug that happens to raise ValueError, not a bad request
+        return int('not a number')
+
+def request(server, raw):
+    async def exchange():
+        server.lock = asyncio.Lock()
+        listener = await asyncio.start_server(server.handle, '127.0.0.1', 0)
+        reader, writer = await asyncio.open_connection(*listener.sockets[0].getsockname()[:2])
+        writer.write(raw)
+        response = await reader.read()
+        writer.close()
+        listener.close()
+        return response
+    return asyncio.run(exchange())
+
+def test_errors_inside_a_query_are_500s(capsys):
+    server = QueryServer(BrokenService())
+    response = request(server, b'GET /market/best?item=1 HTTP/1.1\r\nConnection: close\r\n\r\n')
+    assert response.startswith(b'HTTP/1.1 500 ')
+    assert b'not a number' not in response
+    assert "ValueError: invalid literal" in capsys.readouterr().err
+
+def test_malformed_request_lines_are_400s():
+    response = request(QueryServer(BrokenService()), b'GET\r\n\r\n')
+    assert response.startswith(b'HTTP/1.1 400 ')
+
+def test_books_expire_against_utc():
+    books = OrderBooks()
+    # Expires in an hour, UTC as logged, whatever the local time zone is
+    expires = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=1)
+    books.apply(OrderBatch.from_orders([(1, 1, 7, 5, expires.strftime('%Y-%m-%d %H:%M:%S'), '2023-06-01 00:00:00', 100)]))
+    assert books.expire() == 0
+    assert books.expire(expires - datetime.timedelta(minutes=1)) == 0
+    assert books.expire(expires.astimezone(datetime.timezone(datetime.timedelta(hours=-8)))) == 1